@@ -1,67 +1,120 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, sessao_leitura
 from app.models import Usuario
-import os
-from dotenv import load_dotenv
-from pathlib import Path
+from app.cache import cache_usuarios, caches_locais_validas
+from app.config import get_settings
+import secrets
+import uuid
 
 # ==========================
-# Carregar variáveis do ambiente
+# Configuração do contexto de senhas
 # ==========================
-# Caminho absoluto para o .env.production
-env_path = Path(__file__).resolve().parent.parent / ".env.production"
-
-# Garante o carregamento mesmo se o main já tiver feito isso
-load_dotenv(dotenv_path=env_path, override=True)
+# argon2id para hashes novos; bcrypt ($2b$, dos dados antigos) e sha256_crypt
+# ficam só para verificar hashes antigos, que são refeitos em argon2 no login
+# seguinte (verify_and_update)
+pwd_context = CryptContext(schemes=["argon2", "bcrypt", "sha256_crypt"], deprecated="auto")
+security = HTTPBearer()
 
 # ==========================
-# Configurações de segurança
+# Pool de hashing de senhas
 # ==========================
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-
-# Se a SECRET_KEY não estiver definida, gerar fallback seguro
-if not SECRET_KEY or SECRET_KEY.strip() == "":
-    import secrets
-    SECRET_KEY = secrets.token_hex(32)
-    print("⚠️  SECRET_KEY ausente no ambiente — chave temporária gerada automaticamente.")
-else:
-    print("🔐 SECRET_KEY carregada com sucesso.")
+class PoolSenhas:
+    """
+    Executa o hashing/verificação de senhas em threads (o argon2 liberta o GIL),
+    fora do event loop. Limita o número de operações em curso ou em espera:
+    acima de `fila_max` o pedido é recusado com 503 em vez de acumular latência.
+    """
 
-# ==========================
-# Configuração do contexto de senhas
-# ==========================
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
-security = HTTPBearer()
+    def __init__(self, workers: int, fila_max: int):
+        self.workers = workers
+        self.fila_max = fila_max
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="senhas")
+        # Só alterado no thread do event loop, não precisa de lock
+        self.pendentes = 0
+        self.rejeitados = 0
+
+    async def executar(self, funcao, *args):
+        if self.pendentes >= self.fila_max:
+            self.rejeitados += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente.",
+                headers={"Retry-After": "1"},
+            )
+        self.pendentes += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+        finally:
+            self.pendentes -= 1
+
+    def estatisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "fila_max": self.fila_max,
+            "pendentes": self.pendentes,
+            "rejeitados": self.rejeitados
+        }
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+pool_senhas = PoolSenhas(
+    workers=get_settings().senha_hash_workers,
+    fila_max=get_settings().senha_hash_fila_max
+)
 
 # ==========================
 # Funções utilitárias
 # ==========================
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha informada corresponde ao hash armazenado."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _verificar_e_atualizar(plain_password, hashed_password)[0]
 
 def get_password_hash(password: str) -> str:
     """Gera o hash da senha para armazenamento seguro."""
     return pwd_context.hash(password)
 
+def _verificar_e_atualizar(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except (ValueError, TypeError):
+        # Hash vazio, malformado ou de um esquema desconhecido (UnknownHashError
+        # é um ValueError): credenciais inválidas em vez de 500
+        return False, None
+
+async def verificar_senha(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha no pool de hashing. Devolve (válida, novo_hash); novo_hash
+    vem preenchido quando o hash guardado usa um esquema ou parâmetros antigos.
+    Hashes que não é possível verificar contam como senha inválida.
+    """
+    return await pool_senhas.executar(_verificar_e_atualizar, plain_password, hashed_password)
+
+async def gerar_hash_senha(password: str) -> str:
+    """Versão de get_password_hash que corre no pool de hashing."""
+    return await pool_senhas.executar(pwd_context.hash, password)
+
 # ==========================
 # JWT - Criação e verificação
 # ==========================
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria um token JWT com expiração e payload customizado."""
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    settings = get_settings()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
     try:
-        encoded_jwt = jwt.encode(to_encode, str(SECRET_KEY), algorithm=ALGORITHM)
+        encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
         return encoded_jwt
     except Exception as e:
         print(f"❌ Erro ao gerar token JWT: {e}")
@@ -69,8 +122,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def verify_token(token: str) -> str:
     """Verifica e decodifica o token JWT, retornando o ID do usuário."""
+    settings = get_settings()
     try:
-        payload = jwt.decode(token, str(SECRET_KEY), algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: str = payload.get("sub")
         if not user_id:
             raise HTTPException(
@@ -86,16 +140,27 @@ def verify_token(token: str) -> str:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+# ==========================
+# Principal do usuário autenticado
+# ==========================
+@dataclass(frozen=True, slots=True)
+class UsuarioPrincipal:
+    """Dados mínimos do usuário autenticado, sem ligação à sessão (seguros para cache)."""
+    id: uuid.UUID
+    email: Optional[str]
+    nome: Optional[str]
+    ativo: Optional[bool]
+
 # ==========================
 # Dependências FastAPI
 # ==========================
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obtém o usuário atual a partir do token Bearer."""
     user_id = verify_token(credentials.credentials)
-    user = db.query(Usuario).filter(Usuario.id == user_id).first()
+    user = await db.scalar(select(Usuario).where(Usuario.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -104,11 +169,60 @@ def get_current_user(
         )
     return user
 
-def authenticate_user(db: Session, email: str, password: str):
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> UsuarioPrincipal:
+    """
+    Como get_current_user, mas devolve um UsuarioPrincipal vindo da cache de
+    usuários; só consulta a base de dados quando o usuário não está em cache.
+    Para rotas que apenas precisam do id (e pouco mais) do usuário.
+    """
+    user_id = verify_token(credentials.credentials)
+    # Sem sincronização entre workers a cache pode ter um usuário já alterado
+    usar_cache = caches_locais_validas()
+    principal = cache_usuarios.get(user_id) if usar_cache else None
+    if principal is None:
+        linha = (await db.execute(
+            select(Usuario.id, Usuario.email, Usuario.nome, Usuario.ativo).where(Usuario.id == user_id)
+        )).first()
+        if not linha:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuário não encontrado.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        principal = UsuarioPrincipal(*linha)
+        if usar_cache:
+            cache_usuarios.set(user_id, principal)
+    return principal
+
+async def get_read_db(current_user: UsuarioPrincipal = Depends(get_current_principal)):
+    """
+    Dependency para rotas só de leitura: sessão na réplica de leitura, se
+    configurada, ou no primário logo após uma escrita do usuário, com a
+    réplica atrasada ou em falha (ver sessao_leitura em app/database.py).
+    """
+    async with sessao_leitura(current_user.id) as db:
+        yield db
+
+async def verificar_admin(x_admin_token: Optional[str] = Header(None)):
+    """Protege rotas administrativas com o ADMIN_TOKEN do ambiente."""
+    admin_token = get_settings().admin_token
+    if not admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token de administração inválido")
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     """Valida as credenciais de login."""
-    user = db.query(Usuario).filter(Usuario.email == email).first()
+    user = await db.scalar(select(Usuario).where(Usuario.email == email).limit(1))
     if not user:
         return False
-    if not verify_password(password, user.senha_hash):
+    valida, novo_hash = await verificar_senha(password, user.senha_hash)
+    if not valida:
         return False
+    if novo_hash:
+        # Migração transparente do hash; gravado no commit do login
+        user.senha_hash = novo_hash
     return user
@@ -0,0 +1,195 @@
+"""
+Cache em memória do processo (LRU + TTL) e versões de dados por usuário
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import get_settings
+
+_AUSENTE = object()
+
+class CacheTTL:
+    """
+    Cache LRU limitado em número de itens, com expiração por TTL.
+    Mantém contadores de hits, misses, evictions e expirações.
+    """
+
+    def __init__(self, nome: str, max_itens: int, ttl: float):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expiracoes = 0
+
+    def get(self, chave: Hashable, padrao: Any = None) -> Any:
+        with self._lock:
+            item = self._itens.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                self.misses += 1
+                return padrao
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                self.expiracoes += 1
+                self.misses += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return valor
+
+    def set(self, chave: Hashable, valor: Any) -> None:
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def invalidar(self, chave: Hashable) -> None:
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def obter_ou_calcular(self, chave: Hashable, calcular: Callable[[], Any]) -> Any:
+        valor = self.get(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = calcular()
+            self.set(chave, valor)
+        return valor
+
+    async def obter_ou_aguardar(self, chave: Hashable, calcular: Callable[[], Awaitable[Any]]) -> Any:
+        """Como obter_ou_calcular, para funções de cálculo assíncronas."""
+        valor = self.get(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = await calcular()
+            self.set(chave, valor)
+        return valor
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expiracoes": self.expiracoes,
+                "hit_rate": self.hits / consultas if consultas else 0.0
+            }
+
+# ==========================
+# Versões de dados por usuário
+# ==========================
+# Cada escrita relevante incrementa a versão do recurso para o usuário; as
+# chaves de cache incluem a versão lida antes do cálculo, pelo que entradas
+# antigas deixam de ser encontradas e acabam removidas por LRU/TTL.
+_versoes: Dict[Tuple[str, str], int] = {}
+_versoes_lock = threading.Lock()
+
+# Instante (monotónico, deste processo) da última escrita de cada usuário,
+# recebida diretamente ou de outro worker: durante alguns segundos as leituras
+# desse usuário não vão à réplica (ler as próprias escritas; app/database.py)
+_ultimas_escritas: Dict[str, float] = {}
+
+def versao(usuario_id, recurso: str) -> int:
+    return _versoes.get((str(usuario_id), recurso), 0)
+
+def incrementar_versao(usuario_id, *recursos: str, propagar: bool = True) -> None:
+    """Chamar depois do commit de uma escrita que altera os recursos indicados."""
+    with _versoes_lock:
+        for recurso in recursos:
+            chave = (str(usuario_id), recurso)
+            _versoes[chave] = _versoes.get(chave, 0) + 1
+        if any(recurso not in RECURSOS_SO_PRIMARIO for recurso in recursos):
+            _ultimas_escritas[str(usuario_id)] = time.monotonic()
+    if propagar:
+        publicar({"tipo": "versao", "usuario": str(usuario_id), "recursos": list(recursos)})
+
+# ==========================
+# Propagação entre processos
+# ==========================
+# Com vários workers (ou réplicas) cada processo tem as suas versões e caches;
+# app/sincronizacao.py instala aqui a função que envia as alterações aos
+# restantes processos. Sem ela (um só processo) publicar não faz nada.
+_publicador: Optional[Callable[[dict], None]] = None
+
+def definir_publicador(publicador: Optional[Callable[[dict], None]]) -> None:
+    global _publicador
+    _publicador = publicador
+
+def publicar(mensagem: dict) -> None:
+    if _publicador is not None:
+        _publicador(mensagem)
+
+# Com a sincronização configurada mas sem conexão (ainda não ligada ou a
+# reconectar) este processo não recebe as escritas dos outros: as caches e
+# versões locais podem estar desatualizadas e não são usadas até reconectar
+_caches_locais_validas = True
+
+def definir_caches_locais_validas(validas: bool) -> None:
+    global _caches_locais_validas
+    _caches_locais_validas = validas
+
+def caches_locais_validas() -> bool:
+    return _caches_locais_validas
+
+# Recursos de configuração com GET condicional; as ETags usam as versões
+# persistidas em versoes_dados com o mesmo nome (ver app/etags.py)
+RECURSO_CATEGORIAS = "categorias"
+RECURSO_PLATAFORMAS = "plataformas"
+RECURSO_MEIOS_PAGAMENTO = "meios_pagamento"
+RECURSO_CONFIGURACAO = "configuracao"
+# Dados do próprio usuário (/auth/me): perfil, senha, último login
+RECURSO_USUARIO = "usuario"
+
+# Recursos só lidos do primário: escrever neles (ex.: o último login) não
+# desvia da réplica as leituras seguintes do usuário
+RECURSOS_SO_PRIMARIO = frozenset({RECURSO_USUARIO})
+
+def segundos_desde_escrita(usuario_id) -> Optional[float]:
+    """Tempo desde a última escrita do usuário conhecida por este processo (None se nenhuma)."""
+    instante = _ultimas_escritas.get(str(usuario_id))
+    return None if instante is None else time.monotonic() - instante
+
+# ==========================
+# Cache do dashboard
+# ==========================
+# Recurso cuja versão muda com qualquer escrita em transações, categorias ou plataformas
+RECURSO_DASHBOARD = "dashboard"
+
+cache_dashboard = CacheTTL(
+    "dashboard",
+    max_itens=get_settings().dashboard_cache_max_itens,
+    ttl=get_settings().dashboard_cache_ttl
+)
+
+def invalidar_dashboard(usuario_id) -> None:
+    incrementar_versao(usuario_id, RECURSO_DASHBOARD)
+
+# ==========================
+# Cache de usuários autenticados
+# ==========================
+# Principais (id, email, nome, ativo) por id de usuário; evitam a query ao
+# usuário em cada pedido autenticado. Invalidados ao alterar perfil, senha
+# ou ao excluir a conta; o TTL limita o atraso noutros processos.
+cache_usuarios = CacheTTL(
+    "usuarios",
+    max_itens=get_settings().usuarios_cache_max_itens,
+    ttl=get_settings().usuarios_cache_ttl
+)
+
+def invalidar_usuario(usuario_id) -> None:
+    cache_usuarios.invalidar(str(usuario_id))
+    incrementar_versao(usuario_id, RECURSO_USUARIO)
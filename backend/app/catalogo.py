@@ -0,0 +1,59 @@
+"""
+Catálogo de países em memória do processo
+
+A tabela paises é semeada por database/schema.sql e populate_countries.py e
+praticamente não muda. O catálogo é lido uma vez (no arranque ou no primeiro
+pedido), serializado para JSON e guardado como bytes imutáveis com a ETag
+respetiva; servir /configuracoes/paises não faz trabalho na base de dados.
+"""
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from app.cache import publicar
+from app.database import AsyncSessionLocal
+from app.models import Pais
+from app.schemas import PaisResponse
+
+_LISTA_PAISES = TypeAdapter(List[PaisResponse])
+
+@dataclass(frozen=True, slots=True)
+class CatalogoPaises:
+    paises: Tuple[PaisResponse, ...]
+    corpo: bytes
+    etag: str
+
+_catalogo: Optional[CatalogoPaises] = None
+_lock = asyncio.Lock()
+
+async def _carregar() -> CatalogoPaises:
+    async with AsyncSessionLocal() as db:
+        linhas = (await db.scalars(select(Pais).where(Pais.ativo == True).order_by(Pais.nome))).all()
+    paises = tuple(PaisResponse.model_validate(linha) for linha in linhas)
+    corpo = _LISTA_PAISES.dump_json(list(paises))
+    etag = '"' + hashlib.sha256(corpo).hexdigest()[:32] + '"'
+    return CatalogoPaises(paises=paises, corpo=corpo, etag=etag)
+
+async def obter_catalogo() -> CatalogoPaises:
+    """Catálogo atual; carregado da base de dados apenas na primeira chamada."""
+    global _catalogo
+    if _catalogo is None:
+        async with _lock:
+            if _catalogo is None:
+                _catalogo = await _carregar()
+    return _catalogo
+
+async def recarregar_catalogo(propagar: bool = True) -> CatalogoPaises:
+    """
+    Relê a tabela paises e troca o catálogo atomicamente; com `propagar` os
+    restantes workers recarregam também (ver app/sincronizacao.py).
+    """
+    global _catalogo
+    async with _lock:
+        _catalogo = await _carregar()
+    if propagar:
+        publicar({"tipo": "catalogo"})
+    return _catalogo
@@ -0,0 +1,141 @@
+"""
+Configuração da aplicação (pydantic-settings)
+
+Lida uma única vez, no primeiro get_settings(), a partir das variáveis de
+ambiente e dos ficheiros .env de backend/:
+  - .env.development e depois .env.production (este com prioridade);
+  - com ENVIRONMENT=development (no ambiente ou no .env.development) o
+    .env.production é ignorado.
+As variáveis de ambiente têm sempre prioridade sobre os ficheiros. Os valores
+não são copiados para os.environ.
+"""
+
+import os
+import secrets
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from dotenv import dotenv_values
+from pydantic import model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+DIRETORIO_BACKEND = Path(__file__).resolve().parent.parent
+ENV_DEVELOPMENT = DIRETORIO_BACKEND / ".env.development"
+ENV_PRODUCTION = DIRETORIO_BACKEND / ".env.production"
+
+class Settings(BaseSettings):
+    # Variáveis vazias (ex.: `WEB_CONCURRENCY=` no .env) valem o valor por omissão
+    model_config = SettingsConfigDict(extra="ignore", env_file_encoding="utf-8", env_ignore_empty=True)
+
+    environment: str = "production"
+
+    # Base de dados
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_user: str = "postgres"
+    db_password: str = ""
+    db_name: str = "app_gesta_db"
+
+    # Pool da API (por worker); ver app/database.py
+    db_conexoes_total: int = 0
+    web_concurrency: int = 1
+    db_pool_size: Optional[int] = None
+    db_max_overflow: Optional[int] = None
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_lifo: bool = True
+    db_pool_pre_ping: bool = False
+    db_pool_aquecer: Optional[int] = None
+
+    # Réplica de leitura opcional (streaming replication); os campos vazios
+    # herdam os valores do primário. Ver sessao_leitura em app/database.py
+    db_replica_host: Optional[str] = None
+    db_replica_port: Optional[int] = None
+    db_replica_user: Optional[str] = None
+    db_replica_password: Optional[str] = None
+    db_replica_name: Optional[str] = None
+    db_replica_atraso_max: float = 5
+    db_replica_janela_escrita: float = 10
+    db_replica_verificacao: float = 1
+    db_replica_pausa: float = 30
+
+    # Segurança
+    secret_key: str = ""
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    admin_token: str = ""
+    senha_hash_workers: int = min(4, os.cpu_count() or 1)
+    senha_hash_fila_max: int = 64
+
+    # HTTP
+    cors_origins: str = "https://app.fluxvision.cloud,https://rotas.fluxvision.cloud"
+    cors_max_age: int = 600
+    compressao_ativa: bool = True
+    compressao_limiar: int = 1024
+    metricas_ativas: bool = True
+    paises_cache_max_age: int = 3600
+
+    # Caches em memória
+    dashboard_cache_max_itens: int = 4096
+    dashboard_cache_ttl: float = 300
+    usuarios_cache_max_itens: int = 10000
+    usuarios_cache_ttl: float = 60
+    # Invalidação das caches entre workers (app/sincronizacao.py); por omissão
+    # ativa quando há mais de um worker
+    cache_sincronizar: Optional[bool] = None
+
+    # True quando a SECRET_KEY não veio da configuração e foi gerada no arranque
+    secret_key_gerada: bool = False
+
+    @model_validator(mode="after")
+    def _normalizar(self):
+        self.admin_token = self.admin_token.strip()
+        if not self.secret_key.strip():
+            self.secret_key = secrets.token_hex(32)
+            self.secret_key_gerada = True
+        return self
+
+    @property
+    def origens_cors(self) -> List[str]:
+        if self.environment == "development":
+            return ["*"]
+        return [origem.strip() for origem in self.cors_origins.split(",") if origem.strip()]
+
+    @property
+    def sincronizar_caches(self) -> bool:
+        if self.cache_sincronizar is not None:
+            return self.cache_sincronizar
+        return self.web_concurrency > 1
+
+    @property
+    def pool(self) -> Tuple[int, int]:
+        """
+        (pool_size, max_overflow) de cada worker. Com DB_CONEXOES_TOTAL (orçamento
+        de conexões de toda a API) o orçamento é dividido pelos workers
+        (WEB_CONCURRENCY): metade fica no pool, metade como overflow.
+        DB_POOL_SIZE / DB_MAX_OVERFLOW fixam os valores diretamente.
+        """
+        if self.db_conexoes_total > 0:
+            por_worker = max(1, self.db_conexoes_total // max(1, self.web_concurrency))
+            pool_size = max(1, por_worker // 2)
+            max_overflow = por_worker - pool_size
+        else:
+            pool_size, max_overflow = 5, 10
+        return (
+            self.db_pool_size if self.db_pool_size is not None else pool_size,
+            self.db_max_overflow if self.db_max_overflow is not None else max_overflow
+        )
+
+def _ficheiros_env() -> Tuple[Path, ...]:
+    ambiente = os.getenv("ENVIRONMENT")
+    if ambiente is None and ENV_DEVELOPMENT.exists():
+        ambiente = dotenv_values(ENV_DEVELOPMENT).get("ENVIRONMENT")
+    if ambiente == "development":
+        return (ENV_DEVELOPMENT,)
+    return (ENV_DEVELOPMENT, ENV_PRODUCTION)
+
+@lru_cache
+def get_settings() -> Settings:
+    # Ficheiros inexistentes são ignorados; os últimos da lista têm prioridade
+    return Settings(_env_file=_ficheiros_env())
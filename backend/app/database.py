@@ -3,79 +3,400 @@
 
 """
 Configuração do banco de dados
+
+Os engines são criados no primeiro uso, não na importação: importar os
+modelos ou a aplicação não carrega drivers nem abre conexões (útil para
+testes e para o arranque dos workers).
 """
 
-import os
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import Engine, URL
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.engine import URL
-from dotenv import load_dotenv
-
-# Carregar variáveis de ambiente baseado na prioridade
-dev_env_path = os.path.join(os.path.dirname(__file__), '..', '.env.development')
-prod_env_path = os.path.join(os.path.dirname(__file__), '..', '.env.production')
-
-# Primeiro carrega development
-if os.path.exists(dev_env_path):
-    load_dotenv(dev_env_path)
-    print(f"✅ Carregado: {dev_env_path}")
-
-# Depois carrega production, mas só sobrescreve se ENVIRONMENT não for development
-if os.path.exists(prod_env_path):
-    # Se ENVIRONMENT já está definido como development, não sobrescrever
-    current_env = os.getenv("ENVIRONMENT")
-    if current_env != "development":
-        load_dotenv(prod_env_path, override=True)
-        print(f"✅ Carregado (prioridade): {prod_env_path}")
-    else:
-        print(f"ℹ️  Mantendo configurações de desenvolvimento, ignorando produção")
-
-# Configurações do banco de dados
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "")
-DB_NAME = os.getenv("DB_NAME", "app_gesta_db")
-ENVIRONMENT = os.getenv("ENVIRONMENT", "production")
-
-print(f"🔧 Configuração do banco:")
-print(f"   Environment: {ENVIRONMENT}")
-print(f"   Host: {DB_HOST}")
-print(f"   Port: {DB_PORT}")
-print(f"   Database: {DB_NAME}")
-print(f"   User: {DB_USER}")
-
-# PostgreSQL URL usando SQLAlchemy URL para melhor tratamento de caracteres especiais
-SQLALCHEMY_DATABASE_URL = URL.create(
-    "postgresql",
-    username=DB_USER,
-    password=DB_PASSWORD,
-    host=DB_HOST,
-    port=int(DB_PORT),
-    database=DB_NAME,
-    query={"client_encoding": "utf8"}
-)
-print(f"🔗 Database URL: postgresql://{DB_USER}:***@{DB_HOST}:{DB_PORT}/{DB_NAME}?client_encoding=utf8")
-
-# Criar engine do SQLAlchemy para PostgreSQL
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    echo=False
-)
-print(f"✅ Engine PostgreSQL criado: {SQLALCHEMY_DATABASE_URL}")
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.cache import segundos_desde_escrita
+from app.config import get_settings
+from app.metricas import registar_query, registar_espera_pool, registar_coletor, valor_metrica
+
+logger = logging.getLogger("gestaSaaS")
+
 Base = declarative_base()
 
-def get_db():
-    """Dependency para obter sessão do banco de dados"""
-    db = SessionLocal()
-    try:
+def url_banco(replica: bool = False) -> URL:
+    """URL PostgreSQL (psycopg2) do primário ou da réplica de leitura."""
+    settings = get_settings()
+    url = URL.create(
+        "postgresql",
+        username=settings.db_user,
+        password=settings.db_password,
+        host=settings.db_host,
+        port=settings.db_port,
+        database=settings.db_name,
+        query={"client_encoding": "utf8"}
+    )
+    if replica:
+        url = url.set(
+            username=settings.db_replica_user or settings.db_user,
+            password=settings.db_replica_password if settings.db_replica_password is not None else settings.db_password,
+            host=settings.db_replica_host,
+            port=settings.db_replica_port or settings.db_port,
+            database=settings.db_replica_name or settings.db_name
+        )
+    return url
+
+# ==========================
+# Engine síncrono (psycopg2)
+# ==========================
+# Usado pelos scripts de linha de comando (populate_countries.py,
+# rebuild_resumo_diario.py, backup.py)
+
+@lru_cache
+def get_engine() -> Engine:
+    return create_engine(
+        url_banco(),
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+        echo=False
+    )
+
+@lru_cache
+def _sessionmaker() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+def SessionLocal() -> Session:
+    """Sessão síncrona para os scripts."""
+    return _sessionmaker()()
+
+# ==========================
+# Pool da API
+# ==========================
+
+class PoolMedido(AsyncAdaptedQueuePool):
+    """Pool da API que regista a espera por uma conexão (checkout) e os timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.esperas = 0
+        self.tempo_espera = 0.0
+        self.timeouts = 0
+        self.invalidacoes = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.esperas += 1
+            self.tempo_espera += duracao
+            registar_espera_pool(duracao)
+
+    def recreate(self):
+        novo = super().recreate()
+        novo.esperas, novo.tempo_espera = self.esperas, self.tempo_espera
+        novo.timeouts, novo.invalidacoes = self.timeouts, self.invalidacoes
+        return novo
+
+# ==========================
+# Engine assíncrono (asyncpg)
+# ==========================
+# Usado pela API, para que as queries não bloqueiem o event loop do uvicorn.
+# O asyncpg já usa UTF-8 e não aceita client_encoding na URL.
+#
+# Tamanho do pool: ver Settings.pool. DB_POOL_LIFO reutiliza sempre as
+# conexões mais recentes; as restantes ficam paradas e são recicladas
+# (DB_POOL_RECYCLE), pelo que o pool encolhe fora das horas de ponta.
+# Sem pre-ping não há um SELECT 1 extra em cada checkout: uma conexão morta
+# falha na primeira query, o SQLAlchemy reconhece o erro de desconexão e
+# invalida essa conexão e todas as que o pool abriu antes dela.
+
+def _criar_async_engine(url: URL, pre_ping: bool) -> AsyncEngine:
+    settings = get_settings()
+    pool_size, max_overflow = settings.pool
+    async_engine = create_async_engine(
+        url.set(drivername="postgresql+asyncpg", query={}),
+        poolclass=PoolMedido,
+        pool_pre_ping=pre_ping,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_use_lifo=settings.db_pool_lifo,
+        echo=False
+    )
+
+    @event.listens_for(async_engine.sync_engine, "handle_error")
+    def _erro_conexao(contexto):
+        if contexto.is_disconnect:
+            async_engine.pool.invalidacoes += 1
+
+    # Número de queries e tempo de DB por pedido (Server-Timing e /metrics).
+    # O início fica no contexto de execução, que é próprio de cada query.
+    if settings.metricas_ativas:
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def _antes_query(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._inicio_query = time.perf_counter()
+
+        @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+        def _depois_query(conn, cursor, statement, parameters, context, executemany):
+            inicio = getattr(context, "_inicio_query", None)
+            if inicio is not None:
+                registar_query(time.perf_counter() - inicio)
+
+    return async_engine
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    async_engine = _criar_async_engine(url_banco(), get_settings().db_pool_pre_ping)
+    if get_settings().metricas_ativas:
+        registar_coletor(_metricas_pool)
+    return async_engine
+
+# expire_on_commit=False: depois do commit os objetos continuam legíveis sem
+# novo acesso à base (em async não há lazy loading implícito)
+@lru_cache
+def _async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Sessão assíncrona fora das rotas (ex.: `async with AsyncSessionLocal() as db`)."""
+    return _async_sessionmaker()()
+
+async def get_db():
+    """Dependency para obter sessão assíncrona do banco de dados"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
+async def fechar_engines() -> None:
+    """Fecha as conexões dos engines já criados (sem criar os que não existem)."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_read_engine.cache_info().currsize and get_read_engine() is not None:
+        await get_read_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+
+def descartar_conexoes_herdadas() -> None:
+    """
+    Depois de um fork (workers do gunicorn com preload_app): esquece as conexões
+    abertas pelo processo pai sem as fechar, porque o socket é partilhado com
+    ele. Cada worker abre as suas conexões no primeiro uso.
+    """
+    if get_async_engine.cache_info().currsize:
+        get_async_engine().sync_engine.dispose(close=False)
+    if get_read_engine.cache_info().currsize and get_read_engine() is not None:
+        get_read_engine().sync_engine.dispose(close=False)
+    if get_engine.cache_info().currsize:
+        get_engine().dispose(close=False)
+
+# ==========================
+# Réplica de leitura
+# ==========================
+# Com DB_REPLICA_HOST, as rotas só de leitura mais pesadas (dashboard,
+# listagem, busca e exportações) usam sessao_leitura / get_read_db, que
+# escolhe a réplica exceto quando:
+#   - o usuário escreveu há menos de DB_REPLICA_JANELA_ESCRITA segundos
+#     (para ler as próprias escritas; a janela nunca é menor que o atraso
+#     máximo aceite);
+#   - o atraso de replicação medido excede DB_REPLICA_ATRASO_MAX segundos;
+#   - a réplica falhou há menos de DB_REPLICA_PAUSA segundos.
+# O atraso é medido no máximo a cada DB_REPLICA_VERIFICACAO segundos, na
+# própria conexão do pedido que encontra a medição expirada.
+
+# Atraso (s) do último replay; 0 se o recetor já aplicou todo o WAL que
+# recebeu; NULL se a réplica nunca aplicou nada e não está ligada ao primário
+SQL_ATRASO_REPLICA = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver)
+             AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+@lru_cache
+def get_read_engine() -> Optional[AsyncEngine]:
+    """Engine da réplica, ou None quando não há réplica configurada."""
+    if not get_settings().db_replica_host:
+        return None
+    # Sempre com pre-ping: uma conexão morta é detetada no checkout, dentro de
+    # sessao_leitura, e o pedido segue para o primário em vez de falhar
+    return _criar_async_engine(url_banco(replica=True), pre_ping=True)
+
+@lru_cache
+def _async_sessionmaker_leitura() -> async_sessionmaker:
+    return async_sessionmaker(get_read_engine(), autoflush=False, expire_on_commit=False)
+
+class EstadoReplica:
+    """Último atraso medido, pausa após falhas e contagem de leituras por destino."""
+
+    def __init__(self):
+        self.atraso: Optional[float] = None
+        self.verificado_em = float("-inf")
+        self.pausada_ate = float("-inf")
+        self.a_verificar = False
+        self.leituras_replica = 0
+        self.leituras_primario = 0
+        self.falhas = 0
+
+    def pausar(self, motivo) -> None:
+        self.falhas += 1
+        self.pausada_ate = time.monotonic() + get_settings().db_replica_pausa
+        logger.warning(f"⚠️  Réplica de leitura indisponível, leituras no primário: {motivo}")
+
+    def aceitavel(self) -> bool:
+        return self.atraso is not None and self.atraso <= get_settings().db_replica_atraso_max
+
+    async def verificar(self, sessao: AsyncSession) -> None:
+        """Mede o atraso na conexão da sessão, se a última medição expirou."""
+        if self.a_verificar or time.monotonic() - self.verificado_em < get_settings().db_replica_verificacao:
+            return
+        self.a_verificar = True
+        try:
+            atraso = (await sessao.execute(SQL_ATRASO_REPLICA)).scalar()
+            self.atraso = None if atraso is None else float(atraso)
+            self.verificado_em = time.monotonic()
+            if not self.aceitavel():
+                logger.warning(f"⚠️  Atraso da réplica de leitura acima do limite: {self.atraso}")
+        finally:
+            self.a_verificar = False
+
+estado_replica = EstadoReplica()
+
+def _usar_replica(usuario_id) -> bool:
+    settings = get_settings()
+    if get_read_engine() is None or time.monotonic() < estado_replica.pausada_ate:
+        return False
+    if usuario_id is not None:
+        desde_escrita = segundos_desde_escrita(usuario_id)
+        janela = max(settings.db_replica_janela_escrita, settings.db_replica_atraso_max)
+        if desde_escrita is not None and desde_escrita < janela:
+            return False
+    # Atraso excessivo: volta a medir quando a medição expirar
+    if estado_replica.atraso is not None and not estado_replica.aceitavel():
+        return time.monotonic() - estado_replica.verificado_em >= settings.db_replica_verificacao
+    return True
+
+@asynccontextmanager
+async def sessao_leitura(usuario_id=None) -> AsyncIterator[AsyncSession]:
+    """
+    Sessão só de leitura: na réplica quando possível (ver acima), senão no
+    primário. A conexão à réplica é obtida antes de a sessão ser entregue,
+    para que uma réplica em baixo resulte numa leitura no primário e não num erro.
+    """
+    if _usar_replica(usuario_id):
+        sessao = _async_sessionmaker_leitura()()
+        try:
+            await sessao.connection()
+            await estado_replica.verificar(sessao)
+        except (OSError, asyncio.TimeoutError, exc.SQLAlchemyError) as e:
+            await sessao.close()
+            estado_replica.pausar(e)
+        else:
+            if estado_replica.aceitavel():
+                estado_replica.leituras_replica += 1
+                try:
+                    yield sessao
+                except exc.DBAPIError as e:
+                    if e.connection_invalidated:
+                        estado_replica.pausar(e)
+                    raise
+                finally:
+                    await sessao.close()
+                return
+            await sessao.close()
+
+    estado_replica.leituras_primario += 1
+    async with AsyncSessionLocal() as sessao:
+        yield sessao
+
+# ==========================
+# Estado do pool
+# ==========================
+
+def estatisticas_pool() -> dict:
+    settings = get_settings()
+    pool = get_async_engine().pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.pool[1],
+        "workers": settings.web_concurrency,
+        "em_uso": pool.checkedout(),
+        "livres": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "esperas": pool.esperas,
+        "tempo_espera_medio_ms": pool.tempo_espera / pool.esperas * 1000 if pool.esperas else 0.0,
+        "timeouts": pool.timeouts,
+        "invalidacoes": pool.invalidacoes
+    }
+
+def estatisticas_replica() -> dict:
+    if get_read_engine() is None:
+        return {"configurada": False}
+    return {
+        "configurada": True,
+        "atraso_s": estado_replica.atraso,
+        "em_pausa": time.monotonic() < estado_replica.pausada_ate,
+        "leituras_replica": estado_replica.leituras_replica,
+        "leituras_primario": estado_replica.leituras_primario,
+        "falhas": estado_replica.falhas,
+        "em_uso": get_read_engine().pool.checkedout()
+    }
+
+def _metricas_pool() -> list:
+    estatisticas = estatisticas_pool()
+    return [
+        *valor_metrica("gestasaas_pool_conexoes_em_uso", "Conexões do pool em uso", "gauge", estatisticas["em_uso"]),
+        *valor_metrica("gestasaas_pool_conexoes_livres", "Conexões abertas e livres no pool", "gauge", estatisticas["livres"]),
+        *valor_metrica("gestasaas_pool_overflow", "Conexões abertas além do pool_size", "gauge", estatisticas["overflow"]),
+        *valor_metrica("gestasaas_pool_timeouts_total", "Checkouts que excederam DB_POOL_TIMEOUT", "counter", estatisticas["timeouts"]),
+        *valor_metrica("gestasaas_pool_invalidacoes_total", "Erros de desconexão que invalidaram o pool", "counter", estatisticas["invalidacoes"]),
+        *_metricas_replica()
+    ]
+
+def _metricas_replica() -> list:
+    if get_read_engine() is None:
+        return []
+    return [
+        *valor_metrica("gestasaas_replica_atraso_segundos", "Último atraso de replicação medido na réplica de leitura", "gauge",
+                       estado_replica.atraso if estado_replica.atraso is not None else float("nan")),
+        *valor_metrica("gestasaas_leituras_replica_total", "Sessões de leitura servidas pela réplica", "counter", estado_replica.leituras_replica),
+        *valor_metrica("gestasaas_leituras_primario_total", "Sessões de leitura servidas pelo primário", "counter", estado_replica.leituras_primario),
+        *valor_metrica("gestasaas_replica_falhas_total", "Falhas da réplica que desviaram leituras para o primário", "counter", estado_replica.falhas),
+    ]
+
+async def aquecer_pool() -> None:
+    """
+    Abre DB_POOL_AQUECER conexões (por omissão, o pool_size) em paralelo e
+    devolve-as ao pool, para que os primeiros pedidos não paguem o connect.
+    Avisa se o pool de todos os workers pode exceder o max_connections do Postgres.
+    """
+    settings = get_settings()
+    pool_size, max_overflow = settings.pool
+    quantidade = min(settings.db_pool_aquecer if settings.db_pool_aquecer is not None else pool_size, pool_size)
+    if quantidade <= 0:
+        return
+    async_engine = get_async_engine()
+    conexoes = await asyncio.gather(*(async_engine.connect() for _ in range(quantidade)))
+    try:
+        max_connections = int((await conexoes[0].exec_driver_sql("SHOW max_connections")).scalar())
+    finally:
+        for conexao in conexoes:
+            await conexao.close()
+    maximo_api = (pool_size + max_overflow) * settings.web_concurrency
+    if maximo_api > max_connections:
+        logger.warning(
+            f"⚠️  Pool de {settings.web_concurrency} worker(s) pode abrir {maximo_api} conexões; max_connections={max_connections}"
+        )
@@ -0,0 +1,172 @@
+"""
+Agregações de transações reutilizáveis pelos endpoints
+
+Os totais leem de resumo_diario (um registo por usuário/dia/tipo/categoria/
+plataforma, mantido por trigger), nunca das transações individuais; os
+resumos por categoria e plataforma juntam-lhe o resumo_mensal.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from sqlalchemy import select, func, and_, or_, cast, literal_column, union_all, Date, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Transacao, ResumoDiario, ResumoMensal
+from app.projecoes import selecionar_transacoes, transacao_para_dict
+from app.periodos import (
+    GRANULARIDADES, filtro_periodo, intervalo_mes, dividir_em_meses,
+    inicio_do_periodo, deslocar_periodo
+)
+
+# Receitas contam o valor mais a gorjeta; despesas apenas o valor
+VALOR_RECEITA = ResumoDiario.valor + ResumoDiario.gorjeta
+
+def _soma(expressao, *condicoes):
+    """SUM com FILTER (WHERE ...) devolvendo 0 quando não há linhas."""
+    soma = func.sum(expressao)
+    if condicoes:
+        soma = soma.filter(and_(*condicoes))
+    return func.coalesce(soma, 0)
+
+async def calcular_estatisticas(
+    db: AsyncSession,
+    usuario_id,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    referencia: Optional[date] = None
+) -> dict:
+    """
+    Calcula todos os totais do dashboard numa única passagem sobre o
+    resumo diário do usuário, usando agregados condicionais.
+
+    Os totais gerais respeitam data_inicio/data_fim; os totais do mês
+    consideram sempre o mês de `referencia` (hoje, por omissão).
+    """
+    referencia = referencia or date.today()
+
+    periodo = filtro_periodo(ResumoDiario.data, data_inicio, data_fim)
+    mes_atual = filtro_periodo(ResumoDiario.data, *intervalo_mes(referencia))
+
+    e_receita = ResumoDiario.tipo == 'receita'
+    e_despesa = ResumoDiario.tipo == 'despesa'
+
+    query = select(
+        _soma(VALOR_RECEITA, e_receita, *periodo).label('receitas_total'),
+        _soma(ResumoDiario.valor, e_despesa, *periodo).label('despesas_total'),
+        _soma(ResumoDiario.km_percorridos, *periodo).label('km_total'),
+        _soma(ResumoDiario.km_percorridos, *mes_atual).label('km_mes'),
+        _soma(VALOR_RECEITA, e_receita, *mes_atual).label('receitas_mes'),
+        _soma(ResumoDiario.valor, e_despesa, *mes_atual).label('despesas_mes')
+    ).where(ResumoDiario.usuario_id == usuario_id)
+
+    # Só precisamos dos dias do período pedido ou do mês corrente
+    if periodo:
+        query = query.where(or_(and_(*periodo), and_(*mes_atual)))
+
+    totais = (await db.execute(query)).one()
+
+    receitas_total = Decimal(totais.receitas_total)
+    despesas_total = Decimal(totais.despesas_total)
+    km_total = Decimal(totais.km_total)
+
+    # Valor por KM usa o KM de todo o período para um cálculo mais preciso
+    valor_por_km = receitas_total / km_total if km_total > 0 else Decimal('0')
+
+    return {
+        "total_receitas": receitas_total,
+        "total_despesas": despesas_total,
+        "saldo": receitas_total - despesas_total,
+        "total_km": Decimal(totais.km_mes),
+        "valor_por_km": valor_por_km,
+        "receitas_mes_atual": Decimal(totais.receitas_mes),
+        "despesas_mes_atual": Decimal(totais.despesas_mes)
+    }
+
+async def obter_transacoes_recentes(db: AsyncSession, usuario_id, limite: int = 5):
+    """Últimas transações criadas pelo usuário, como dicts no formato de TransacaoResponse."""
+    linhas = (await db.execute(selecionar_transacoes(
+        Transacao.usuario_id == usuario_id
+    ).order_by(Transacao.created_at.desc()).limit(limite))).all()
+    return [transacao_para_dict(linha) for linha in linhas]
+
+# ==========================
+# Totais de um período arbitrário
+# ==========================
+def totais_periodo(usuario_id, tipo: str, data_inicio: Optional[date] = None, data_fim: Optional[date] = None):
+    """
+    Subquery com as linhas de resumo (categoria_id, plataforma_id, valor,
+    gorjeta, km_percorridos, quantidade) que cobrem exatamente o período: os
+    meses inteiros vêm do resumo_mensal e os dias dos meses das pontas do
+    resumo_diario. Agrupar e somar por cima dá os mesmos totais que o
+    resumo_diario, lendo no máximo ~60 dias de linhas diárias.
+    """
+    def colunas(tabela):
+        return select(
+            tabela.categoria_id, tabela.plataforma_id, tabela.valor,
+            tabela.gorjeta, tabela.km_percorridos, tabela.quantidade
+        ).where(tabela.usuario_id == usuario_id, tabela.tipo == tipo)
+
+    meses, pontas = dividir_em_meses(data_inicio, data_fim)
+    partes = []
+    if meses:
+        primeiro, seguinte = meses
+        consulta = colunas(ResumoMensal)
+        if primeiro:
+            consulta = consulta.where(ResumoMensal.mes >= primeiro)
+        if seguinte:
+            consulta = consulta.where(ResumoMensal.mes < seguinte)
+        partes.append(consulta)
+    for inicio, fim in pontas:
+        partes.append(colunas(ResumoDiario).where(*filtro_periodo(ResumoDiario.data, inicio, fim)))
+    return (partes[0] if len(partes) == 1 else union_all(*partes)).subquery("resumo")
+
+# ==========================
+# Série temporal
+# ==========================
+async def calcular_serie_temporal(
+    db: AsyncSession,
+    usuario_id,
+    granularidade: str,
+    data_inicio: date,
+    data_fim: date
+) -> List[dict]:
+    """
+    Receitas, despesas, saldo e KM por balde entre data_inicio e data_fim,
+    numa única query agrupada por date_trunc. Baldes sem transações são
+    preenchidos com zeros.
+    """
+    campo = GRANULARIDADES[granularidade]
+    primeiro = inicio_do_periodo(data_inicio, granularidade)
+
+    # date_trunc sobre date devolve timestamptz; o cast evita depender do fuso da sessão.
+    # O campo vai literal (vem da lista fechada acima) para o GROUP BY casar com o SELECT.
+    balde = cast(func.date_trunc(literal_column(f"'{campo}'"), cast(ResumoDiario.data, DateTime)), Date).label('balde')
+
+    linhas = (await db.execute(select(
+        balde,
+        _soma(VALOR_RECEITA, ResumoDiario.tipo == 'receita').label('receitas'),
+        _soma(ResumoDiario.valor, ResumoDiario.tipo == 'despesa').label('despesas'),
+        _soma(ResumoDiario.km_percorridos).label('km')
+    ).where(
+        ResumoDiario.usuario_id == usuario_id,
+        *filtro_periodo(ResumoDiario.data, primeiro, data_fim)
+    ).group_by(balde))).all()
+
+    por_balde = {linha.balde: linha for linha in linhas}
+
+    serie = []
+    atual = primeiro
+    while atual <= data_fim:
+        linha = por_balde.get(atual)
+        receitas = float(linha.receitas) if linha else 0.0
+        despesas = float(linha.despesas) if linha else 0.0
+        serie.append({
+            "periodo": atual,
+            "receitas": receitas,
+            "despesas": despesas,
+            "saldo": receitas - despesas,
+            "km_total": float(linha.km) if linha else 0.0
+        })
+        atual = deslocar_periodo(atual, granularidade)
+
+    return serie
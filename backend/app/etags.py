@@ -0,0 +1,66 @@
+"""
+GET condicional (ETag / If-None-Match) para recursos com versão por usuário
+"""
+
+import hashlib
+from typing import Awaitable, Callable, Optional
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth import get_current_principal, UsuarioPrincipal
+from app.cache import caches_locais_validas
+from app.database import get_db
+from app.models import VersaoDados
+
+# O navegador guarda a resposta mas revalida sempre com If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: ignora o prefixo W/ (as respostas
+    # comprimidas levam a ETag fraca; ver app/middleware.py)
+    candidatas = (valor.strip() for valor in if_none_match.split(","))
+    return any(candidata.removeprefix("W/") == etag for candidata in candidatas)
+
+async def etag_recurso(db: AsyncSession, usuario_id, *recursos: str, extra: str = "") -> str:
+    """
+    ETag forte para o estado atual dos recursos do usuário, a partir das
+    versões persistidas em versoes_dados (iguais em todos os workers; um
+    recurso nunca escrito tem versão 0). `extra` entra no hash para estado
+    que não tem versão por usuário (ex.: catálogo de países).
+    """
+    linhas = await db.execute(
+        select(VersaoDados.recurso, VersaoDados.versao)
+        .where(VersaoDados.usuario_id == usuario_id, VersaoDados.recurso.in_(recursos))
+    )
+    versoes = dict(linhas.all())
+    base = ":".join([str(usuario_id)] + [f"{recurso}={versoes.get(recurso, 0)}" for recurso in recursos] + [extra])
+    return '"' + hashlib.blake2s(base.encode(), digest_size=12).hexdigest() + '"'
+
+def condicional(*recursos: str, complemento: Optional[Callable[[], Awaitable[str]]] = None):
+    """
+    Dependência de rota: calcula a ETag a partir das versões dos recursos e,
+    se o cliente já a tem, responde 304 antes de o endpoint correr (uma
+    consulta pela chave primária em vez das tabelas e da serialização). Caso
+    contrário acrescenta a ETag à resposta. `complemento` devolve estado
+    partilhado que também entra na ETag (ver etag_recurso). Sem
+    sincronização entre workers o catálogo local pode estar atrasado e nunca
+    se responde 304.
+    """
+    async def verificar(
+        request: Request,
+        response: Response,
+        current_user: UsuarioPrincipal = Depends(get_current_principal),
+        db: AsyncSession = Depends(get_db)
+    ):
+        extra = await complemento() if complemento else ""
+        etag = await etag_recurso(db, current_user.id, *recursos, extra=extra)
+        if caches_locais_validas() and etag_corresponde(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+
+    return verificar
@@ -0,0 +1,233 @@
+"""
+Geradores de exportação em streaming (CSV, XLSX e NDJSON)
+
+Cada gerador recebe os nomes das colunas e um iterável assíncrono de linhas
+(tuplas) e devolve blocos de bytes à medida que as linhas chegam, sem nunca
+montar o ficheiro inteiro em memória.
+"""
+
+import csv
+import io
+import json
+import re
+import uuid
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import AsyncIterable, AsyncIterator, Sequence
+from xml.sax.saxutils import escape
+from fastapi.responses import StreamingResponse
+from app.database import sessao_leitura
+
+# Tamanho aproximado de cada bloco enviado ao cliente
+TAMANHO_BLOCO = 64 * 1024
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ndjson": "application/x-ndjson"
+}
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    return str(valor)
+
+# Texto do usuário que comece por um destes caracteres seria interpretado como
+# fórmula pelo Excel/LibreOffice (injeção de fórmulas): prefixado com '
+_INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+def _texto_planilha(valor) -> str:
+    """_texto para células de CSV/XLSX; números e datas não são alterados."""
+    texto = _texto(valor)
+    if isinstance(valor, str) and texto.startswith(_INICIO_FORMULA):
+        return "'" + texto
+    return texto
+
+# ==========================
+# CSV
+# ==========================
+async def gerar_csv(colunas: Sequence[str], linhas: AsyncIterable[Sequence]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # BOM para o Excel reconhecer UTF-8
+    buffer.write("\ufeff")
+    escritor.writerow(colunas)
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    async for linha in linhas:
+        escritor.writerow([_texto_planilha(valor) for valor in linha])
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+# ==========================
+# NDJSON
+# ==========================
+def _json_padrao(valor):
+    # Decimal como string, sem perder precisão (como RespostaJSON e backup.py)
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    if isinstance(valor, uuid.UUID):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+async def gerar_ndjson(colunas: Sequence[str], linhas: AsyncIterable[Sequence]) -> AsyncIterator[bytes]:
+    partes = []
+    tamanho = 0
+    async for linha in linhas:
+        registo = json.dumps(dict(zip(colunas, linha)), default=_json_padrao, ensure_ascii=False) + "\n"
+        partes.append(registo)
+        tamanho += len(registo)
+        if tamanho >= TAMANHO_BLOCO:
+            yield "".join(partes).encode("utf-8")
+            partes = []
+            tamanho = 0
+
+    if partes:
+        yield "".join(partes).encode("utf-8")
+
+# ==========================
+# XLSX
+# ==========================
+class _SaidaZip(io.RawIOBase):
+    """Destino não posicionável para o ZipFile: acumula bytes até serem recolhidos."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def recolher(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+# Caracteres de controlo não são permitidos em XML 1.0
+_XML_INVALIDO = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _celula(valor) -> str:
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f"<c><v>{valor}</v></c>"
+    texto = escape(_XML_INVALIDO.sub("", _texto_planilha(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+def _linha_xml(valores: Sequence) -> str:
+    return "<row>" + "".join(_celula(valor) for valor in valores) + "</row>"
+
+async def gerar_xlsx(colunas: Sequence[str], linhas: AsyncIterable[Sequence], nome_folha: str = "Dados") -> AsyncIterator[bytes]:
+    """
+    Escreve um XLSX mínimo (uma folha, strings inline) diretamente num ZIP em
+    streaming; o ZipFile usa data descriptors porque o destino não é posicionável.
+    """
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        arquivo.writestr("_rels/.rels", _XLSX_RELS)
+        arquivo.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(nome_folha)}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+        arquivo.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+
+        with arquivo.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as folha:
+            folha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            folha.write(_linha_xml(colunas).encode("utf-8"))
+            yield saida.recolher()
+
+            partes = []
+            tamanho = 0
+            async for linha in linhas:
+                xml = _linha_xml(linha)
+                partes.append(xml)
+                tamanho += len(xml)
+                if tamanho >= TAMANHO_BLOCO:
+                    folha.write("".join(partes).encode("utf-8"))
+                    partes = []
+                    tamanho = 0
+                    dados = saida.recolher()
+                    if dados:
+                        yield dados
+
+            if partes:
+                folha.write("".join(partes).encode("utf-8"))
+            folha.write(b"</sheetData></worksheet>")
+
+    yield saida.recolher()
+
+GERADORES = {
+    "csv": gerar_csv,
+    "xlsx": gerar_xlsx,
+    "ndjson": gerar_ndjson
+}
+
+# ==========================
+# Resposta HTTP
+# ==========================
+async def linhas_em_streaming(consulta, usuario_id=None, tamanho_lote: int = 1000) -> AsyncIterator[tuple]:
+    """
+    Executa uma consulta Core num cursor do lado do servidor (yield_per), sem
+    identity map do ORM, e devolve as linhas uma a uma. Usa a sua própria sessão
+    de leitura (réplica, se disponível para o usuário), porque o corpo da
+    resposta é gerado depois de o endpoint retornar.
+    """
+    async with sessao_leitura(usuario_id) as db:
+        resultado = await db.stream(consulta.execution_options(yield_per=tamanho_lote))
+        async for linha in resultado:
+            yield tuple(linha)
+
+def resposta_exportacao(formato: str, nome_arquivo: str, colunas: Sequence[str], consulta, usuario_id=None) -> StreamingResponse:
+    gerador = GERADORES[formato](colunas, linhas_em_streaming(consulta, usuario_id))
+    return StreamingResponse(
+        gerador,
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.{formato}"'}
+    )
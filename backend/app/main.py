@@ -1,152 +1,112 @@
-from fastapi import FastAPI, Request, Response
-from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.routers import auth, dashboard, transacoes, configuracoes
-import os
-import signal
+from fastapi import Depends, FastAPI
+from app.routers import auth, dashboard, transacoes, configuracoes, relatorios, bootstrap
+from app.cache import cache_dashboard, cache_usuarios
+from app.config import get_settings
+from app.middleware import CORSSegurancaMiddleware
+from app.metricas import MetricasMiddleware, exportar_metricas
+from app.database import aquecer_pool, estatisticas_pool, estatisticas_replica, fechar_engines
+from app.auth import pool_senhas, verificar_admin
+from app.catalogo import obter_catalogo
+from app.sincronizacao import sincronizador
+import time
 import asyncio
 import logging
-from dotenv import load_dotenv
-from pathlib import Path
+from fastapi.responses import PlainTextResponse
 
 # ==============================
 # Inicialização e Logging
 # ==============================
 
-# 🔧 Carrega o arquivo .env.production de forma absoluta e segura
-env_path = Path(__file__).resolve().parent.parent / ".env.production"
-if env_path.exists():
-    load_dotenv(dotenv_path=env_path)
-    print(f"🔧 ENV carregado com sucesso: {os.getenv('DB_HOST')} | {os.getenv('DB_NAME')}")
-else:
-    print(f"⚠️  Arquivo .env.production não encontrado em: {env_path}")
-
 # Configuração básica de logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("gestaSaaS")
 
-# ==============================
-# Inicialização do FastAPI
-# ==============================
-app = FastAPI(
-    title="gestaSaaS API",
-    description="API para gestão financeira inteligente",
-    version="1.0.0"
-)
-
 # ==============================
 # Controle de desligamento suave (graceful shutdown)
 # ==============================
 shutdown_event = asyncio.Event()
 
-@app.on_event("startup")
 async def startup_event():
+    settings = get_settings()
     logger.info("🚀 Iniciando gestaSaaS API...")
+    logger.info(
+        f"🔧 Environment: {settings.environment} | DB: {settings.db_host}:{settings.db_port}/{settings.db_name} "
+        f"(usuário {settings.db_user}) | CORS: {settings.origens_cors}"
+    )
+    if settings.db_replica_host:
+        logger.info(f"📖 Réplica de leitura: {settings.db_replica_host}:{settings.db_replica_port or settings.db_port}")
+    if settings.secret_key_gerada:
+        logger.warning("⚠️  SECRET_KEY ausente no ambiente — chave temporária gerada automaticamente.")
+
+    # Conexões abertas antes do primeiro pedido (o engine é criado aqui)
+    try:
+        await aquecer_pool()
+        logger.info(f"🔌 Pool de conexões: {estatisticas_pool()}")
+    except Exception as e:
+        logger.warning(f"⚠️  Pool de conexões não aquecido no arranque: {e}")
 
-    # ✅ Loga a conexão do DB para verificar se as variáveis estão corretas
-    db_host = os.getenv("DB_HOST")
-    db_name = os.getenv("DB_NAME")
-    if not db_host or not db_name:
-        logger.warning("⚠️  Variáveis de ambiente do banco ausentes ou não carregadas.")
-    else:
-        logger.info(f"✅ DB conectado em: {db_host} | {db_name}")
+    # Catálogo de países pré-serializado; se falhar aqui é carregado no primeiro pedido
+    try:
+        catalogo = await obter_catalogo()
+        logger.info(f"🌍 Catálogo de países carregado: {len(catalogo.paises)} países")
+    except Exception as e:
+        logger.warning(f"⚠️  Catálogo de países não carregado no arranque: {e}")
+
+    # Com vários workers, as escritas invalidam as caches dos restantes
+    if settings.sincronizar_caches:
+        if await sincronizador.iniciar():
+            logger.info("🔗 Sincronização de caches entre workers ativa")
 
     logger.info("✅ Aplicação iniciada com sucesso!")
 
-@app.on_event("shutdown")
 async def shutdown_event_handler():
+    # Corre depois de o servidor deixar de aceitar conexões e de os pedidos em
+    # curso terminarem (ou de esgotado o timeout_graceful_shutdown do uvicorn):
+    # já nenhuma conexão do pool está em uso quando os engines são fechados
     logger.info("🛑 Iniciando shutdown graceful...")
     shutdown_event.set()
-    await asyncio.sleep(2)
+    await sincronizador.parar()
+    await fechar_engines()
+    pool_senhas.encerrar()
     logger.info("✅ Shutdown concluído com sucesso!")
 
-# ==============================
-# Configuração de CORS
-# ==============================
-cors_origins_str = os.getenv(
-    "CORS_ORIGINS",
-    "https://app.fluxvision.cloud,https://rotas.fluxvision.cloud"
-)
-cors_origins = [o.strip() for o in cors_origins_str.split(",") if o.strip()]
-
-environment = os.getenv("ENVIRONMENT", "production")
-if environment == "development":
-    cors_origins = ["*"]
-
-print(f"Environment: {environment}")
-print(f"CORS Origins: {cors_origins}")
-
-# Middleware padrão de CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=cors_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# ==============================
-# Middleware customizado para CORS dinâmico
-# ==============================
-class CORSOptionsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Trata manualmente requisições OPTIONS (pré-flight)
-        if request.method == "OPTIONS":
-            response = Response()
-            origin = request.headers.get("Origin", "*")
-            req_headers = request.headers.get("Access-Control-Request-Headers", "*")
-
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-            response.headers["Access-Control-Allow-Headers"] = req_headers
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            return response
-
-        # Adiciona o cabeçalho em todas as respostas
-        response = await call_next(request)
-        origin = request.headers.get("Origin", "*")
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Vary"] = "Origin"
-        
-        # Headers de segurança para evitar Mixed Content
-        response.headers["Content-Security-Policy"] = "upgrade-insecure-requests"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        return response
-
-app.add_middleware(CORSOptionsMiddleware)
-
-# ==============================
-# Rotas da aplicação
-# ==============================
-app.include_router(auth.router, prefix="/api")
-app.include_router(dashboard.router, prefix="/api")
-app.include_router(transacoes.router, prefix="/api")
-app.include_router(configuracoes.router, prefix="/api")
-
 # ==============================
 # Rotas básicas
 # ==============================
-@app.get("/")
 async def root():
     return {"message": "gestaSaaS API - Gestão Inteligente"}
 
-@app.get("/health")
+async def metricas():
+    """Métricas no formato de texto do Prometheus (deste worker; requer X-Admin-Token)"""
+    return PlainTextResponse(exportar_metricas(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 async def health_check():
     """
-    Health check endpoint otimizado para evitar reinicializações
+    Health check endpoint otimizado para evitar reinicializações.
+    Só o estado do processo (liveness): os detalhes internos estão em /health/detalhes.
     """
+    return {
+        "status": "healthy",
+        "service": "gestaSaaS API",
+        "timestamp": int(time.time()),
+        "version": "1.0.0"
+    }
+
+async def health_detalhes():
+    """Estado das caches, pools, réplica e sincronização deste worker (requer X-Admin-Token)"""
     try:
-        import time
         return {
             "status": "healthy",
             "service": "gestaSaaS API",
             "timestamp": int(time.time()),
-            "environment": os.getenv("ENVIRONMENT", "development"),
-            "version": "1.0.0"
+            "environment": get_settings().environment,
+            "version": "1.0.0",
+            "cache_dashboard": cache_dashboard.estatisticas(),
+            "cache_usuarios": cache_usuarios.estatisticas(),
+            "pool_senhas": pool_senhas.estatisticas(),
+            "pool_db": estatisticas_pool(),
+            "replica_db": estatisticas_replica(),
+            "sincronizacao_caches": sincronizador.estatisticas()
         }
     except Exception as e:
         logger.error(f"Health check falhou: {e}")
@@ -155,3 +115,53 @@ async def health_check():
             "service": "gestaSaaS API",
             "error": str(e)
         }
+
+# ==============================
+# Inicialização do FastAPI
+# ==============================
+def create_app() -> FastAPI:
+    """
+    Monta a aplicação a partir de get_settings(). Não abre conexões: o engine
+    é criado no arranque (startup) ou no primeiro pedido que usa a base de dados.
+    """
+    settings = get_settings()
+    app = FastAPI(
+        title="gestaSaaS API",
+        description="API para gestão financeira inteligente",
+        version="1.0.0"
+    )
+    app.on_event("startup")(startup_event)
+    app.on_event("shutdown")(shutdown_event_handler)
+
+    # CORS, headers de segurança e compressão num único middleware ASGI
+    app.add_middleware(
+        CORSSegurancaMiddleware,
+        origens=settings.origens_cors,
+        max_age=settings.cors_max_age,
+        comprimir=settings.compressao_ativa,
+        limiar_compressao=settings.compressao_limiar
+    )
+
+    # Histogramas por rota e Server-Timing (só com X-Admin-Token); adicionado por
+    # último para ser o middleware mais externo e medir também CORS e compressão
+    if settings.metricas_ativas:
+        app.add_middleware(MetricasMiddleware, token_admin=settings.admin_token)
+
+    # Rotas da aplicação
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(dashboard.router, prefix="/api")
+    app.include_router(transacoes.router, prefix="/api")
+    app.include_router(configuracoes.router, prefix="/api")
+    app.include_router(relatorios.router, prefix="/api")
+    app.include_router(bootstrap.router, prefix="/api")
+
+    app.add_api_route("/", root, methods=["GET"])
+    # /metrics e os detalhes do health expõem o estado interno: só com ADMIN_TOKEN
+    if settings.metricas_ativas:
+        app.add_api_route("/metrics", metricas, methods=["GET"], include_in_schema=False, dependencies=[Depends(verificar_admin)])
+    app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_api_route("/health/detalhes", health_detalhes, methods=["GET"], include_in_schema=False, dependencies=[Depends(verificar_admin)])
+    return app
+
+# `uvicorn app.main:app` (ou `uvicorn --factory app.main:create_app`)
+app = create_app()
@@ -0,0 +1,223 @@
+"""
+Métricas por pedido (queries, tempo de base de dados, espera pelo pool) e
+exposição no formato de texto do Prometheus
+
+Os hooks do engine (app/database.py) somam na medição do pedido atual, que
+vive numa ContextVar; o MetricasMiddleware cria a medição, devolve-a no header
+Server-Timing e, no fim do pedido, alimenta os histogramas por rota.
+Os valores são do processo: com vários workers cada um expõe os seus.
+"""
+
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# ==========================
+# Medição do pedido atual
+# ==========================
+
+@dataclass(slots=True)
+class MedicaoPedido:
+    queries: int = 0
+    tempo_db: float = 0.0
+    espera_pool: float = 0.0
+
+# Objeto mutável: o SQLAlchemy corre os hooks numa greenlet que partilha o
+# contexto da tarefa do pedido, pelo que as somas chegam ao middleware
+_medicao_atual: ContextVar[Optional[MedicaoPedido]] = ContextVar("medicao_pedido", default=None)
+
+def registar_query(duracao: float) -> None:
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.queries += 1
+        medicao.tempo_db += duracao
+
+def registar_espera_pool(duracao: float) -> None:
+    pool_espera.observar(duracao)
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.espera_pool += duracao
+
+# ==========================
+# Histogramas
+# ==========================
+
+class Histograma:
+    """Histograma cumulativo com etiquetas, no formato de texto do Prometheus."""
+
+    def __init__(self, nome: str, ajuda: str, limites: Sequence[float], etiquetas: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.limites = tuple(limites)
+        self.etiquetas = tuple(etiquetas)
+        # valores das etiquetas -> [contagem por limite..., +Inf], soma
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_etiquetas: str) -> None:
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = ([0] * (len(self.limites) + 1), [0.0])
+            contagens, soma = serie
+            for indice, limite in enumerate(self.limites):
+                if valor <= limite:
+                    contagens[indice] += 1
+                    break
+            else:
+                contagens[-1] += 1
+            soma[0] += valor
+
+    def exportar(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = [(chave, list(contagens), soma[0]) for chave, (contagens, soma) in self._series.items()]
+        for valores, contagens, soma in sorted(series):
+            etiquetas = ",".join(
+                f'{nome}="{_escapar(valor)}"' for nome, valor in zip(self.etiquetas, valores)
+            )
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float("inf"),), contagens):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else repr(float(limite))
+                linhas.append(f'{self.nome}_bucket{{{etiquetas}{"," if etiquetas else ""}le="{le}"}} {acumulado}')
+            sufixo = f"{{{etiquetas}}}" if etiquetas else ""
+            linhas.append(f"{self.nome}_sum{sufixo} {soma}")
+            linhas.append(f"{self.nome}_count{sufixo} {acumulado}")
+        return linhas
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+ETIQUETAS_ROTA = ("metodo", "rota", "status")
+
+pedido_duracao = Histograma(
+    "gestasaas_pedido_duracao_segundos", "Duração dos pedidos HTTP por rota",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), ETIQUETAS_ROTA
+)
+pedido_queries = Histograma(
+    "gestasaas_pedido_queries", "Queries SQL executadas por pedido",
+    (0, 1, 2, 3, 5, 8, 13, 21, 50, 100), ETIQUETAS_ROTA
+)
+pedido_tempo_db = Histograma(
+    "gestasaas_pedido_db_segundos", "Tempo em queries SQL por pedido",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5), ETIQUETAS_ROTA
+)
+pool_espera = Histograma(
+    "gestasaas_pool_espera_segundos", "Espera por uma conexão do pool (checkout)",
+    (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+
+HISTOGRAMAS = (pedido_duracao, pedido_queries, pedido_tempo_db, pool_espera)
+
+# Funções que devolvem linhas de métricas calculadas no momento da recolha
+# (ex.: estado do pool em app/database.py)
+_coletores: List[Callable[[], List[str]]] = []
+
+def registar_coletor(coletor: Callable[[], List[str]]) -> None:
+    if coletor not in _coletores:
+        _coletores.append(coletor)
+
+def valor_metrica(nome: str, ajuda: str, tipo: str, valor: float) -> List[str]:
+    """Linhas de uma métrica sem etiquetas (gauge ou counter)."""
+    return [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}", f"{nome} {valor}"]
+
+def exportar_metricas() -> str:
+    linhas: List[str] = []
+    for histograma in HISTOGRAMAS:
+        linhas.extend(histograma.exportar())
+    for coletor in _coletores:
+        linhas.extend(coletor())
+    return "\n".join(linhas) + "\n"
+
+# ==========================
+# Middleware
+# ==========================
+
+# Pedidos sem rota (404) agrupados numa só série para limitar a cardinalidade
+ROTA_DESCONHECIDA = "desconhecida"
+
+# O método vem do cliente: fora destes conta como OTHER (uma série só)
+METODOS_CONHECIDOS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+METODO_OUTRO = "OTHER"
+
+def _metodo(scope) -> str:
+    metodo = scope["method"]
+    return metodo if metodo in METODOS_CONHECIDOS else METODO_OUTRO
+
+def _rota(scope) -> str:
+    """Template do caminho da rota que atendeu o pedido, com o prefixo do router."""
+    rota = scope.get("route")
+    regex = getattr(rota, "path_regex", None)
+    if regex is None:
+        return ROTA_DESCONHECIDA
+    # Em versões recentes do FastAPI a rota de um router incluído guarda o
+    # caminho sem o prefixo (/transacoes/{transacao_id} servido em /api/...):
+    # o prefixo é a parte do caminho antes do troço que a rota reconhece
+    caminho = scope["path"]
+    inicio = 0
+    while inicio != -1:
+        if regex.match(caminho[inicio:]):
+            return caminho[:inicio] + rota.path
+        inicio = caminho.find("/", inicio + 1)
+    return rota.path
+
+class MetricasMiddleware:
+    """
+    Mede cada pedido HTTP: regista duração, número de queries e tempo de DB
+    por rota (o template do caminho, ex. /api/transacoes/{transacao_id}, nunca
+    o caminho concreto) e acrescenta Server-Timing (db, pool, app) à resposta,
+    mas só a pedidos com o X-Admin-Token correto: como /metrics, expõe o
+    funcionamento interno.
+    """
+
+    def __init__(self, app, token_admin: str = ""):
+        self.app = app
+        self.token_admin = token_admin.encode()
+
+    def _pode_ver_tempos(self, scope) -> bool:
+        if not self.token_admin:
+            return False
+        for chave, valor in scope["headers"]:
+            if chave == b"x-admin-token":
+                return secrets.compare_digest(valor, self.token_admin)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = MedicaoPedido()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        status = 500
+        com_tempos = self._pode_ver_tempos(scope)
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            if mensagem["type"] == "http.response.start" and com_tempos:
+                app_ms = (time.perf_counter() - inicio) * 1000
+                server_timing = (
+                    f'db;dur={medicao.tempo_db * 1000:.1f};desc="{medicao.queries} queries", '
+                    f"pool;dur={medicao.espera_pool * 1000:.1f}, app;dur={app_ms:.1f}"
+                )
+                mensagem = {
+                    **mensagem,
+                    "headers": list(mensagem.get("headers", [])) + [(b"server-timing", server_timing.encode())]
+                }
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicao_atual.reset(token)
+            etiquetas = (_metodo(scope), _rota(scope), str(status))
+            pedido_duracao.observar(time.perf_counter() - inicio, *etiquetas)
+            pedido_queries.observar(medicao.queries, *etiquetas)
+            pedido_tempo_db.observar(medicao.tempo_db, *etiquetas)
@@ -0,0 +1,173 @@
+"""
+Middleware ASGI de CORS, headers de segurança e compressão
+
+Substitui o par CORSMiddleware + CORSOptionsMiddleware (BaseHTTPMiddleware):
+trabalha diretamente sobre as mensagens ASGI, sem tarefas nem streams extra,
+e todos os headers fixos são calculados uma única vez no arranque.
+"""
+
+import gzip
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # compressão br é opcional
+    brotli = None
+
+Cabecalhos = List[Tuple[bytes, bytes]]
+
+CABECALHOS_SEGURANCA: Cabecalhos = [
+    # Evitar Mixed Content
+    (b"content-security-policy", b"upgrade-insecure-requests"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+]
+
+METODOS_PERMITIDOS = b"GET, POST, PUT, DELETE, OPTIONS, PATCH"
+
+def _cabecalho(cabecalhos: Iterable[Tuple[bytes, bytes]], nome: bytes) -> Optional[bytes]:
+    for chave, valor in cabecalhos:
+        if chave == nome:
+            return valor
+    return None
+
+def _codificacoes_aceites(accept_encoding: bytes) -> set:
+    """Codificações do Accept-Encoding com q > 0."""
+    aceites = set()
+    for parte in accept_encoding.lower().split(b","):
+        nome, _, parametros = parte.strip().partition(b";")
+        if parametros.strip().replace(b" ", b"") in (b"q=0", b"q=0.0", b"q=0.00", b"q=0.000"):
+            continue
+        if nome:
+            aceites.add(nome)
+    return aceites
+
+def _etag_fraca(cabecalhos: Cabecalhos) -> Cabecalhos:
+    """
+    ETag forte passa a fraca (W/): a mesma ETag não pode identificar bytes
+    diferentes (corpo comprimido ou não). If-None-Match compara de forma
+    fraca, pelo que a revalidação continua a funcionar (ver app/etags.py).
+    """
+    return [
+        (chave, b"W/" + valor if chave == b"etag" and not valor.startswith(b"W/") else valor)
+        for chave, valor in cabecalhos
+    ]
+
+class CORSSegurancaMiddleware:
+    """
+    - Preflight (OPTIONS) respondido aqui, com Access-Control-Max-Age para o
+      navegador o reutilizar em vez de repetir o OPTIONS a cada pedido;
+    - Access-Control-Allow-Origin apenas para origens da lista (ou todas com "*");
+    - headers de segurança em todas as respostas;
+    - gzip/br opcional para respostas JSON completas acima de `limiar_compressao`
+      bytes (respostas em streaming, como as exportações, passam intactas);
+      com compressão negociada a ETag destas respostas e dos 304 é fraca.
+    """
+
+    def __init__(
+        self,
+        app,
+        origens: List[str],
+        max_age: int = 600,
+        comprimir: bool = True,
+        limiar_compressao: int = 1024
+    ):
+        self.app = app
+        self.todas_origens = "*" in origens
+        self.origens = {origem.encode("latin-1") for origem in origens}
+        self.comprimir = comprimir
+        self.limiar_compressao = limiar_compressao
+
+        self.cabecalhos_preflight: Cabecalhos = [
+            (b"access-control-allow-methods", METODOS_PERMITIDOS),
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-max-age", str(max_age).encode()),
+            (b"vary", b"Origin"),
+            (b"content-length", b"0"),
+        ] + CABECALHOS_SEGURANCA
+
+    def origem_permitida(self, origem: Optional[bytes]) -> bool:
+        return origem is not None and (self.todas_origens or origem in self.origens)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cabecalhos_pedido = scope["headers"]
+        origem = _cabecalho(cabecalhos_pedido, b"origin")
+        permitida = self.origem_permitida(origem)
+
+        if scope["method"] == "OPTIONS":
+            await self._preflight(cabecalhos_pedido, origem if permitida else None, send)
+            return
+
+        # Headers a acrescentar à resposta, calculados uma vez por pedido
+        extra = list(CABECALHOS_SEGURANCA)
+        if permitida:
+            extra.append((b"access-control-allow-origin", origem))
+            extra.append((b"access-control-allow-credentials", b"true"))
+
+        codificacao = None
+        if self.comprimir:
+            aceites = _codificacoes_aceites(_cabecalho(cabecalhos_pedido, b"accept-encoding") or b"")
+            if brotli is not None and b"br" in aceites:
+                codificacao = b"br"
+            elif b"gzip" in aceites:
+                codificacao = b"gzip"
+
+        inicio_pendente = None
+
+        async def enviar(mensagem):
+            nonlocal inicio_pendente
+
+            if mensagem["type"] == "http.response.start":
+                cabecalhos = list(mensagem.get("headers", [])) + extra
+                mensagem = {**mensagem, "headers": cabecalhos}
+                e_json = (_cabecalho(cabecalhos, b"content-type") or b"").startswith(b"application/json")
+                if codificacao and (e_json or mensagem["status"] == 304):
+                    # Decidido já aqui (o 304 não tem corpo): a ETag é a mesma
+                    # quer o corpo acabe comprimido quer fique abaixo do limiar
+                    cabecalhos = _etag_fraca(cabecalhos)
+                    mensagem = {**mensagem, "headers": cabecalhos}
+                if codificacao and e_json and _cabecalho(cabecalhos, b"content-encoding") is None:
+                    # Só se decide comprimir ao ver o corpo; guarda o início até lá
+                    inicio_pendente = mensagem
+                    return
+                cabecalhos.append((b"vary", b"Origin, Accept-Encoding" if self.comprimir and e_json else b"Origin"))
+                await send(mensagem)
+                return
+
+            if mensagem["type"] == "http.response.body" and inicio_pendente is not None:
+                inicio, inicio_pendente = inicio_pendente, None
+                corpo = mensagem.get("body", b"")
+                cabecalhos = inicio["headers"]
+                if not mensagem.get("more_body", False) and len(corpo) >= self.limiar_compressao:
+                    if codificacao == b"br":
+                        corpo = brotli.compress(corpo, quality=4)
+                    else:
+                        corpo = gzip.compress(corpo, compresslevel=6, mtime=0)
+                    cabecalhos = [
+                        (chave, valor) for chave, valor in cabecalhos if chave != b"content-length"
+                    ] + [
+                        (b"content-encoding", codificacao),
+                        (b"content-length", str(len(corpo)).encode()),
+                    ]
+                    mensagem = {**mensagem, "body": corpo}
+                cabecalhos.append((b"vary", b"Origin, Accept-Encoding"))
+                await send({**inicio, "headers": cabecalhos})
+
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
+
+    async def _preflight(self, cabecalhos_pedido: Cabecalhos, origem: Optional[bytes], send):
+        cabecalhos = list(self.cabecalhos_preflight)
+        if origem is not None:
+            cabecalhos.append((b"access-control-allow-origin", origem))
+            pedidos = _cabecalho(cabecalhos_pedido, b"access-control-request-headers")
+            cabecalhos.append((b"access-control-allow-headers", pedidos or b"*"))
+        await send({"type": "http.response.start", "status": 200, "headers": cabecalhos})
+        await send({"type": "http.response.body", "body": b""})
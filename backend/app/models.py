@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Date, Time, Text, ForeignKey, Numeric
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, BigInteger, Date, Time, Text, ForeignKey, Numeric, UniqueConstraint, Computed
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import uuid
 
@@ -126,15 +126,98 @@ class Transacao(Base):
     observacoes = Column(Text)
     
     # Metadados
-    created_at = Column(DateTime, server_default=func.now())
+    # Obrigatório: faz parte da chave da paginação por cursor
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
+    # Pesquisa de texto: colunas geradas pela base de dados, só carregadas quando
+    # referidas explicitamente (ver database/migration_add_busca_transacoes.sql)
+    busca_tsv = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('pt_unaccent'::regconfig, COALESCE(descricao, '')), 'A') || "
+        "setweight(to_tsvector('pt_unaccent'::regconfig, COALESCE(localizacao, '')), 'B') || "
+        "setweight(to_tsvector('pt_unaccent'::regconfig, COALESCE(observacoes, '')), 'C')",
+        persisted=True
+    )))
+    busca_texto = deferred(Column(Text, Computed(
+        "f_unaccent(lower(COALESCE(descricao, '') || ' ' || "
+        "COALESCE(localizacao, '') || ' ' || COALESCE(observacoes, '')))",
+        persisted=True
+    )))
+    
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="transacoes")
     categoria = relationship("Categoria", back_populates="transacoes")
     plataforma = relationship("Plataforma", back_populates="transacoes")
     meio_pagamento = relationship("MeioPagamento", back_populates="transacoes")
 
+class ResumoDiario(Base):
+    """
+    Totais diários das transações por (usuário, data, tipo, categoria, plataforma).
+    Mantido pelo trigger trigger_transacoes_resumo_diario em cada INSERT/UPDATE/DELETE
+    de transacoes (ver database/migration_add_resumo_diario.sql).
+    """
+    __tablename__ = "resumo_diario"
+    __table_args__ = (
+        UniqueConstraint(
+            "usuario_id", "data", "tipo", "categoria_id", "plataforma_id",
+            name="uq_resumo_diario",
+            postgresql_nulls_not_distinct=True
+        ),
+    )
+    
+    id = Column(BigInteger, primary_key=True)
+    usuario_id = Column(UUID(as_uuid=True), ForeignKey("usuarios.id"), nullable=False)
+    data = Column(Date, nullable=False)
+    tipo = Column(String(20), nullable=False)
+    categoria_id = Column(UUID(as_uuid=True))
+    plataforma_id = Column(UUID(as_uuid=True))
+    
+    # Somas (NULL conta como 0) e número de transações
+    valor = Column(Numeric(14,2), nullable=False, default=0)
+    gorjeta = Column(Numeric(14,2), nullable=False, default=0)
+    km_percorridos = Column(Numeric(14,2), nullable=False, default=0)
+    litros_combustivel = Column(Numeric(14,2), nullable=False, default=0)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class ResumoMensal(Base):
+    """
+    Totais mensais das transações por (usuário, mês, tipo, categoria, plataforma),
+    com as mesmas somas do ResumoDiario. Mantido pelo trigger
+    trigger_transacoes_resumo_mensal (ver database/migration_add_resumo_mensal.sql).
+    """
+    __tablename__ = "resumo_mensal"
+    __table_args__ = (
+        UniqueConstraint(
+            "usuario_id", "mes", "tipo", "categoria_id", "plataforma_id",
+            name="uq_resumo_mensal",
+            postgresql_nulls_not_distinct=True
+        ),
+    )
+    
+    id = Column(BigInteger, primary_key=True)
+    usuario_id = Column(UUID(as_uuid=True), ForeignKey("usuarios.id"), nullable=False)
+    mes = Column(Date, nullable=False)  # primeiro dia do mês
+    tipo = Column(String(20), nullable=False)
+    categoria_id = Column(UUID(as_uuid=True))
+    plataforma_id = Column(UUID(as_uuid=True))
+    
+    valor = Column(Numeric(14,2), nullable=False, default=0)
+    gorjeta = Column(Numeric(14,2), nullable=False, default=0)
+    km_percorridos = Column(Numeric(14,2), nullable=False, default=0)
+    litros_combustivel = Column(Numeric(14,2), nullable=False, default=0)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class VersaoDados(Base):
+    """
+    Versão persistida de um recurso de configuração por usuário, incrementada
+    por trigger em cada escrita (ver database/migration_add_versoes_dados.sql).
+    """
+    __tablename__ = "versoes_dados"
+    
+    usuario_id = Column(UUID(as_uuid=True), ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    recurso = Column(String(30), primary_key=True)
+    versao = Column(BigInteger, nullable=False, default=1)
+
 class ConfiguracaoUsuario(Base):
     __tablename__ = "configuracoes_usuario"
     
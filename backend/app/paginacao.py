@@ -0,0 +1,31 @@
+"""
+Cursores opacos para paginação por chave (keyset) das transações
+"""
+
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from typing import Tuple
+from fastapi import HTTPException
+
+def codificar_cursor(data_transacao: date, created_at: datetime, transacao_id: uuid.UUID) -> str:
+    """Codifica a chave de ordenação da última linha da página num token opaco."""
+    bruto = json.dumps(
+        [data_transacao.isoformat(), created_at.isoformat(), str(transacao_id)],
+        separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> Tuple[date, datetime, uuid.UUID]:
+    """Inverso de codificar_cursor; cursores malformados dão 400."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data_transacao, created_at, transacao_id = json.loads(bruto)
+        return (
+            date.fromisoformat(data_transacao),
+            datetime.fromisoformat(created_at),
+            uuid.UUID(transacao_id)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
@@ -0,0 +1,122 @@
+"""
+Intervalos de datas e períodos usados pelos filtros e agregações
+"""
+
+from datetime import date, timedelta
+from typing import Annotated, List, Optional, Tuple
+from pydantic import AfterValidator
+
+# Granularidades aceites pela série temporal e o campo equivalente do date_trunc
+GRANULARIDADES = {
+    "dia": "day",
+    "semana": "week",
+    "mes": "month",
+    "ano": "year"
+}
+
+# ==========================
+# Datas aceites nos pedidos
+# ==========================
+# Os cálculos somam um dia ao fim do período e avançam até um balde (um ano)
+# para lá dele: perto de date.max (ou de date.min, ao recuar a série temporal)
+# sairiam do intervalo de `date` com um 500. Datas fora destes limites são
+# recusadas com 422 na validação dos parâmetros.
+DATA_MINIMA = date(1900, 1, 1)
+DATA_MAXIMA = date(9998, 12, 31)
+
+def _data_suportada(valor: date) -> date:
+    if not DATA_MINIMA <= valor <= DATA_MAXIMA:
+        raise ValueError(f"data fora do intervalo suportado ({DATA_MINIMA} a {DATA_MAXIMA})")
+    return valor
+
+# Tipo dos parâmetros data_inicio/data_fim dos endpoints
+DataPeriodo = Annotated[date, AfterValidator(_data_suportada)]
+
+# ==========================
+# Filtros por período
+# ==========================
+def intervalo_mes(referencia: date) -> Tuple[date, date]:
+    """Primeiro e último dia do mês de `referencia`."""
+    inicio = referencia.replace(day=1)
+    return inicio, deslocar_periodo(inicio, "mes") - timedelta(days=1)
+
+def filtro_periodo(coluna, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> List:
+    """
+    Converte um período inclusivo [data_inicio, data_fim] em condições
+    `coluna >= inicio AND coluna < fim + 1 dia`, que usam os índices
+    por (usuario_id, data_transacao) ao contrário de extract(month/year).
+    Devolve uma lista vazia quando nenhum limite é informado.
+    """
+    condicoes = []
+    if data_inicio:
+        condicoes.append(coluna >= data_inicio)
+    if data_fim:
+        condicoes.append(coluna < data_fim + timedelta(days=1))
+    return condicoes
+
+def dividir_em_meses(
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+) -> Tuple[Optional[Tuple[Optional[date], Optional[date]]], List[Tuple[Optional[date], Optional[date]]]]:
+    """
+    Divide o período inclusivo [data_inicio, data_fim] no maior bloco de meses
+    inteiros, (primeiro mês, mês a seguir ao último) com None para sem limite,
+    e nos intervalos de dias que sobram nas pontas (inclusivos, como em
+    filtro_periodo). Sem nenhum mês inteiro devolve (None, [período inteiro]).
+    """
+    primeiro = None
+    if data_inicio:
+        primeiro = data_inicio if data_inicio.day == 1 else deslocar_periodo(data_inicio.replace(day=1), "mes")
+    fim = None
+    if data_fim:
+        seguinte = data_fim + timedelta(days=1)
+        fim = seguinte if seguinte.day == 1 else data_fim.replace(day=1)
+    if primeiro and fim and primeiro >= fim:
+        return None, [(data_inicio, data_fim)]
+
+    pontas = []
+    if data_inicio and data_inicio < primeiro:
+        pontas.append((data_inicio, primeiro - timedelta(days=1)))
+    if data_fim and fim <= data_fim:
+        pontas.append((fim, data_fim))
+    return (primeiro, fim), pontas
+
+# ==========================
+# Baldes de séries temporais
+# ==========================
+def inicio_do_periodo(dia: date, granularidade: str) -> date:
+    """Início do balde que contém `dia` (semanas começam à segunda, como no date_trunc)."""
+    if granularidade == "dia":
+        return dia
+    if granularidade == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == "mes":
+        return dia.replace(day=1)
+    return dia.replace(month=1, day=1)
+
+def deslocar_periodo(inicio: date, granularidade: str, quantidade: int = 1) -> date:
+    """
+    Avança (ou recua, com quantidade negativa) `quantidade` baldes a partir de
+    `inicio`. Fora do intervalo de `date` levanta ValueError/OverflowError: as
+    datas dos pedidos são limitadas por DataPeriodo para que isso não aconteça.
+    """
+    if granularidade == "dia":
+        return inicio + timedelta(days=quantidade)
+    if granularidade == "semana":
+        return inicio + timedelta(weeks=quantidade)
+    if granularidade == "mes":
+        meses = inicio.year * 12 + inicio.month - 1 + quantidade
+        return inicio.replace(year=meses // 12, month=meses % 12 + 1)
+    return inicio.replace(year=inicio.year + quantidade)
+
+def contar_periodos(data_inicio: date, data_fim: date, granularidade: str) -> int:
+    """Número de baldes necessários para cobrir o intervalo [data_inicio, data_fim]."""
+    inicio = inicio_do_periodo(data_inicio, granularidade)
+    fim = inicio_do_periodo(data_fim, granularidade)
+    if granularidade == "dia":
+        return (fim - inicio).days + 1
+    if granularidade == "semana":
+        return (fim - inicio).days // 7 + 1
+    if granularidade == "mes":
+        return (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+    return fim.year - inicio.year + 1
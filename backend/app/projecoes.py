@@ -0,0 +1,62 @@
+"""
+Projeção de leitura das transações: linhas → dicts, sem hidratar o ORM
+
+Seleciona só as colunas de TransacaoResponse (e dos modelos aninhados) numa
+query com outer joins e monta dicts com a mesma forma da resposta. Serve os
+endpoints de leitura que não alteram as linhas; criar/atualizar continuam a
+usar objetos ORM.
+"""
+
+from typing import Any, Dict
+from sqlalchemy import select
+from app.models import Transacao, Categoria, Plataforma, MeioPagamento
+from app.schemas import TransacaoResponse, CategoriaResponse, PlataformaResponse, MeioPagamentoResponse
+
+# campo da resposta -> (modelo, chave estrangeira em Transacao, schema aninhado)
+RELACOES = {
+    "categoria": (Categoria, Transacao.categoria_id, CategoriaResponse),
+    "plataforma": (Plataforma, Transacao.plataforma_id, PlataformaResponse),
+    "meio_pagamento": (MeioPagamento, Transacao.meio_pagamento_id, MeioPagamentoResponse),
+}
+
+def _montar_plano():
+    """
+    Colunas a selecionar e, por campo da resposta, a posição na linha
+    (ou a lista de posições do objeto aninhado), pela ordem do schema.
+    """
+    colunas = []
+    plano = []
+    for campo in TransacaoResponse.model_fields:
+        if campo in RELACOES:
+            modelo, _, esquema = RELACOES[campo]
+            posicoes = []
+            for subcampo in esquema.model_fields:
+                posicoes.append((subcampo, len(colunas)))
+                colunas.append(getattr(modelo, subcampo).label(f"{campo}_{subcampo}"))
+            plano.append((campo, posicoes))
+        else:
+            plano.append((campo, len(colunas)))
+            colunas.append(getattr(Transacao, campo))
+    return colunas, plano
+
+COLUNAS_TRANSACAO, _PLANO = _montar_plano()
+
+def selecionar_transacoes(*filtros):
+    """SELECT das colunas da resposta com os três relacionamentos em outer join."""
+    consulta = select(*COLUNAS_TRANSACAO).select_from(Transacao)
+    for modelo, chave, _ in RELACOES.values():
+        consulta = consulta.outerjoin(modelo, modelo.id == chave)
+    return consulta.where(*filtros)
+
+def transacao_para_dict(linha) -> Dict[str, Any]:
+    """Linha de selecionar_transacoes no formato de TransacaoResponse."""
+    resultado = {}
+    for campo, posicao in _PLANO:
+        if isinstance(posicao, int):
+            resultado[campo] = linha[posicao]
+        elif linha[posicao[0][1]] is None:
+            # relacionamento ausente (o primeiro subcampo é sempre o id)
+            resultado[campo] = None
+        else:
+            resultado[campo] = {subcampo: linha[indice] for subcampo, indice in posicao}
+    return resultado
@@ -0,0 +1,39 @@
+"""
+Resposta JSON rápida para endpoints de leitura
+
+Para conteúdo já em tipos simples (dicts vindos de projeções ou dos cálculos
+do dashboard): evita o jsonable_encoder do FastAPI e serializa diretamente
+para bytes. O formato é o mesmo que o pydantic produz para os modelos de
+resposta: Decimal e UUID como string, datetime UTC com sufixo Z.
+"""
+
+from decimal import Decimal
+import uuid
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; o pydantic_core gera o mesmo JSON
+    orjson = None
+
+def _padrao(valor):
+    # Decimal (numeric) e o UUID do asyncpg, que o orjson não reconhece
+    if isinstance(valor, (Decimal, uuid.UUID)):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+def para_json(conteudo) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(conteudo, default=_padrao, option=orjson.OPT_UTC_Z)
+    return pydantic_core.to_json(conteudo)
+
+class RespostaJSON(JSONResponse):
+    """
+    Opt-in: devolver RespostaJSON(conteudo) diretamente do endpoint. Rotas
+    com response_model que devolvem modelos continuam no caminho do FastAPI
+    (TypeAdapter pré-compilado + dump_json).
+    """
+
+    def render(self, content) -> bytes:
+        return para_json(content)
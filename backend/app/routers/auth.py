@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
 from app.database import get_db
 from app.models import Usuario
 from app.schemas import UserLogin, UserRegister, UserResponse, UserUpdate, Token, PasswordResetRequest, PasswordReset
-from app.auth import authenticate_user, create_access_token, get_password_hash, get_current_user
+from app.auth import authenticate_user, create_access_token, get_current_user, verificar_senha, gerar_hash_senha
+from app.cache import invalidar_usuario, incrementar_versao, RECURSO_USUARIO
 import uuid
 import secrets
 
 router = APIRouter(prefix="/auth", tags=["Autenticação"])
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.email, user_credentials.senha)
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, user_credentials.email, user_credentials.senha)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,7 +24,8 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     
     # Atualizar último login
     user.ultimo_login = datetime.utcnow()
-    db.commit()
+    await db.commit()
+    incrementar_versao(user.id, RECURSO_USUARIO)
     
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -36,9 +39,9 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     # Verificar se email já existe
-    existing_user = db.query(Usuario).filter(Usuario.email == user_data.email).first()
+    existing_user = await db.scalar(select(Usuario).where(Usuario.email == user_data.email).limit(1))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,7 +49,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Criar novo usuário
-    hashed_password = get_password_hash(user_data.senha)
+    hashed_password = await gerar_hash_senha(user_data.senha)
     db_user = Usuario(
         id=uuid.uuid4(),
         nome=user_data.nome,
@@ -59,8 +62,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
@@ -69,8 +72,8 @@ async def get_current_user_info(current_user: Usuario = Depends(get_current_user
     return current_user
 
 @router.post("/forgot-password")
-async def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)):
-    user = db.query(Usuario).filter(Usuario.email == request.email).first()
+async def forgot_password(request: PasswordResetRequest, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(Usuario).where(Usuario.email == request.email).limit(1))
     if not user:
         # Por segurança, não revelamos se o email existe ou não
         return {"message": "Se o email existir, você receberá instruções para redefinir sua senha"}
@@ -80,18 +83,18 @@ async def forgot_password(request: PasswordResetRequest, db: Session = Depends(g
     user.reset_password_token = reset_token
     user.reset_password_expires = datetime.utcnow() + timedelta(hours=1)
     
-    db.commit()
+    await db.commit()
     
     # Aqui você implementaria o envio do email
     # Por enquanto, vamos apenas retornar o token para teste
     return {"message": "Token de reset gerado", "token": reset_token}
 
 @router.post("/reset-password")
-async def reset_password(request: PasswordReset, db: Session = Depends(get_db)):
-    user = db.query(Usuario).filter(
+async def reset_password(request: PasswordReset, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(Usuario).where(
         Usuario.reset_password_token == request.token,
         Usuario.reset_password_expires > datetime.utcnow()
-    ).first()
+    ).limit(1))
     
     if not user:
         raise HTTPException(
@@ -100,11 +103,12 @@ async def reset_password(request: PasswordReset, db: Session = Depends(get_db)):
         )
     
     # Atualizar senha
-    user.senha_hash = get_password_hash(request.nova_senha)
+    user.senha_hash = await gerar_hash_senha(request.nova_senha)
     user.reset_password_token = None
     user.reset_password_expires = None
     
-    db.commit()
+    await db.commit()
+    invalidar_usuario(user.id)
     
     return {"message": "Senha redefinida com sucesso"}
 
@@ -112,31 +116,32 @@ async def reset_password(request: PasswordReset, db: Session = Depends(get_db)):
 async def alterar_senha(
     senha_data: dict,
     current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    from app.auth import verify_password
-    
     # Verificar senha atual
-    if not verify_password(senha_data["senha_atual"], current_user.senha_hash):
+    valida, _ = await verificar_senha(senha_data["senha_atual"], current_user.senha_hash)
+    if not valida:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta"
         )
     
     # Atualizar senha
-    current_user.senha_hash = get_password_hash(senha_data["nova_senha"])
-    db.commit()
+    current_user.senha_hash = await gerar_hash_senha(senha_data["nova_senha"])
+    await db.commit()
+    invalidar_usuario(current_user.id)
     
     return {"message": "Senha alterada com sucesso"}
 
 @router.delete("/excluir-conta")
 async def excluir_conta(
     current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Excluir usuário
-    db.delete(current_user)
-    db.commit()
+    await db.delete(current_user)
+    await db.commit()
+    invalidar_usuario(current_user.id)
     
     return {"message": "Conta excluída com sucesso"}
 
@@ -144,14 +149,15 @@ async def excluir_conta(
 async def atualizar_perfil(
     perfil_data: UserUpdate,
     current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Atualizar campos do perfil
     for field, value in perfil_data.dict(exclude_unset=True).items():
         if hasattr(current_user, field):
             setattr(current_user, field, value)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    invalidar_usuario(current_user.id)
+    await db.refresh(current_user)
     
     return current_user
\ No newline at end of file
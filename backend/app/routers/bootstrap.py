@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.models import Usuario, Categoria, Plataforma, MeioPagamento
+from app.schemas import BootstrapResponse
+from app.auth import get_current_principal, UsuarioPrincipal
+from app.cache import (
+    RECURSO_USUARIO, RECURSO_CONFIGURACAO, RECURSO_CATEGORIAS,
+    RECURSO_PLATAFORMAS, RECURSO_MEIOS_PAGAMENTO
+)
+from app.catalogo import obter_catalogo
+from app.etags import condicional
+from app.routers.configuracoes import ler_configuracoes
+
+router = APIRouter(prefix="/bootstrap", tags=["Bootstrap"])
+
+async def _etag_paises() -> str:
+    return (await obter_catalogo()).etag
+
+# Tudo o que o frontend carrega depois do login, num único pedido: substitui
+# /auth/me, /configuracoes/usuario, categorias, plataformas, meios-pagamento
+# e paises. A ETag combina as versões de todos esses recursos e a do catálogo.
+@router.get("", response_model=BootstrapResponse, dependencies=[Depends(condicional(
+    RECURSO_USUARIO, RECURSO_CONFIGURACAO, RECURSO_CATEGORIAS,
+    RECURSO_PLATAFORMAS, RECURSO_MEIOS_PAGAMENTO,
+    complemento=_etag_paises
+))])
+async def obter_bootstrap(
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    # Uma sessão, uma conexão: as leituras seguem em sequência (o asyncpg não
+    # executa queries em paralelo na mesma conexão), sem autenticação nem
+    # checkout do pool repetidos por recurso
+    usuario = await db.scalar(select(Usuario).where(Usuario.id == current_user.id))
+    if not usuario:
+        raise HTTPException(status_code=401, detail="Usuário não encontrado.")
+
+    configuracoes = await ler_configuracoes(db, current_user.id)
+
+    categorias = (await db.scalars(select(Categoria).where(
+        Categoria.usuario_id == current_user.id
+    ).order_by(Categoria.tipo, Categoria.nome))).all()
+
+    plataformas = (await db.scalars(select(Plataforma).where(
+        Plataforma.usuario_id == current_user.id
+    ).order_by(Plataforma.tipo, Plataforma.nome))).all()
+
+    meios_pagamento = (await db.scalars(select(MeioPagamento).where(
+        MeioPagamento.usuario_id == current_user.id
+    ).order_by(MeioPagamento.nome))).all()
+
+    return {
+        "usuario": usuario,
+        "configuracoes": jsonable_encoder(configuracoes),
+        "categorias": categorias,
+        "plataformas": plataformas,
+        "meios_pagamento": meios_pagamento,
+        "paises": (await obter_catalogo()).paises
+    }
@@ -1,66 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.models import Usuario, Categoria, Plataforma, MeioPagamento, Pais, ConfiguracaoUsuario
+from app.models import Categoria, Plataforma, MeioPagamento, ConfiguracaoUsuario
 from app.schemas import (
     CategoriaCreate, CategoriaResponse,
     PlataformaCreate, PlataformaResponse,
     MeioPagamentoCreate, MeioPagamentoResponse,
     PaisResponse, ConfiguracaoUpdate
 )
-from app.auth import get_current_user
+from app.auth import get_current_principal, verificar_admin, UsuarioPrincipal
+from app.cache import (
+    incrementar_versao, RECURSO_DASHBOARD, RECURSO_CATEGORIAS,
+    RECURSO_PLATAFORMAS, RECURSO_MEIOS_PAGAMENTO, RECURSO_CONFIGURACAO
+)
+from app.etags import condicional, etag_corresponde
+from app.catalogo import obter_catalogo, recarregar_catalogo
+from app.config import get_settings
 from typing import List
 import uuid
 
 router = APIRouter(prefix="/configuracoes", tags=["Configurações"])
 
+# Público (página de registo): caches intermédias podem guardar a lista
+CACHE_CONTROL_PAISES = f"public, max-age={get_settings().paises_cache_max_age}"
+
 # Endpoints de Países
+# O catálogo vem da memória do processo (app/catalogo.py): bytes JSON já
+# serializados, sem sessão nem consulta por pedido
 @router.get("/paises", response_model=List[PaisResponse])
-async def listar_paises(db: Session = Depends(get_db)):
-    try:
-        print("Endpoint /paises chamado")
-        paises = db.query(Pais).filter(Pais.ativo == True).order_by(Pais.nome).all()
-        print(f"Encontrados {len(paises)} países")
-        return paises
-    except Exception as e:
-        print(f"Erro ao listar países: {e}")
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+async def listar_paises(request: Request):
+    catalogo = await obter_catalogo()
+    cabecalhos = {"ETag": catalogo.etag, "Cache-Control": CACHE_CONTROL_PAISES}
+    if etag_corresponde(request.headers.get("if-none-match"), catalogo.etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(content=catalogo.corpo, media_type="application/json", headers=cabecalhos)
+
+@router.post("/paises/recarregar", dependencies=[Depends(verificar_admin)])
+async def recarregar_paises():
+    """Relê a tabela paises (ex.: depois de correr populate_countries.py)."""
+    catalogo = await recarregar_catalogo()
+    return {"paises": len(catalogo.paises), "etag": catalogo.etag}
 
 # Endpoints de Categorias
-@router.get("/categorias", response_model=List[CategoriaResponse])
+@router.get("/categorias", response_model=List[CategoriaResponse], dependencies=[Depends(condicional(RECURSO_CATEGORIAS))])
 async def listar_categorias(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    categorias = db.query(Categoria).filter(
+    categorias = (await db.scalars(select(Categoria).where(
         Categoria.usuario_id == current_user.id
-    ).order_by(Categoria.tipo, Categoria.nome).all()
+    ).order_by(Categoria.tipo, Categoria.nome))).all()
     return categorias
 
-@router.get("/categorias/ativas", response_model=List[CategoriaResponse])
+@router.get("/categorias/ativas", response_model=List[CategoriaResponse], dependencies=[Depends(condicional(RECURSO_CATEGORIAS))])
 async def listar_categorias_ativas(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    categorias = db.query(Categoria).filter(
+    categorias = (await db.scalars(select(Categoria).where(
         Categoria.usuario_id == current_user.id,
         Categoria.ativo == True
-    ).order_by(Categoria.tipo, Categoria.nome).all()
+    ).order_by(Categoria.tipo, Categoria.nome))).all()
     return categorias
 
 @router.post("/categorias", response_model=CategoriaResponse)
 async def criar_categoria(
     categoria_data: CategoriaCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     # Verificar se já existe categoria com mesmo nome e tipo
-    existing = db.query(Categoria).filter(
+    existing = await db.scalar(select(Categoria).where(
         Categoria.usuario_id == current_user.id,
         Categoria.nome == categoria_data.nome,
         Categoria.tipo == categoria_data.tipo,
         Categoria.ativo == True
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(status_code=400, detail="Categoria já existe")
@@ -71,8 +87,9 @@ async def criar_categoria(
     )
     
     db.add(db_categoria)
-    db.commit()
-    db.refresh(db_categoria)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_CATEGORIAS, RECURSO_DASHBOARD)
+    await db.refresh(db_categoria)
     
     return db_categoria
 
@@ -80,13 +97,13 @@ async def criar_categoria(
 async def atualizar_categoria(
     categoria_id: str,
     categoria_data: CategoriaCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    categoria = db.query(Categoria).filter(
+    categoria = await db.scalar(select(Categoria).where(
         Categoria.id == categoria_id,
         Categoria.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not categoria:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
@@ -94,21 +111,22 @@ async def atualizar_categoria(
     for field, value in categoria_data.dict().items():
         setattr(categoria, field, value)
     
-    db.commit()
-    db.refresh(categoria)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_CATEGORIAS, RECURSO_DASHBOARD)
+    await db.refresh(categoria)
     
     return categoria
 
 @router.delete("/categorias/{categoria_id}")
 async def deletar_categoria(
     categoria_id: str,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    categoria = db.query(Categoria).filter(
+    categoria = await db.scalar(select(Categoria).where(
         Categoria.id == categoria_id,
         Categoria.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not categoria:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
@@ -117,37 +135,38 @@ async def deletar_categoria(
         raise HTTPException(status_code=400, detail="Não é possível deletar categoria padrão")
     
     categoria.ativo = False
-    db.commit()
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_CATEGORIAS, RECURSO_DASHBOARD)
     
     return {"message": "Categoria deletada com sucesso"}
 
 # Endpoints de Plataformas
-@router.get("/plataformas", response_model=List[PlataformaResponse])
+@router.get("/plataformas", response_model=List[PlataformaResponse], dependencies=[Depends(condicional(RECURSO_PLATAFORMAS))])
 async def listar_plataformas(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    plataformas = db.query(Plataforma).filter(
+    plataformas = (await db.scalars(select(Plataforma).where(
         Plataforma.usuario_id == current_user.id
-    ).order_by(Plataforma.tipo, Plataforma.nome).all()
+    ).order_by(Plataforma.tipo, Plataforma.nome))).all()
     return plataformas
 
-@router.get("/plataformas/ativas", response_model=List[PlataformaResponse])
+@router.get("/plataformas/ativas", response_model=List[PlataformaResponse], dependencies=[Depends(condicional(RECURSO_PLATAFORMAS))])
 async def listar_plataformas_ativas(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    plataformas = db.query(Plataforma).filter(
+    plataformas = (await db.scalars(select(Plataforma).where(
         Plataforma.usuario_id == current_user.id,
         Plataforma.ativo == True
-    ).order_by(Plataforma.tipo, Plataforma.nome).all()
+    ).order_by(Plataforma.tipo, Plataforma.nome))).all()
     return plataformas
 
 @router.post("/plataformas", response_model=PlataformaResponse)
 async def criar_plataforma(
     plataforma_data: PlataformaCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     db_plataforma = Plataforma(
         usuario_id=current_user.id,
@@ -155,8 +174,9 @@ async def criar_plataforma(
     )
     
     db.add(db_plataforma)
-    db.commit()
-    db.refresh(db_plataforma)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_PLATAFORMAS, RECURSO_DASHBOARD)
+    await db.refresh(db_plataforma)
     
     return db_plataforma
 
@@ -164,13 +184,13 @@ async def criar_plataforma(
 async def atualizar_plataforma(
     plataforma_id: str,
     plataforma_data: PlataformaCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    plataforma = db.query(Plataforma).filter(
+    plataforma = await db.scalar(select(Plataforma).where(
         Plataforma.id == plataforma_id,
         Plataforma.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not plataforma:
         raise HTTPException(status_code=404, detail="Plataforma não encontrada")
@@ -178,63 +198,65 @@ async def atualizar_plataforma(
     for field, value in plataforma_data.dict().items():
         setattr(plataforma, field, value)
     
-    db.commit()
-    db.refresh(plataforma)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_PLATAFORMAS, RECURSO_DASHBOARD)
+    await db.refresh(plataforma)
     
     return plataforma
 
 @router.delete("/plataformas/{plataforma_id}")
 async def deletar_plataforma(
     plataforma_id: str,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    plataforma = db.query(Plataforma).filter(
+    plataforma = await db.scalar(select(Plataforma).where(
         Plataforma.id == plataforma_id,
         Plataforma.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not plataforma:
         raise HTTPException(status_code=404, detail="Plataforma não encontrada")
     
-    db.delete(plataforma)
-    db.commit()
+    await db.delete(plataforma)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_PLATAFORMAS, RECURSO_DASHBOARD)
     
     return {"message": "Plataforma deletada com sucesso"}
 
 # Endpoints de Meios de Pagamento
-@router.get("/meios-pagamento", response_model=List[MeioPagamentoResponse])
+@router.get("/meios-pagamento", response_model=List[MeioPagamentoResponse], dependencies=[Depends(condicional(RECURSO_MEIOS_PAGAMENTO))])
 async def listar_meios_pagamento(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    meios = db.query(MeioPagamento).filter(
+    meios = (await db.scalars(select(MeioPagamento).where(
         MeioPagamento.usuario_id == current_user.id
-    ).order_by(MeioPagamento.nome).all()
+    ).order_by(MeioPagamento.nome))).all()
     return meios
 
-@router.get("/meios-pagamento/ativos", response_model=List[MeioPagamentoResponse])
+@router.get("/meios-pagamento/ativos", response_model=List[MeioPagamentoResponse], dependencies=[Depends(condicional(RECURSO_MEIOS_PAGAMENTO))])
 async def listar_meios_pagamento_ativos(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    meios = db.query(MeioPagamento).filter(
+    meios = (await db.scalars(select(MeioPagamento).where(
         MeioPagamento.usuario_id == current_user.id,
         MeioPagamento.ativo == True
-    ).order_by(MeioPagamento.nome).all()
+    ).order_by(MeioPagamento.nome))).all()
     return meios
 
 @router.post("/meios-pagamento", response_model=MeioPagamentoResponse)
 async def criar_meio_pagamento(
     meio_data: MeioPagamentoCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     # Verificar se já existe um meio de pagamento com o mesmo nome
-    existing_meio = db.query(MeioPagamento).filter(
+    existing_meio = await db.scalar(select(MeioPagamento).where(
         MeioPagamento.usuario_id == current_user.id,
         MeioPagamento.nome == meio_data.nome
-    ).first()
+    ).limit(1))
     
     if existing_meio:
         raise HTTPException(
@@ -253,8 +275,9 @@ async def criar_meio_pagamento(
     )
     
     db.add(db_meio)
-    db.commit()
-    db.refresh(db_meio)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_MEIOS_PAGAMENTO)
+    await db.refresh(db_meio)
     
     return db_meio
 
@@ -262,23 +285,23 @@ async def criar_meio_pagamento(
 async def atualizar_meio_pagamento(
     meio_id: str,
     meio_data: MeioPagamentoCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    meio = db.query(MeioPagamento).filter(
+    meio = await db.scalar(select(MeioPagamento).where(
         MeioPagamento.id == meio_id,
         MeioPagamento.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not meio:
         raise HTTPException(status_code=404, detail="Meio de pagamento não encontrado")
     
     # Verificar se já existe outro meio de pagamento com o mesmo nome
-    existing_meio = db.query(MeioPagamento).filter(
+    existing_meio = await db.scalar(select(MeioPagamento).where(
         MeioPagamento.usuario_id == current_user.id,
         MeioPagamento.nome == meio_data.nome,
         MeioPagamento.id != meio_id
-    ).first()
+    ).limit(1))
     
     if existing_meio:
         raise HTTPException(
@@ -294,75 +317,79 @@ async def atualizar_meio_pagamento(
     for field, value in meio_dict.items():
         setattr(meio, field, value)
     
-    db.commit()
-    db.refresh(meio)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_MEIOS_PAGAMENTO)
+    await db.refresh(meio)
     
     return meio
 
 @router.delete("/meios-pagamento/{meio_id}")
 async def deletar_meio_pagamento(
     meio_id: str,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    meio = db.query(MeioPagamento).filter(
+    meio = await db.scalar(select(MeioPagamento).where(
         MeioPagamento.id == meio_id,
         MeioPagamento.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not meio:
         raise HTTPException(status_code=404, detail="Meio de pagamento não encontrado")
     
-    db.delete(meio)
-    db.commit()
+    await db.delete(meio)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_MEIOS_PAGAMENTO)
     
     return {"message": "Meio de pagamento deletado com sucesso"}
 
 # Configurações do usuário
-@router.get("/usuario")
+# Devolvidas enquanto o usuário ainda não gravou as suas
+CONFIGURACOES_PADRAO = {
+    "nome_empresa": "",
+    "cnpj": "",
+    "telefone": "",
+    "cidade": "",
+    "fuso_horario": "America/Sao_Paulo",
+    "moeda": "BRL",
+    "meta_mensal_receita": None,
+    "meta_mensal_despesa": None,
+    "alerta_limite_gasto": False,
+    "limite_gasto_diario": None,
+    "preco_combustivel": None,
+    "notif_sms": True,
+    "notif_email": False,
+    "notificacoes_email": False,
+    "alertas_meta": False,
+    "alertas_gastos": False,
+    "relatorios_semanais": False,
+    "formato_data": "DD/MM/YYYY",
+    "primeiro_dia_semana": 1
+}
+
+async def ler_configuracoes(db: AsyncSession, usuario_id):
+    """ConfiguracaoUsuario do usuário, ou as configurações padrão se não existir."""
+    config = await db.scalar(select(ConfiguracaoUsuario).where(
+        ConfiguracaoUsuario.usuario_id == usuario_id
+    ).limit(1))
+    return config if config else dict(CONFIGURACOES_PADRAO)
+
+@router.get("/usuario", dependencies=[Depends(condicional(RECURSO_CONFIGURACAO))])
 async def obter_configuracoes(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    config = db.query(ConfiguracaoUsuario).filter(
-        ConfiguracaoUsuario.usuario_id == current_user.id
-    ).first()
-    
-    if not config:
-        # Retornar configurações padrão se não existir
-        return {
-            "nome_empresa": "",
-            "cnpj": "",
-            "telefone": "",
-            "cidade": "",
-            "fuso_horario": "America/Sao_Paulo",
-            "moeda": "BRL",
-            "meta_mensal_receita": None,
-            "meta_mensal_despesa": None,
-            "alerta_limite_gasto": False,
-            "limite_gasto_diario": None,
-            "preco_combustivel": None,
-            "notif_sms": True,
-            "notif_email": False,
-            "notificacoes_email": False,
-            "alertas_meta": False,
-            "alertas_gastos": False,
-            "relatorios_semanais": False,
-            "formato_data": "DD/MM/YYYY",
-            "primeiro_dia_semana": 1
-        }
-    
-    return config
+    return await ler_configuracoes(db, current_user.id)
 
 @router.put("/usuario")
 async def atualizar_configuracoes(
     config_data: ConfiguracaoUpdate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    config = db.query(ConfiguracaoUsuario).filter(
+    config = await db.scalar(select(ConfiguracaoUsuario).where(
         ConfiguracaoUsuario.usuario_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not config:
         config = ConfiguracaoUsuario(usuario_id=current_user.id)
@@ -371,7 +398,8 @@ async def atualizar_configuracoes(
     for field, value in config_data.dict(exclude_unset=True).items():
         setattr(config, field, value)
     
-    db.commit()
-    db.refresh(config)
+    await db.commit()
+    incrementar_versao(current_user.id, RECURSO_CONFIGURACAO)
+    await db.refresh(config)
     
     return config
\ No newline at end of file
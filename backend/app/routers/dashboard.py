@@ -1,260 +1,168 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from app.database import get_db
-from app.models import Usuario, Transacao, Categoria, Plataforma
-from app.schemas import DashboardStats, GraficoData
-from app.auth import get_current_user
-from datetime import datetime, date
-from decimal import Decimal
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Categoria, Plataforma
+from app.schemas import DashboardStats
+from app.auth import get_current_principal, get_read_db, UsuarioPrincipal
+from app.cache import cache_dashboard, caches_locais_validas, versao, RECURSO_DASHBOARD
+from app.estatisticas import calcular_estatisticas, obter_transacoes_recentes, calcular_serie_temporal, totais_periodo
+from app.respostas import RespostaJSON
+from app.periodos import DataPeriodo, contar_periodos, inicio_do_periodo, deslocar_periodo
+from datetime import date
+from typing import Optional
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+async def _em_cache(usuario_id, endpoint: str, params: tuple, calcular):
+    """
+    Resultado em cache por (usuário, endpoint, parâmetros, dia, versão dos dados).
+    A versão é lida antes do cálculo, por isso uma escrita concorrente nunca
+    deixa em cache um resultado antigo sob a versão nova. Sem sincronização
+    entre workers a versão local pode estar atrasada: calcula sempre.
+    """
+    if not caches_locais_validas():
+        return await calcular()
+    chave = (str(usuario_id), endpoint, params, date.today(), versao(usuario_id, RECURSO_DASHBOARD))
+    return await cache_dashboard.obter_ou_aguardar(chave, calcular)
+
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
-    data_inicio: Optional[date] = None,
-    data_fim: Optional[date] = None,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Criar query base para receitas (incluindo gorjeta)
-    receitas_query = db.query(
-        func.sum(Transacao.valor + func.coalesce(Transacao.gorjeta, 0))
-    ).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.tipo == 'receita'
-    )
-    
-    # Aplicar filtros de data se fornecidos
-    if data_inicio:
-        receitas_query = receitas_query.filter(Transacao.data_transacao >= data_inicio)
-    if data_fim:
-        receitas_query = receitas_query.filter(Transacao.data_transacao <= data_fim)
-    
-    receitas_total = receitas_query.scalar() or Decimal('0')
-    
-    # Criar query base para despesas
-    despesas_query = db.query(func.sum(Transacao.valor)).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.tipo == 'despesa'
-    )
-    
-    # Aplicar filtros de data se fornecidos
-    if data_inicio:
-        despesas_query = despesas_query.filter(Transacao.data_transacao >= data_inicio)
-    if data_fim:
-        despesas_query = despesas_query.filter(Transacao.data_transacao <= data_fim)
-    
-    despesas_total = despesas_query.scalar() or Decimal('0')
-    
-    saldo = receitas_total - despesas_total
-    
-    # Criar query base para KM (todos os períodos para cálculo do valor por KM)
-    km_query_total = db.query(func.sum(Transacao.km_percorridos)).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.km_percorridos.isnot(None)
-    )
-    
-    # Aplicar filtros de data se fornecidos
-    if data_inicio:
-        km_query_total = km_query_total.filter(Transacao.data_transacao >= data_inicio)
-    if data_fim:
-        km_query_total = km_query_total.filter(Transacao.data_transacao <= data_fim)
-    
-    km_total_para_calculo = km_query_total.scalar() or Decimal('0')
-    
-    # KM do mês atual (para exibição no card)
-    data_atual = datetime.now()
-    mes_atual = data_atual.month
-    ano_atual = data_atual.year
-    
-    km_mes_atual = db.query(func.sum(Transacao.km_percorridos)).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.km_percorridos.isnot(None),
-        extract('month', Transacao.data_transacao) == mes_atual,
-        extract('year', Transacao.data_transacao) == ano_atual
-    ).scalar() or Decimal('0')
-    
-    # Calcular valor por KM (usando KM total para cálculo mais preciso)
-    valor_por_km = receitas_total / km_total_para_calculo if km_total_para_calculo > 0 else Decimal('0')
-    
-    receitas_mes = db.query(
-        func.sum(Transacao.valor + func.coalesce(Transacao.gorjeta, 0))
-    ).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.tipo == 'receita',
-        extract('month', Transacao.data_transacao) == mes_atual,
-        extract('year', Transacao.data_transacao) == ano_atual
-    ).scalar() or Decimal('0')
-    
-    despesas_mes = db.query(func.sum(Transacao.valor)).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.tipo == 'despesa',
-        extract('month', Transacao.data_transacao) == mes_atual,
-        extract('year', Transacao.data_transacao) == ano_atual
-    ).scalar() or Decimal('0')
-    
-    # Transações recentes (últimas 5)
-    transacoes_recentes = db.query(Transacao).filter(
-        Transacao.usuario_id == current_user.id
-    ).order_by(Transacao.created_at.desc()).limit(5).all()
+    async def calcular():
+        estatisticas = await calcular_estatisticas(db, current_user.id, data_inicio, data_fim)
+        transacoes_recentes = await obter_transacoes_recentes(db, current_user.id)
+        
+        return DashboardStats(
+            **estatisticas,
+            transacoes_recentes=transacoes_recentes
+        )
     
-    return DashboardStats(
-        total_receitas=receitas_total,
-        total_despesas=despesas_total,
-        saldo=saldo,
-        total_km=km_mes_atual,
-        valor_por_km=valor_por_km,
-        receitas_mes_atual=receitas_mes,
-        despesas_mes_atual=despesas_mes,
-        transacoes_recentes=transacoes_recentes
-    )
+    return await _em_cache(current_user.id, "stats", (data_inicio, data_fim), calcular)
+
+# Limite de baldes por pedido (cerca de 3 anos em granularidade diária)
+MAX_PERIODOS_SERIE = 1100
+
+@router.get("/serie-temporal")
+async def get_serie_temporal(
+    granularidade: str = Query("mes", regex="^(dia|semana|mes|ano)$"),
+    periodos: int = Query(12, ge=1, le=MAX_PERIODOS_SERIE),
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Sem data_inicio, recua `periodos` baldes a partir de data_fim (hoje, por omissão)
+    data_fim = data_fim or date.today()
+    if not data_inicio:
+        data_inicio = deslocar_periodo(
+            inicio_do_periodo(data_fim, granularidade), granularidade, -(periodos - 1)
+        )
+    
+    if data_inicio > data_fim:
+        raise HTTPException(status_code=400, detail="data_inicio deve ser anterior a data_fim")
+    
+    if contar_periodos(data_inicio, data_fim, granularidade) > MAX_PERIODOS_SERIE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Intervalo demasiado grande: máximo de {MAX_PERIODOS_SERIE} períodos"
+        )
+    
+    return RespostaJSON(await _em_cache(
+        current_user.id, "serie-temporal", (granularidade, data_inicio, data_fim),
+        lambda: calcular_serie_temporal(db, current_user.id, granularidade, data_inicio, data_fim)
+    ))
 
 @router.get("/grafico-mensal")
 async def get_grafico_mensal(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    meses: int = Query(6, ge=1, le=36),
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Dados dos últimos 6 meses
-    dados_grafico = []
+    # Dados dos últimos `meses` meses, incluindo o atual
+    hoje = date.today()
+    data_inicio = deslocar_periodo(hoje.replace(day=1), "mes", -(meses - 1))
     
-    for i in range(6):
-        data_ref = datetime.now().replace(day=1)
-        if i > 0:
-            # Subtrair meses
-            if data_ref.month > i:
-                data_ref = data_ref.replace(month=data_ref.month - i)
-            else:
-                ano_anterior = data_ref.year - 1
-                mes_anterior = 12 - (i - data_ref.month)
-                data_ref = data_ref.replace(year=ano_anterior, month=mes_anterior)
-        
-        mes_nome = data_ref.strftime("%b/%Y")
-        
-        # Receitas do mês (incluindo gorjeta)
-        receita_mes = db.query(
-            func.sum(Transacao.valor + func.coalesce(Transacao.gorjeta, 0))
-        ).filter(
-            Transacao.usuario_id == current_user.id,
-            Transacao.tipo == 'receita',
-            extract('month', Transacao.data_transacao) == data_ref.month,
-            extract('year', Transacao.data_transacao) == data_ref.year
-        ).scalar() or 0
-        
-        # Despesas do mês
-        despesa_mes = db.query(func.sum(Transacao.valor)).filter(
-            Transacao.usuario_id == current_user.id,
-            Transacao.tipo == 'despesa',
-            extract('month', Transacao.data_transacao) == data_ref.month,
-            extract('year', Transacao.data_transacao) == data_ref.year
-        ).scalar() or 0
-        
-        # KM do mês
-        km_mes = db.query(func.sum(Transacao.km_percorridos)).filter(
-            Transacao.usuario_id == current_user.id,
-            Transacao.km_percorridos.isnot(None),
-            extract('month', Transacao.data_transacao) == data_ref.month,
-            extract('year', Transacao.data_transacao) == data_ref.year
-        ).scalar() or 0
-        
-        # Calcular saldo do mês
-        saldo_mes = float(receita_mes) - float(despesa_mes)
-        
-        dados_grafico.insert(0, {
-            "mes": mes_nome,
-            "receitas": float(receita_mes),
-            "despesas": float(despesa_mes),
-            "saldo": saldo_mes,
-            "km_total": float(km_mes)
-        })
+    serie = await _em_cache(
+        current_user.id, "serie-temporal", ("mes", data_inicio, hoje),
+        lambda: calcular_serie_temporal(db, current_user.id, "mes", data_inicio, hoje)
+    )
     
-    return dados_grafico
+    return RespostaJSON([
+        {
+            "mes": ponto["periodo"].strftime("%b/%Y"),
+            "receitas": ponto["receitas"],
+            "despesas": ponto["despesas"],
+            "saldo": ponto["saldo"],
+            "km_total": ponto["km_total"]
+        }
+        for ponto in serie
+    ])
 
 @router.get("/resumo-categorias")
 async def get_resumo_categorias(
-    data_inicio: Optional[date] = None,
-    data_fim: Optional[date] = None,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Receitas por categoria (incluindo gorjeta)
-    receitas_query = db.query(
-        Categoria.nome,
-        Categoria.cor,
-        func.sum(Transacao.valor + func.coalesce(Transacao.gorjeta, 0)).label('total')
-    ).join(Transacao).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.tipo == 'receita'
-    )
-    
-    # Aplicar filtros de data se fornecidos
-    if data_inicio:
-        receitas_query = receitas_query.filter(Transacao.data_transacao >= data_inicio)
-    if data_fim:
-        receitas_query = receitas_query.filter(Transacao.data_transacao <= data_fim)
-    
-    receitas_categoria = receitas_query.group_by(Categoria.nome, Categoria.cor).all()
-    
-    # Despesas por categoria
-    despesas_categoria = db.query(
-        Categoria.nome,
-        Categoria.cor,
-        func.sum(Transacao.valor).label('total')
-    ).join(Transacao).filter(
-        Transacao.usuario_id == current_user.id,
-        Transacao.tipo == 'despesa'
-    ).group_by(Categoria.nome, Categoria.cor).all()
-    
-    # Retornar apenas receitas no formato esperado pelo frontend
-    return [
-        {"name": r.nome, "valor": float(r.total), "cor": r.cor}
-        for r in receitas_categoria
-    ]
+    async def calcular():
+        # Receitas por categoria (incluindo gorjeta): meses inteiros do resumo
+        # mensal mais os dias das pontas do período
+        resumo = totais_periodo(current_user.id, 'receita', data_inicio, data_fim)
+        receitas_categoria = (await db.execute(select(
+            Categoria.nome,
+            Categoria.cor,
+            func.sum(resumo.c.valor + resumo.c.gorjeta).label('total')
+        ).join(resumo, Categoria.id == resumo.c.categoria_id).group_by(Categoria.nome, Categoria.cor))).all()
+    
+        # Retornar apenas receitas no formato esperado pelo frontend
+        return [
+            {"name": r.nome, "valor": float(r.total), "cor": r.cor}
+            for r in receitas_categoria
+        ]
+    
+    return RespostaJSON(await _em_cache(current_user.id, "resumo-categorias", (data_inicio, data_fim), calcular))
 
 @router.get("/resumo-plataformas")
 async def get_resumo_plataformas(
-    data_inicio: Optional[date] = None,
-    data_fim: Optional[date] = None,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Buscar apenas plataformas que têm transações associadas (incluindo gorjeta)
-    plataformas_query = db.query(
-        Plataforma.nome,
-        Plataforma.cor,
-        func.sum(Transacao.valor + func.coalesce(Transacao.gorjeta, 0)).label('total_receita'),
-        func.sum(Transacao.km_percorridos).label('total_km'),
-        func.count(Transacao.id).label('total_corridas')
-    ).join(
-        Transacao, 
-        (Plataforma.id == Transacao.plataforma_id) & 
-        (Transacao.usuario_id == current_user.id) & 
-        (Transacao.tipo == 'receita')
-    ).filter(
-        Plataforma.usuario_id == current_user.id
-    )
-    
-    # Aplicar filtros de data se fornecidos
-    if data_inicio:
-        plataformas_query = plataformas_query.filter(Transacao.data_transacao >= data_inicio)
-    if data_fim:
-        plataformas_query = plataformas_query.filter(Transacao.data_transacao <= data_fim)
-    
-    plataformas_stats = plataformas_query.group_by(Plataforma.nome, Plataforma.cor).order_by(Plataforma.nome).all()
-    
-    # Calcular total geral para participação percentual
-    total_receita_geral = sum(float(p.total_receita or 0) for p in plataformas_stats)
-    
-    return [
-        {
-            "nome": p.nome,
-            "cor": p.cor,
-            "receita": float(p.total_receita or 0),
-            "km": float(p.total_km or 0),
-            "corridas": p.total_corridas,
-            "valor_por_km": float(p.total_receita or 0) / float(p.total_km or 1) if p.total_km and float(p.total_km) > 0 else 0,
-            "participacao": (float(p.total_receita or 0) / total_receita_geral) * 100 if total_receita_geral > 0 else 0
-        }
-        for p in plataformas_stats
-    ]
\ No newline at end of file
+    async def calcular():
+        # Apenas plataformas com receitas no período (incluindo gorjeta)
+        resumo = totais_periodo(current_user.id, 'receita', data_inicio, data_fim)
+        plataformas_stats = (await db.execute(select(
+            Plataforma.nome,
+            Plataforma.cor,
+            func.sum(resumo.c.valor + resumo.c.gorjeta).label('total_receita'),
+            func.sum(resumo.c.km_percorridos).label('total_km'),
+            func.sum(resumo.c.quantidade).label('total_corridas')
+        ).join(
+            resumo, Plataforma.id == resumo.c.plataforma_id
+        ).where(
+            Plataforma.usuario_id == current_user.id
+        ).group_by(Plataforma.nome, Plataforma.cor).order_by(Plataforma.nome))).all()
+    
+        # Calcular total geral para participação percentual
+        total_receita_geral = sum(float(p.total_receita or 0) for p in plataformas_stats)
+    
+        return [
+            {
+                "nome": p.nome,
+                "cor": p.cor,
+                "receita": float(p.total_receita or 0),
+                "km": float(p.total_km or 0),
+                "corridas": p.total_corridas,
+                "valor_por_km": float(p.total_receita or 0) / float(p.total_km or 1) if p.total_km and float(p.total_km) > 0 else 0,
+                "participacao": (float(p.total_receita or 0) / total_receita_geral) * 100 if total_receita_geral > 0 else 0
+            }
+            for p in plataformas_stats
+        ]
+    
+    return RespostaJSON(await _em_cache(current_user.id, "resumo-plataformas", (data_inicio, data_fim), calcular))
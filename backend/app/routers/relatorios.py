@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from app.models import Categoria, Plataforma, ResumoDiario
+from app.auth import get_current_principal, UsuarioPrincipal
+from app.periodos import DataPeriodo, filtro_periodo
+from app.exportacao import resposta_exportacao
+from typing import Optional
+from datetime import date
+
+router = APIRouter(prefix="/relatorios", tags=["Relatórios"])
+
+# Uma linha por dia/tipo/categoria/plataforma, a partir do resumo diário
+COLUNAS_RELATORIO = [
+    ("data", ResumoDiario.data),
+    ("tipo", ResumoDiario.tipo),
+    ("categoria", Categoria.nome),
+    ("plataforma", Plataforma.nome),
+    ("transacoes", ResumoDiario.quantidade),
+    ("valor", ResumoDiario.valor),
+    ("gorjeta", ResumoDiario.gorjeta),
+    ("total", ResumoDiario.valor + ResumoDiario.gorjeta),
+    ("km_percorridos", ResumoDiario.km_percorridos),
+    ("litros_combustivel", ResumoDiario.litros_combustivel)
+]
+
+@router.get("/export")
+async def exportar_relatorio(
+    formato: str = Query("csv", regex="^(csv|xlsx|ndjson)$"),
+    tipo: Optional[str] = Query(None, regex="^(receita|despesa)$"),
+    categoria_id: Optional[str] = None,
+    plataforma_id: Optional[str] = None,
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal)
+):
+    filtros = [ResumoDiario.usuario_id == current_user.id]
+
+    if tipo:
+        filtros.append(ResumoDiario.tipo == tipo)
+
+    if categoria_id:
+        filtros.append(ResumoDiario.categoria_id == categoria_id)
+
+    if plataforma_id:
+        filtros.append(ResumoDiario.plataforma_id == plataforma_id)
+
+    filtros.extend(filtro_periodo(ResumoDiario.data, data_inicio, data_fim))
+
+    consulta = select(*[coluna for _, coluna in COLUNAS_RELATORIO]).select_from(ResumoDiario).outerjoin(
+        Categoria, Categoria.id == ResumoDiario.categoria_id
+    ).outerjoin(
+        Plataforma, Plataforma.id == ResumoDiario.plataforma_id
+    ).where(*filtros).order_by(ResumoDiario.data, ResumoDiario.tipo, Categoria.nome, Plataforma.nome)
+
+    return resposta_exportacao(
+        formato,
+        f"relatorio_{date.today():%Y%m%d}",
+        [nome for nome, _ in COLUNAS_RELATORIO],
+        consulta,
+        usuario_id=current_user.id
+    )
@@ -1,21 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import desc, or_, tuple_, select, insert, bindparam, func, literal_column, Date, Time, exc
 from app.database import get_db
-from app.models import Usuario, Transacao, Categoria, Plataforma, MeioPagamento
-from app.schemas import TransacaoCreate, TransacaoResponse
-from app.auth import get_current_user
-from typing import List, Optional
+from app.models import Transacao, Categoria, Plataforma, MeioPagamento
+from app.schemas import (
+    TransacaoCreate, TransacaoResponse, TransacaoPagina,
+    TransacaoBuscaResponse, TransacaoLoteCreate, TransacaoLoteResultado
+)
+from app.auth import get_current_principal, get_read_db, UsuarioPrincipal
+from app.cache import invalidar_dashboard
+from app.periodos import DataPeriodo, filtro_periodo
+from app.paginacao import codificar_cursor, decodificar_cursor
+from app.exportacao import resposta_exportacao
+from app.projecoes import selecionar_transacoes, transacao_para_dict
+from app.respostas import RespostaJSON
+from pydantic import ValidationError
+from typing import List, Optional, Union
 from datetime import date
+import html
 import uuid
 
 router = APIRouter(prefix="/transacoes", tags=["Transações"])
 
+def filtros_transacoes(
+    usuario_id,
+    tipo: Optional[str] = None,
+    categoria_id: Optional[str] = None,
+    plataforma_id: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+) -> list:
+    """Condições comuns à listagem e à exportação de transações."""
+    filtros = [Transacao.usuario_id == usuario_id]
+    
+    if tipo:
+        filtros.append(Transacao.tipo == tipo)
+    
+    if categoria_id:
+        filtros.append(Transacao.categoria_id == categoria_id)
+    
+    if plataforma_id:
+        filtros.append(Transacao.plataforma_id == plataforma_id)
+    
+    filtros.extend(filtro_periodo(Transacao.data_transacao, data_inicio, data_fim))
+    
+    return filtros
+
+async def _obter_transacao(db: AsyncSession, transacao_id, usuario_id) -> Optional[Transacao]:
+    """Transação do usuário com categoria, plataforma e meio de pagamento carregados."""
+    return await db.scalar(select(Transacao).options(
+        joinedload(Transacao.categoria),
+        joinedload(Transacao.plataforma),
+        joinedload(Transacao.meio_pagamento)
+    ).where(
+        Transacao.id == transacao_id,
+        Transacao.usuario_id == usuario_id
+    ).execution_options(populate_existing=True))
+
 @router.post("/", response_model=TransacaoResponse)
 async def criar_transacao(
     transacao_data: TransacaoCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     db_transacao = Transacao(
         usuario_id=current_user.id,
@@ -23,62 +70,232 @@ async def criar_transacao(
     )
     
     db.add(db_transacao)
-    db.commit()
-    db.refresh(db_transacao)
+    await db.commit()
+    invalidar_dashboard(current_user.id)
     
-    return db_transacao
+    # Relê com os relacionamentos e os defaults preenchidos pela base de dados
+    return await _obter_transacao(db, db_transacao.id, current_user.id)
+
+# ==========================
+# Inserção em lote
+# ==========================
+# Referências que cada item pode fazer a registos do próprio usuário
+REFERENCIAS_LOTE = [
+    ("categoria_id", Categoria),
+    ("plataforma_id", Plataforma),
+    ("meio_pagamento_id", MeioPagamento)
+]
+
+# Data e hora omitidas ficam com os defaults da base de dados, como na inserção unitária
+INSERT_LOTE = insert(Transacao).values(
+    data_transacao=func.coalesce(bindparam("data_transacao", type_=Date), func.current_date()),
+    hora_transacao=func.coalesce(bindparam("hora_transacao", type_=Time), func.current_time())
+)
 
-@router.get("/", response_model=List[TransacaoResponse])
+async def _validar_lote(db: AsyncSession, usuario_id, itens: list):
+    """
+    Valida todos os itens numa única passagem: schema item a item e, depois,
+    uma consulta por tabela referenciada para confirmar que os ids existem e
+    pertencem ao usuário. Devolve (linhas válidas com o índice, erros por índice).
+    """
+    validos = []
+    erros = {}
+
+    for indice, item in enumerate(itens):
+        if not isinstance(item, dict):
+            erros[indice] = ["item: deve ser um objeto"]
+            continue
+        try:
+            transacao = TransacaoCreate(**item)
+        except ValidationError as e:
+            erros[indice] = [
+                f"{'.'.join(str(parte) for parte in erro['loc'])}: {erro['msg']}"
+                for erro in e.errors()
+            ]
+            continue
+        validos.append((indice, transacao.dict()))
+
+    for campo, modelo in REFERENCIAS_LOTE:
+        ids = {dados[campo] for _, dados in validos if dados[campo] is not None}
+        if not ids:
+            continue
+        existentes = set(await db.scalars(
+            select(modelo.id).where(modelo.id.in_(ids), modelo.usuario_id == usuario_id)
+        ))
+        for indice, dados in validos:
+            if dados[campo] is not None and dados[campo] not in existentes:
+                erros.setdefault(indice, []).append(f"{campo}: não encontrado")
+
+    validos = [(indice, dados) for indice, dados in validos if indice not in erros]
+    return validos, erros
+
+def _erro_base_dados(e: exc.DBAPIError) -> str:
+    """Primeira linha da mensagem do PostgreSQL, sem o nome da classe do driver."""
+    return str(e.orig).splitlines()[0].rsplit(">: ", 1)[-1]
+
+@router.post("/bulk", response_model=TransacaoLoteResultado)
+async def criar_transacoes_lote(
+    lote: TransacaoLoteCreate,
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Insere várias transações com um único INSERT multi-linha e um único commit.
+    Em 'tudo_ou_nada' qualquer item inválido rejeita o lote inteiro (422); em
+    'melhor_esforco' os itens válidos são inseridos e os inválidos reportados.
+    """
+    validos, erros = await _validar_lote(db, current_user.id, lote.itens)
+    lista_erros = [{"indice": indice, "erros": erros[indice]} for indice in sorted(erros)]
+
+    if lista_erros and lote.modo == "tudo_ou_nada":
+        raise HTTPException(
+            status_code=422,
+            detail={"mensagem": "Lote rejeitado: existem itens inválidos", "erros": lista_erros}
+        )
+
+    ids = []
+    if validos:
+        linhas = []
+        for _, dados in validos:
+            dados["id"] = uuid.uuid4()
+            dados["usuario_id"] = current_user.id
+            linhas.append(dados)
+
+        try:
+            await db.execute(INSERT_LOTE, linhas)
+            ids = [dados["id"] for dados in linhas]
+        except exc.DBAPIError as e:
+            # Recusado pela base de dados apesar da validação (ex.: referência
+            # removida entretanto): nada foi inserido. Conexão perdida é outro caso
+            if e.connection_invalidated:
+                raise
+            await db.rollback()
+            if lote.modo == "tudo_ou_nada":
+                raise HTTPException(
+                    status_code=422,
+                    detail={"mensagem": f"Lote rejeitado pela base de dados: {_erro_base_dados(e)}", "erros": []}
+                )
+            # Em melhor esforço repete item a item, cada um no seu savepoint,
+            # para inserir os válidos e reportar só os recusados
+            for indice, dados in validos:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(INSERT_LOTE, [dados])
+                    ids.append(dados["id"])
+                except exc.DBAPIError as e_item:
+                    if e_item.connection_invalidated:
+                        raise
+                    erros[indice] = [f"base de dados: {_erro_base_dados(e_item)}"]
+            lista_erros = [{"indice": indice, "erros": erros[indice]} for indice in sorted(erros)]
+
+        if ids:
+            await db.commit()
+            invalidar_dashboard(current_user.id)
+
+    return {"inseridas": len(ids), "ids": ids, "erros": lista_erros}
+
+@router.get("/", response_model=Union[List[TransacaoResponse], TransacaoPagina])
 async def listar_transacoes(
     skip: int = Query(0, ge=0),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
+    paginacao: str = Query("offset", regex="^(offset|cursor)$"),
+    cursor: Optional[str] = None,
     tipo: Optional[str] = Query(None, regex="^(receita|despesa)$"),
     categoria_id: Optional[str] = None,
     plataforma_id: Optional[str] = None,
-    data_inicio: Optional[date] = None,
-    data_fim: Optional[date] = None,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Transacao).options(
-        joinedload(Transacao.categoria),
-        joinedload(Transacao.plataforma),
-        joinedload(Transacao.meio_pagamento)
-    ).filter(Transacao.usuario_id == current_user.id)
+    # Só leitura: projeção em dicts e RespostaJSON, sem objetos ORM nem
+    # validação da resposta (a forma é a de TransacaoResponse)
+    query = selecionar_transacoes(
+        *filtros_transacoes(current_user.id, tipo, categoria_id, plataforma_id, data_inicio, data_fim)
+    )
     
-    if tipo:
-        query = query.filter(Transacao.tipo == tipo)
+    query = query.order_by(desc(Transacao.data_transacao), desc(Transacao.created_at), desc(Transacao.id))
     
-    if categoria_id:
-        query = query.filter(Transacao.categoria_id == categoria_id)
+    # Modo offset (compatibilidade): devolve apenas a lista
+    if paginacao == "offset" and cursor is None:
+        linhas = (await db.execute(query.offset(skip).limit(limit))).all()
+        return RespostaJSON([transacao_para_dict(linha) for linha in linhas])
     
-    if plataforma_id:
-        query = query.filter(Transacao.plataforma_id == plataforma_id)
+    # Modo cursor: continua a partir da chave da última linha da página anterior,
+    # com custo constante por página e sem saltos quando entram linhas novas
+    if cursor:
+        chave = decodificar_cursor(cursor)
+        query = query.where(
+            tuple_(Transacao.data_transacao, Transacao.created_at, Transacao.id) < tuple_(*chave)
+        )
     
-    if data_inicio:
-        query = query.filter(Transacao.data_transacao >= data_inicio)
+    transacoes = [transacao_para_dict(linha) for linha in (await db.execute(query.limit(limit + 1))).all()]
     
-    if data_fim:
-        query = query.filter(Transacao.data_transacao <= data_fim)
+    next_cursor = None
+    if len(transacoes) > limit:
+        transacoes = transacoes[:limit]
+        ultima = transacoes[-1]
+        next_cursor = codificar_cursor(ultima["data_transacao"], ultima["created_at"], ultima["id"])
     
-    transacoes = query.order_by(desc(Transacao.data_transacao), desc(Transacao.created_at)).offset(skip).limit(limit).all()
+    return RespostaJSON({"itens": transacoes, "next_cursor": next_cursor})
+
+# Colunas exportadas, na ordem do ficheiro
+COLUNAS_EXPORTACAO = [
+    ("data", Transacao.data_transacao),
+    ("hora", Transacao.hora_transacao),
+    ("tipo", Transacao.tipo),
+    ("valor", Transacao.valor),
+    ("gorjeta", Transacao.gorjeta),
+    ("descricao", Transacao.descricao),
+    ("categoria", Categoria.nome),
+    ("plataforma", Plataforma.nome),
+    ("meio_pagamento", MeioPagamento.nome),
+    ("km_percorridos", Transacao.km_percorridos),
+    ("litros_combustivel", Transacao.litros_combustivel),
+    ("preco_combustivel", Transacao.preco_combustivel),
+    ("saldo_em_maos", Transacao.saldo_em_maos),
+    ("saldo_em_maos_recebido", Transacao.saldo_em_maos_recebido),
+    ("localizacao", Transacao.localizacao),
+    ("observacoes", Transacao.observacoes),
+    ("id", Transacao.id)
+]
+
+@router.get("/export")
+async def exportar_transacoes(
+    formato: str = Query("csv", regex="^(csv|xlsx|ndjson)$"),
+    tipo: Optional[str] = Query(None, regex="^(receita|despesa)$"),
+    categoria_id: Optional[str] = None,
+    plataforma_id: Optional[str] = None,
+    data_inicio: Optional[DataPeriodo] = None,
+    data_fim: Optional[DataPeriodo] = None,
+    current_user: UsuarioPrincipal = Depends(get_current_principal)
+):
+    # Declarado antes de /{transacao_id} para não ser capturado por essa rota
+    consulta = select(*[coluna for _, coluna in COLUNAS_EXPORTACAO]).select_from(Transacao).outerjoin(
+        Categoria, Categoria.id == Transacao.categoria_id
+    ).outerjoin(
+        Plataforma, Plataforma.id == Transacao.plataforma_id
+    ).outerjoin(
+        MeioPagamento, MeioPagamento.id == Transacao.meio_pagamento_id
+    ).where(
+        *filtros_transacoes(current_user.id, tipo, categoria_id, plataforma_id, data_inicio, data_fim)
+    ).order_by(desc(Transacao.data_transacao), desc(Transacao.created_at), desc(Transacao.id))
     
-    return transacoes
+    return resposta_exportacao(
+        formato,
+        f"transacoes_{date.today():%Y%m%d}",
+        [nome for nome, _ in COLUNAS_EXPORTACAO],
+        consulta,
+        usuario_id=current_user.id
+    )
 
 @router.get("/{transacao_id}", response_model=TransacaoResponse)
 async def obter_transacao(
     transacao_id: str,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    transacao = db.query(Transacao).options(
-        joinedload(Transacao.categoria),
-        joinedload(Transacao.plataforma),
-        joinedload(Transacao.meio_pagamento)
-    ).filter(
-        Transacao.id == transacao_id,
-        Transacao.usuario_id == current_user.id
-    ).first()
+    transacao = await _obter_transacao(db, transacao_id, current_user.id)
     
     if not transacao:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
@@ -89,17 +306,10 @@ async def obter_transacao(
 async def atualizar_transacao(
     transacao_id: str,
     transacao_data: TransacaoCreate,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    transacao = db.query(Transacao).options(
-        joinedload(Transacao.categoria),
-        joinedload(Transacao.plataforma),
-        joinedload(Transacao.meio_pagamento)
-    ).filter(
-        Transacao.id == transacao_id,
-        Transacao.usuario_id == current_user.id
-    ).first()
+    transacao = await _obter_transacao(db, transacao_id, current_user.id)
     
     if not transacao:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
@@ -107,43 +317,102 @@ async def atualizar_transacao(
     for field, value in transacao_data.dict(exclude_unset=True).items():
         setattr(transacao, field, value)
     
-    db.commit()
-    db.refresh(transacao)
+    await db.commit()
+    invalidar_dashboard(current_user.id)
     
-    return transacao
+    # Relê: categoria/plataforma podem ter mudado e updated_at vem da base de dados
+    return await _obter_transacao(db, transacao.id, current_user.id)
 
 @router.delete("/{transacao_id}")
 async def deletar_transacao(
     transacao_id: str,
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    transacao = db.query(Transacao).filter(
+    transacao = await db.scalar(select(Transacao).where(
         Transacao.id == transacao_id,
         Transacao.usuario_id == current_user.id
-    ).first()
+    ))
     
     if not transacao:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
     
-    db.delete(transacao)
-    db.commit()
+    await db.delete(transacao)
+    await db.commit()
+    invalidar_dashboard(current_user.id)
     
     return {"message": "Transação deletada com sucesso"}
 
-@router.get("/buscar/texto")
+# ==========================
+# Pesquisa de texto
+# ==========================
+# Configuração criada em database/migration_add_busca_transacoes.sql
+CONFIG_BUSCA = literal_column("'pt_unaccent'::regconfig")
+
+# O ts_headline devolve o texto original: os termos são delimitados por
+# caracteres de controlo (removidos antes do texto do usuário) e só depois de
+# escapar o trecho como HTML passam a <mark>, para nunca devolver HTML do usuário
+INICIO_DESTAQUE = "\x02"
+FIM_DESTAQUE = "\x03"
+OPCOES_TRECHO = f"StartSel={INICIO_DESTAQUE}, StopSel={FIM_DESTAQUE}, MaxWords=20, MinWords=8, MaxFragments=2"
+
+def _trecho_html(trecho: Optional[str]) -> Optional[str]:
+    if trecho is None:
+        return None
+    return html.escape(trecho).replace(INICIO_DESTAQUE, "<mark>").replace(FIM_DESTAQUE, "</mark>")
+
+def _padrao_like(q: str) -> str:
+    """Escapa os curingas do LIKE para pesquisar q como substring literal."""
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+@router.get("/buscar/texto", response_model=List[TransacaoBuscaResponse])
 async def buscar_transacoes(
-    q: str = Query(..., min_length=2),
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    q: str = Query(..., min_length=2, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: UsuarioPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    transacoes = db.query(Transacao).filter(
+    """
+    Pesquisa por palavras (tsvector com stemming e sem acentos, ordenada por
+    ts_rank_cd) com recurso a substrings via pg_trgm para termos parciais.
+    Ambas as condições usam os índices GIN (usuario_id, ...).
+    """
+    consulta = func.websearch_to_tsquery(CONFIG_BUSCA, q)
+    padrao = func.f_unaccent(func.lower(_padrao_like(q)))
+    texto = func.translate(
+        func.concat_ws(" ... ", Transacao.descricao, Transacao.localizacao, Transacao.observacoes),
+        INICIO_DESTAQUE + FIM_DESTAQUE, ""
+    )
+
+    relevancia = func.ts_rank_cd(Transacao.busca_tsv, consulta)
+    semelhanca = func.word_similarity(func.f_unaccent(func.lower(q)), Transacao.busca_texto)
+
+    resultados = (await db.execute(select(
+        Transacao,
+        relevancia.label("relevancia"),
+        func.ts_headline(CONFIG_BUSCA, texto, consulta, OPCOES_TRECHO).label("trecho")
+    ).options(
+        joinedload(Transacao.categoria),
+        joinedload(Transacao.plataforma),
+        joinedload(Transacao.meio_pagamento)
+    ).where(
         Transacao.usuario_id == current_user.id,
         or_(
-            Transacao.descricao.ilike(f"%{q}%"),
-            Transacao.observacoes.ilike(f"%{q}%"),
-            Transacao.localizacao.ilike(f"%{q}%")
+            Transacao.busca_tsv.op("@@")(consulta),
+            Transacao.busca_texto.like(padrao, escape="\\")
         )
-    ).order_by(desc(Transacao.data_transacao)).limit(20).all()
-    
-    return transacoes
\ No newline at end of file
+    ).order_by(
+        desc(relevancia),
+        desc(semelhanca),
+        desc(Transacao.data_transacao),
+        desc(Transacao.id)
+    ).offset(skip).limit(limit))).all()
+
+    transacoes = []
+    for transacao, rank, trecho in resultados:
+        transacao.relevancia = rank
+        transacao.trecho = _trecho_html(trecho)
+        transacoes.append(transacao)
+
+    return transacoes
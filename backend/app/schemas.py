@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Any, Dict, Literal
 from datetime import datetime, date, time
 from decimal import Decimal
 import uuid
@@ -115,21 +115,23 @@ class MeioPagamentoResponse(BaseModel):
 
 # Schemas de Transação
 class TransacaoCreate(BaseModel):
-    tipo: str  # 'receita' ou 'despesa'
-    valor: Decimal
+    # Limites das colunas de transacoes: acima deles a base de dados recusaria
+    # a linha (Numeric(12,2), Numeric(8,2), String(255)) e o pedido falharia com 500
+    tipo: Literal['receita', 'despesa']
+    valor: Decimal = Field(..., max_digits=12, decimal_places=2)
     descricao: Optional[str] = None
     categoria_id: Optional[uuid.UUID] = None
     plataforma_id: Optional[uuid.UUID] = None
     meio_pagamento_id: Optional[uuid.UUID] = None
-    km_percorridos: Optional[Decimal] = None
-    litros_combustivel: Optional[Decimal] = None
-    preco_combustivel: Optional[Decimal] = None
-    gorjeta: Optional[Decimal] = None
-    saldo_em_maos: Optional[Decimal] = None
+    km_percorridos: Optional[Decimal] = Field(None, max_digits=8, decimal_places=2)
+    litros_combustivel: Optional[Decimal] = Field(None, max_digits=8, decimal_places=2)
+    preco_combustivel: Optional[Decimal] = Field(None, max_digits=8, decimal_places=2)
+    gorjeta: Optional[Decimal] = Field(None, max_digits=8, decimal_places=2)
+    saldo_em_maos: Optional[Decimal] = Field(None, max_digits=8, decimal_places=2)
     saldo_em_maos_recebido: Optional[bool] = False
     data_transacao: Optional[date] = None
     hora_transacao: Optional[time] = None
-    localizacao: Optional[str] = None
+    localizacao: Optional[str] = Field(None, max_length=255)
     observacoes: Optional[str] = None
 
 class TransacaoResponse(BaseModel):
@@ -155,6 +157,31 @@ class TransacaoResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TransacaoBuscaResponse(TransacaoResponse):
+    relevancia: float
+    trecho: Optional[str] = None  # excerto escapado como HTML, com os termos encontrados entre <mark></mark>
+
+class TransacaoPagina(BaseModel):
+    itens: List[TransacaoResponse]
+    next_cursor: Optional[str] = None
+
+# Schemas de inserção em lote
+MAX_ITENS_LOTE = 5000
+
+class TransacaoLoteCreate(BaseModel):
+    # Itens validados um a um no endpoint, para reportar erros por item
+    itens: List[Any] = Field(..., min_length=1, max_length=MAX_ITENS_LOTE)
+    modo: Literal['tudo_ou_nada', 'melhor_esforco'] = 'tudo_ou_nada'
+
+class TransacaoLoteErro(BaseModel):
+    indice: int
+    erros: List[str]
+
+class TransacaoLoteResultado(BaseModel):
+    inseridas: int
+    ids: List[uuid.UUID]
+    erros: List[TransacaoLoteErro]
+
 # Schemas de Dashboard
 class DashboardStats(BaseModel):
     total_receitas: Decimal
@@ -200,6 +227,15 @@ class ConfiguracaoUpdate(BaseModel):
     formato_data: Optional[str] = None
     primeiro_dia_semana: Optional[int] = None
 
+# Schema de arranque da aplicação (GET /bootstrap)
+class BootstrapResponse(BaseModel):
+    usuario: UserResponse
+    configuracoes: Dict[str, Any]  # mesmo conteúdo que GET /configuracoes/usuario
+    categorias: List[CategoriaResponse]
+    plataformas: List[PlataformaResponse]
+    meios_pagamento: List[MeioPagamentoResponse]
+    paises: List[PaisResponse]
+
 # Schema de recuperação de senha
 class PasswordResetRequest(BaseModel):
     email: str
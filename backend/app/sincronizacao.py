@@ -0,0 +1,204 @@
+"""
+Sincronização das caches em memória entre processos (PostgreSQL LISTEN/NOTIFY)
+
+Cada worker tem as suas versões por usuário e caches (app/cache.py) e o seu
+catálogo de países (app/catalogo.py). Com vários workers, uma escrita atendida
+por um deles tem de chegar aos restantes; caso contrário outro worker serviria
+o dashboard ou o usuário anteriores da cache, ou o catálogo antigo.
+
+Cada processo abre uma conexão asyncpg dedicada (fora do pool da API), escuta
+o canal CANAL e publica nele as suas alterações com pg_notify. A entrega é
+assíncrona: durante alguns milissegundos outro worker pode ainda servir o
+estado anterior. Sem conexão (falha no arranque ou conexão perdida) o processo
+tenta reconectar em segundo plano e, até conseguir, não usa as caches locais
+nem responde 304; ao reconectar limpa as caches, porque pode ter perdido
+notificações entretanto. As ETags não dependem disto: vêm das versões
+persistidas na base de dados (app/etags.py).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+from app.cache import (
+    RECURSO_USUARIO, cache_dashboard, cache_usuarios, caches_locais_validas,
+    definir_caches_locais_validas,
+    definir_publicador, incrementar_versao
+)
+from app.catalogo import recarregar_catalogo
+from app.config import get_settings
+
+logger = logging.getLogger("gestaSaaS")
+
+CANAL = "gestasaas_cache"
+
+# Espera entre tentativas de reconexão (segundos), a duplicar até ao máximo
+ESPERA_RECONEXAO_MIN = 0.5
+ESPERA_RECONEXAO_MAX = 30
+
+class Sincronizador:
+    """Publica e aplica alterações das caches através de um canal do Postgres."""
+
+    def __init__(self):
+        self._conexao = None
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._reconexao: Optional[asyncio.Task] = None
+        self._origem = ""
+        self._ativo = False
+        self.enviadas = 0
+        self.recebidas = 0
+        self.reconexoes = 0
+
+    async def iniciar(self) -> bool:
+        """
+        Liga ao canal e começa a publicar. Devolve False se a conexão falhar:
+        nesse caso continua a tentar em segundo plano e as alterações deste
+        processo ficam na fila até lá.
+        """
+        # Identifica este processo: as notificações que ele próprio envia também
+        # lhe chegam e são ignoradas. Calculado aqui (já no worker, depois do fork)
+        self._origem = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._fila = asyncio.Queue()
+        self._ativo = True
+        self._tarefa = asyncio.create_task(self._enviar())
+        definir_publicador(self._publicar)
+        definir_caches_locais_validas(False)
+        try:
+            await self._conectar()
+        except Exception as e:
+            logger.warning(f"⚠️  Sincronização de caches sem conexão no arranque ({e}); a tentar em segundo plano")
+            self._agendar_reconexao()
+            return False
+        definir_caches_locais_validas(True)
+        return True
+
+    async def parar(self, prazo: float = 2) -> None:
+        """Envia o que ainda estiver na fila (até `prazo` segundos) e fecha a conexão."""
+        if not self._ativo:
+            return
+        self._ativo = False
+        definir_publicador(None)
+        try:
+            await asyncio.wait_for(self._fila.join(), prazo)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️  {self._fila.qsize()} notificação(ões) de cache não enviadas no shutdown")
+        for tarefa in (self._tarefa, self._reconexao):
+            if tarefa is not None:
+                tarefa.cancel()
+        if self._conexao is not None and not self._conexao.is_closed():
+            await self._conexao.close()
+
+    def estatisticas(self) -> dict:
+        return {
+            "ativa": self._ativo,
+            "conectada": self._conexao is not None and not self._conexao.is_closed(),
+            "caches_locais_validas": caches_locais_validas(),
+            "enviadas": self.enviadas,
+            "recebidas": self.recebidas,
+            "reconexoes": self.reconexoes
+        }
+
+    # ==========================
+    # Conexão
+    # ==========================
+
+    async def _conectar(self) -> None:
+        import asyncpg  # só quando a sincronização está ativa
+
+        settings = get_settings()
+        conexao = await asyncpg.connect(
+            host=settings.db_host,
+            port=settings.db_port,
+            user=settings.db_user,
+            password=settings.db_password or None,
+            database=settings.db_name
+        )
+        await conexao.add_listener(CANAL, self._receber)
+        conexao.add_termination_listener(self._conexao_perdida)
+        self._conexao = conexao
+
+    def _conexao_perdida(self, conexao) -> None:
+        if self._ativo and conexao is self._conexao:
+            self._agendar_reconexao()
+
+    def _agendar_reconexao(self) -> asyncio.Task:
+        definir_caches_locais_validas(False)
+        if self._reconexao is None or self._reconexao.done():
+            self._reconexao = asyncio.create_task(self._reconectar())
+        return self._reconexao
+
+    async def _reconectar(self) -> None:
+        espera = ESPERA_RECONEXAO_MIN
+        while self._ativo:
+            try:
+                if self._conexao is not None and not self._conexao.is_closed():
+                    self._conexao.terminate()
+                await self._conectar()
+            except Exception as e:
+                logger.warning(f"⚠️  Sincronização de caches sem conexão ({e}); nova tentativa em {espera:.1f}s")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, ESPERA_RECONEXAO_MAX)
+                continue
+            # Notificações perdidas enquanto desligado: descartar o estado local
+            self.reconexoes += 1
+            cache_dashboard.limpar()
+            cache_usuarios.limpar()
+            definir_caches_locais_validas(True)
+            logger.info("🔄 Sincronização de caches reconectada; caches locais limpas")
+            return
+
+    # ==========================
+    # Envio e receção
+    # ==========================
+
+    def _publicar(self, mensagem: dict) -> None:
+        self._fila.put_nowait(json.dumps({**mensagem, "origem": self._origem}))
+
+    async def _enviar(self) -> None:
+        while True:
+            mensagem = await self._fila.get()
+            try:
+                while True:
+                    try:
+                        await self._conexao.execute("SELECT pg_notify($1, $2)", CANAL, mensagem)
+                        self.enviadas += 1
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        if not self._ativo:
+                            break
+                        logger.warning(f"⚠️  Falha ao publicar alteração de cache: {e}")
+                        await self._agendar_reconexao()
+            finally:
+                self._fila.task_done()
+
+    def _receber(self, conexao, pid: int, canal: str, carga: str) -> None:
+        try:
+            mensagem = json.loads(carga)
+        except ValueError:
+            logger.warning(f"⚠️  Notificação de cache inválida: {carga[:200]}")
+            return
+        if mensagem.get("origem") == self._origem:
+            return
+        self.recebidas += 1
+        tipo = mensagem.get("tipo")
+        if tipo == "versao":
+            recursos = mensagem.get("recursos", [])
+            incrementar_versao(mensagem["usuario"], *recursos, propagar=False)
+            if RECURSO_USUARIO in recursos:
+                cache_usuarios.invalidar(mensagem["usuario"])
+        elif tipo == "catalogo":
+            asyncio.create_task(self._recarregar_catalogo())
+
+    async def _recarregar_catalogo(self) -> None:
+        try:
+            await recarregar_catalogo(propagar=False)
+        except Exception as e:
+            logger.warning(f"⚠️  Catálogo de países não recarregado após notificação: {e}")
+
+sincronizador = Sincronizador()
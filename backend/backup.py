@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cópia de segurança e restauro da base de dados no formato JSON de
+database/backup_gestaSaaS_*.json: um objeto com um array de linhas por tabela.
+
+  exportar   escreve o JSON linha a linha a partir de cursores do lado do
+             servidor, num único snapshot (REPEATABLE READ), sem carregar
+             nenhuma tabela inteira em memória
+  restaurar  lê o JSON em streaming (ijson) e carrega cada tabela com COPY,
+             pela ordem das chaves estrangeiras, numa única transação
+
+No restauro os triggers de usuário ficam desativados durante o COPY: o de
+criação de usuário duplicaria categorias, plataformas, meios de pagamento e
+configurações que já vêm no backup, e os de resumo_diario/resumo_mensal
+seriam executados linha a linha. No fim os resumos são reconstruídos de uma
+vez, a sequência de paises é acertada e as tabelas são analisadas.
+
+Uso (a partir de backend/, com as variáveis DB_* da aplicação):
+    python backup.py exportar ../database/backup_$(date +%Y%m%d_%H%M%S).json
+    python backup.py restaurar ../database/backup_gestaSaaS_20251027_181555.json --substituir
+
+--substituir esvazia as tabelas antes de restaurar (TRUNCATE ... CASCADE,
+que também apaga sessoes, codigos_verificacao e arquivos). Sem ele o restauro
+só prossegue se as tabelas de destino estiverem vazias.
+"""
+
+import argparse
+import datetime
+import decimal
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List
+
+from app.database import get_engine
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - só o restauro precisa do ijson
+    ijson = None
+
+# Ordem das chaves estrangeiras (e das chaves no ficheiro exportado)
+TABELAS = (
+    "paises", "usuarios", "categorias", "plataformas",
+    "meios_pagamento", "transacoes", "configuracoes_usuario"
+)
+
+DEPENDENCIAS = {
+    "paises": (),
+    "usuarios": ("paises",),
+    "categorias": ("usuarios",),
+    "plataformas": ("usuarios",),
+    "meios_pagamento": ("usuarios",),
+    "transacoes": ("usuarios", "categorias", "plataformas", "meios_pagamento"),
+    "configuracoes_usuario": ("usuarios",),
+}
+
+# Tabelas derivadas de transacoes: não são exportadas, são reconstruídas no restauro
+RESUMOS = ("resumo_diario", "resumo_mensal")
+
+LINHAS_POR_LOTE = 5000
+TAMANHO_BLOCO_COPY = 1 << 16
+
+# ============================================
+# Colunas
+# ============================================
+
+def _colunas(cursor) -> Dict[str, List[str]]:
+    """Colunas graváveis de cada tabela, pela ordem da tabela (sem colunas geradas)."""
+    cursor.execute(
+        """
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = ANY(%s)
+          AND is_generated = 'NEVER'
+        ORDER BY table_name, ordinal_position
+        """,
+        (list(TABELAS),)
+    )
+    colunas: Dict[str, List[str]] = {tabela: [] for tabela in TABELAS}
+    for tabela, coluna in cursor.fetchall():
+        colunas[tabela].append(coluna)
+    em_falta = [tabela for tabela, lista in colunas.items() if not lista]
+    if em_falta:
+        raise SystemExit(f"Tabelas inexistentes na base de dados: {', '.join(em_falta)}")
+    return colunas
+
+# ============================================
+# Exportar
+# ============================================
+
+def _valor_json(valor):
+    # Mesmo formato dos backups existentes: decimais como string ("400.00")
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, uuid.UUID):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+def exportar(caminho: str) -> None:
+    conexao = get_engine().raw_connection()
+    inicio = time.perf_counter()
+    temporario = f"{caminho}.parcial"
+    try:
+        conexao.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        colunas = _colunas(conexao.cursor())
+        with open(temporario, "w", encoding="utf-8") as saida:
+            saida.write("{")
+            for indice, tabela in enumerate(TABELAS):
+                saida.write(f'{"," if indice else ""}\n  {json.dumps(tabela)}: [')
+                nomes = colunas[tabela]
+                # Cursor nomeado: o servidor envia as linhas aos lotes
+                cursor = conexao.cursor(name=f"exportar_{tabela}")
+                cursor.itersize = LINHAS_POR_LOTE
+                cursor.execute(
+                    f"SELECT {', '.join(nomes)} FROM {tabela} ORDER BY {nomes[0]}"
+                )
+                total = 0
+                for linha in cursor:
+                    saida.write(",\n    " if total else "\n    ")
+                    saida.write(json.dumps(
+                        dict(zip(nomes, linha)), ensure_ascii=False, default=_valor_json
+                    ))
+                    total += 1
+                cursor.close()
+                saida.write("\n  ]" if total else "]")
+                print(f"  {tabela}: {total} linhas")
+            saida.write("\n}\n")
+        conexao.rollback()
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        conexao.close()
+    print(f"Backup escrito em {caminho} ({time.perf_counter() - inicio:.1f}s).")
+
+# ============================================
+# Restaurar
+# ============================================
+
+_ESCAPES_COPY = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _valor_copy(valor) -> str:
+    """Valor no formato de texto do COPY (NULL como \\N)."""
+    if valor is None:
+        return "\\N"
+    if valor is True:
+        return "t"
+    if valor is False:
+        return "f"
+    if isinstance(valor, str):
+        return valor.translate(_ESCAPES_COPY)
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False).translate(_ESCAPES_COPY)
+    return str(valor)
+
+class _FluxoCopy:
+    """Objeto tipo ficheiro que o copy_expert lê, alimentado por um gerador de linhas."""
+
+    def __init__(self, linhas: Iterable[bytes]):
+        self._linhas = iter(linhas)
+        self._resto = b""
+
+    def read(self, tamanho: int = -1) -> bytes:
+        partes, total = [self._resto], len(self._resto)
+        for linha in self._linhas:
+            partes.append(linha)
+            total += len(linha)
+            if 0 <= tamanho <= total:
+                break
+        dados = b"".join(partes)
+        if tamanho < 0:
+            self._resto = b""
+            return dados
+        self._resto = dados[tamanho:]
+        return dados[:tamanho]
+
+def _itens(eventos: Iterator, tabela: str) -> Iterator[dict]:
+    """Objetos do array de uma tabela, a partir dos eventos do ijson.parse."""
+    prefixo_item = f"{tabela}.item"
+    for prefixo, evento, valor in eventos:
+        if prefixo == tabela and evento == "end_array":
+            return
+        if prefixo == prefixo_item and evento == "start_map":
+            construtor = ijson.ObjectBuilder()
+            construtor.event(evento, valor)
+            for prefixo, evento, valor in eventos:
+                construtor.event(evento, valor)
+                if prefixo == prefixo_item and evento == "end_map":
+                    break
+            yield construtor.value
+
+def _linhas_copy(itens: Iterator[dict], tabela: str, colunas_db: List[str], estado: dict) -> Iterator[bytes]:
+    """Converte os objetos em linhas do COPY; as colunas vêm do primeiro objeto."""
+    for item in itens:
+        if estado["colunas"] is None:
+            estado["colunas"] = [coluna for coluna in item if coluna in colunas_db]
+            ignoradas = [coluna for coluna in item if coluna not in colunas_db]
+            if ignoradas:
+                print(f"  {tabela}: colunas ignoradas (não existem na tabela): {', '.join(ignoradas)}")
+        estado["total"] += 1
+        yield ("\t".join(_valor_copy(item.get(coluna)) for coluna in estado["colunas"]) + "\n").encode("utf-8")
+
+def _encadear(primeira: bytes, restantes: Iterator[bytes]) -> Iterator[bytes]:
+    yield primeira
+    yield from restantes
+
+def _copiar(cursor, tabela: str, colunas: List[str], fluxo) -> None:
+    cursor.copy_expert(
+        f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN", fluxo, size=TAMANHO_BLOCO_COPY
+    )
+
+def restaurar(caminho: str, substituir: bool = False) -> None:
+    if ijson is None:
+        raise SystemExit("O restauro precisa do pacote ijson (pip install -r requirements.txt)")
+
+    conexao = get_engine().raw_connection()
+    cursor = conexao.cursor()
+    inicio = time.perf_counter()
+    carregadas = set()
+    # Tabelas que aparecem no ficheiro antes das tabelas de que dependem ficam
+    # num ficheiro temporário, já no formato do COPY, até poderem ser carregadas
+    pendentes: Dict[str, tuple] = {}
+    try:
+        colunas_db = _colunas(cursor)
+
+        if substituir:
+            cursor.execute(f"TRUNCATE {', '.join(TABELAS + RESUMOS)} RESTART IDENTITY CASCADE")
+        else:
+            ocupadas = []
+            for tabela in TABELAS:
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {tabela})")
+                if cursor.fetchone()[0]:
+                    ocupadas.append(tabela)
+            if ocupadas:
+                raise SystemExit(
+                    f"Tabelas com dados: {', '.join(ocupadas)}. Use --substituir para as esvaziar antes do restauro."
+                )
+
+        for tabela in TABELAS:
+            cursor.execute(f"ALTER TABLE {tabela} DISABLE TRIGGER USER")
+
+        def carregar_pendentes():
+            for tabela, (temporario, estado) in list(pendentes.items()):
+                if all(dependencia in carregadas for dependencia in DEPENDENCIAS[tabela]):
+                    temporario.seek(0)
+                    _copiar(cursor, tabela, estado["colunas"], temporario)
+                    temporario.close()
+                    del pendentes[tabela]
+                    carregadas.add(tabela)
+                    print(f"  {tabela}: {estado['total']} linhas")
+                    carregar_pendentes()
+                    return
+
+        with open(caminho, "rb") as entrada:
+            eventos = ijson.parse(entrada, use_float=False)
+            for prefixo, evento, valor in eventos:
+                if prefixo != "" or evento != "map_key":
+                    continue
+                if valor not in DEPENDENCIAS:
+                    print(f"  {valor}: tabela desconhecida, ignorada")
+                    continue
+                estado = {"colunas": None, "total": 0}
+                linhas = _linhas_copy(_itens(eventos, valor), valor, colunas_db[valor], estado)
+                # Só é possível saber as colunas depois do primeiro objeto
+                primeira = next(linhas, None)
+                if primeira is None:
+                    carregadas.add(valor)
+                    print(f"  {valor}: 0 linhas")
+                    carregar_pendentes()
+                    continue
+                if all(dependencia in carregadas for dependencia in DEPENDENCIAS[valor]):
+                    _copiar(cursor, valor, estado["colunas"], _FluxoCopy(_encadear(primeira, linhas)))
+                    carregadas.add(valor)
+                    print(f"  {valor}: {estado['total']} linhas")
+                    carregar_pendentes()
+                else:
+                    temporario = tempfile.TemporaryFile()
+                    for linha in _encadear(primeira, linhas):
+                        temporario.write(linha)
+                    pendentes[valor] = (temporario, estado)
+
+        if pendentes:
+            raise SystemExit(f"Dependências em falta no backup para: {', '.join(pendentes)}")
+
+        for tabela in TABELAS:
+            cursor.execute(f"ALTER TABLE {tabela} ENABLE TRIGGER USER")
+
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('paises', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM paises"
+        )
+        cursor.execute("SELECT reconstruir_resumo_diario()")
+        print(f"  resumo_diario: {cursor.fetchone()[0]} linhas reconstruídas")
+        cursor.execute("SELECT reconstruir_resumo_mensal()")
+        print(f"  resumo_mensal: {cursor.fetchone()[0]} linhas reconstruídas")
+        conexao.commit()
+    except BaseException:
+        conexao.rollback()
+        raise
+    finally:
+        for temporario, _ in pendentes.values():
+            temporario.close()
+
+    try:
+        # ANALYZE fora da transação do restauro: as estatísticas das tabelas
+        # acabadas de carregar estão vazias até o autovacuum passar
+        conexao.autocommit = True
+        for tabela in TABELAS + RESUMOS:
+            cursor.execute(f"ANALYZE {tabela}")
+    finally:
+        conexao.close()
+
+    print(f"Restauro concluído em {time.perf_counter() - inicio:.1f}s.")
+    # A API guarda o catálogo de países e as versões dos dados em memória
+    print("Reinicie a API (ou POST /api/configuracoes/paises/recarregar) para descartar as caches.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cópia de segurança e restauro em JSON")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    exportar_parser = subcomandos.add_parser("exportar", help="Escrever o backup JSON")
+    exportar_parser.add_argument("ficheiro")
+
+    restaurar_parser = subcomandos.add_parser("restaurar", help="Carregar um backup JSON")
+    restaurar_parser.add_argument("ficheiro")
+    restaurar_parser.add_argument("--substituir", action="store_true",
+                                  help="Esvaziar as tabelas antes de restaurar")
+
+    args = parser.parse_args()
+    if args.comando == "exportar":
+        exportar(args.ficheiro)
+    else:
+        restaurar(args.ficheiro, args.substituir)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark do tempo de importação da aplicação (arranque de um worker)
+
+Corre `python -X importtime -c "import app.main"` em `--repeticoes` processos
+novos e mostra a mediana do tempo total do processo e do tempo acumulado de
+importação dos módulos da aplicação (app.*) e dos mais pesados de terceiros.
+Não precisa de base de dados: importar a aplicação não abre conexões.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_arranque.py --repeticoes 15
+    python benchmarks/bench_arranque.py --modulo app.main --top 15
+
+Para comparar duas versões, apontar --diretorio para o backend/ de uma git
+worktree da outra versão e correr as duas medições com o mesmo interpretador.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+def _importar(modulo: str, diretorio: str):
+    """Tempo total do processo (ms) e tempo acumulado por módulo (ms)."""
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=diretorio, capture_output=True, text=True
+    )
+    total = (time.perf_counter() - inicio) * 1000
+    if processo.returncode != 0:
+        sys.exit(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+    acumulados = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        # "import time: <próprio> | <acumulado> | <indentação><módulo>" (µs)
+        _, acumulado, nome = linha[len("import time:"):].split("|")
+        acumulados[nome.strip()] = int(acumulado) / 1000
+    return total, acumulados
+
+def main(args):
+    totais = []
+    por_modulo = defaultdict(list)
+    _importar(args.modulo, args.diretorio)  # aquece a cache de bytecode e do sistema de ficheiros
+    for _ in range(args.repeticoes):
+        total, acumulados = _importar(args.modulo, args.diretorio)
+        totais.append(total)
+        for nome, valor in acumulados.items():
+            por_modulo[nome].append(valor)
+
+    medianas = {nome: statistics.median(valores) for nome, valores in por_modulo.items()}
+    print(f"{args.repeticoes} processos, python {sys.version.split()[0]}")
+    print(f"processo completo (arranque do interpretador + import): mediana {statistics.median(totais):.1f}ms, "
+          f"mín {min(totais):.1f}ms")
+    print(f"import {args.modulo}: mediana {medianas.get(args.modulo, 0):.1f}ms\n")
+
+    aplicacao = sorted(
+        ((nome, valor) for nome, valor in medianas.items() if nome == "app" or nome.startswith("app.")),
+        key=lambda item: -item[1]
+    )
+    print("Módulos da aplicação (acumulado, mediana):")
+    for nome, valor in aplicacao[:args.top]:
+        print(f"  {nome:<32} {valor:>8.1f}ms")
+
+    # Pacotes de topo de terceiros (inclui drivers que só deviam carregar com o engine)
+    terceiros = sorted(
+        ((nome, valor) for nome, valor in medianas.items() if "." not in nome and nome != "app"),
+        key=lambda item: -item[1]
+    )
+    print("\nPacotes de terceiros (acumulado, mediana):")
+    for nome, valor in terceiros[:args.top]:
+        print(f"  {nome:<32} {valor:>8.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de importação da aplicação")
+    parser.add_argument("--repeticoes", type=int, default=15)
+    parser.add_argument("--modulo", default="app.main")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--diretorio", default=BACKEND,
+                        help="Diretório backend/ a medir (ex.: uma git worktree de outra versão)")
+    main(parser.parse_args())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de concorrência da API
+
+Mede quanto as queries de um endpoint pesado atrasam os pedidos leves que
+chegam ao mesmo worker. Com a sessão síncrona cada query bloqueia o event
+loop do uvicorn; com o asyncpg os pedidos leves continuam a ser servidos.
+
+Fases:
+  1. leve sozinho:  GET /api/auth/me em série (latência de referência)
+  2. misto:         `--concorrencia` clientes a pedir listagens e estatísticas
+                    (com períodos variados, para não acertar na cache do
+                    dashboard) enquanto um cliente mede /api/auth/me
+
+Uso (servidor a correr com um único worker):
+    pip install httpx
+    python benchmarks/bench_concorrencia.py --url http://localhost:3001 --semear 20000
+
+Para comparar, correr contra o commit anterior e contra este com os mesmos
+argumentos e a mesma base de dados.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+import httpx
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+def resumo(nome, latencias, duracao):
+    ms = [valor * 1000 for valor in latencias]
+    print(
+        f"{nome:<22} pedidos={len(ms):>6}  rps={len(ms) / duracao:>8.1f}  "
+        f"p50={percentil(ms, 50):>7.1f}ms  p95={percentil(ms, 95):>7.1f}ms  "
+        f"p99={percentil(ms, 99):>7.1f}ms  max={max(ms, default=0):>7.1f}ms"
+    )
+
+async def autenticar(cliente, email, senha):
+    resposta = await cliente.post("/api/auth/login", json={"email": email, "senha": senha})
+    if resposta.status_code == 401:
+        registo = await cliente.post("/api/auth/register", json={
+            "nome": "Benchmark",
+            "email": email,
+            "senha": senha,
+            "telefone": str(random.randint(10 ** 8, 10 ** 9 - 1)),
+            "pais_id": 1
+        })
+        registo.raise_for_status()
+        resposta = await cliente.post("/api/auth/login", json={"email": email, "senha": senha})
+    resposta.raise_for_status()
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+async def _semear(cliente, headers, quantidade):
+    """Cria `quantidade` transações espalhadas pelos últimos dois anos, em lotes."""
+    hoje = date.today()
+    categorias = (await cliente.get("/api/configuracoes/categorias", headers=headers)).json()
+    restantes = quantidade
+    while restantes > 0:
+        lote = []
+        for _ in range(min(restantes, 5000)):
+            tipo = "receita" if random.random() < 0.7 else "despesa"
+            candidatas = [c["id"] for c in categorias if c["tipo"] == tipo] or [None]
+            lote.append({
+                "tipo": tipo,
+                "valor": round(random.uniform(3, 60), 2),
+                "km_percorridos": round(random.uniform(1, 25), 2) if tipo == "receita" else None,
+                "categoria_id": random.choice(candidatas),
+                "data_transacao": str(hoje - timedelta(days=random.randint(0, 730))),
+                "descricao": random.choice(["corrida aeroporto", "entrega centro", "combustível", "portagem"])
+            })
+        resposta = await cliente.post("/api/transacoes/bulk", headers=headers, json={"itens": lote}, timeout=120)
+        resposta.raise_for_status()
+        restantes -= len(lote)
+
+def _pedido_pesado():
+    if random.random() < 0.5:
+        return "/api/transacoes/", {"limit": 100, "skip": random.randint(0, 2000)}
+    inicio = date.today() - timedelta(days=random.randint(30, 700))
+    return "/api/dashboard/stats", {"data_inicio": str(inicio), "data_fim": str(date.today())}
+
+async def _medir_leve(cliente, headers, ate, latencias):
+    while time.perf_counter() < ate:
+        inicio = time.perf_counter()
+        resposta = await cliente.get("/api/auth/me", headers=headers)
+        resposta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+
+async def _carga_pesada(cliente, headers, ate, latencias):
+    while time.perf_counter() < ate:
+        caminho, params = _pedido_pesado()
+        inicio = time.perf_counter()
+        resposta = await cliente.get(caminho, headers=headers, params=params)
+        resposta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+
+async def main(args):
+    limites = httpx.Limits(max_connections=args.concorrencia + 4)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=60) as cliente:
+        headers = await autenticar(cliente, args.email, args.senha)
+        if args.semear:
+            print(f"A semear {args.semear} transações...")
+            await _semear(cliente, headers, args.semear)
+
+        leve = []
+        ate = time.perf_counter() + args.duracao
+        await _medir_leve(cliente, headers, ate, leve)
+        resumo("leve sozinho", leve, args.duracao)
+
+        leve_misto, pesado = [], []
+        ate = time.perf_counter() + args.duracao
+        await asyncio.gather(
+            _medir_leve(cliente, headers, ate, leve_misto),
+            *[_carga_pesada(cliente, headers, ate, pesado) for _ in range(args.concorrencia)]
+        )
+        resumo("leve durante carga", leve_misto, args.duracao)
+        resumo(f"pesado (x{args.concorrencia})", pesado, args.duracao)
+
+        if leve and leve_misto:
+            atraso = statistics.median(leve_misto) / statistics.median(leve)
+            print(f"Atraso do pedido leve sob carga (p50): {atraso:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência da API")
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--email", default=f"bench-{uuid.uuid4().hex[:8]}@exemplo.com")
+    parser.add_argument("--senha", default="benchmark123")
+    parser.add_argument("--semear", type=int, default=0, help="Transações a criar antes de medir")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos por fase")
+    asyncio.run(main(parser.parse_args()))
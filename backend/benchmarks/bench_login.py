@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de rajada de logins
+
+Dispara `--concorrencia` clientes a fazer login em ciclo e, ao mesmo tempo,
+mede a latência de um pedido não relacionado (GET /health). Com o hashing
+no event loop cada login congela o worker; com o pool de hashing os outros
+pedidos continuam a ser servidos e os logins acima da fila recebem 503.
+
+Uso (servidor a correr com um único worker):
+    pip install httpx
+    python benchmarks/bench_login.py --url http://localhost:3001 --concorrencia 32
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from bench_concorrencia import autenticar, resumo
+
+async def _rajada_logins(cliente, email, senha, ate, latencias, recusados):
+    while time.perf_counter() < ate:
+        inicio = time.perf_counter()
+        resposta = await cliente.post("/api/auth/login", json={"email": email, "senha": senha})
+        if resposta.status_code == 503:
+            recusados.append(time.perf_counter() - inicio)
+            await asyncio.sleep(float(resposta.headers.get("Retry-After", "1")))
+            continue
+        resposta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+
+async def _medir_health(cliente, ate, latencias):
+    while time.perf_counter() < ate:
+        inicio = time.perf_counter()
+        resposta = await cliente.get("/health")
+        resposta.raise_for_status()
+        latencias.append(time.perf_counter() - inicio)
+        await asyncio.sleep(0.01)
+
+async def main(args):
+    limites = httpx.Limits(max_connections=args.concorrencia + 4)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=120) as cliente:
+        await autenticar(cliente, args.email, args.senha)
+
+        referencia = []
+        ate = time.perf_counter() + args.duracao
+        await _medir_health(cliente, ate, referencia)
+        resumo("health sozinho", referencia, args.duracao)
+
+        logins, recusados, health = [], [], []
+        ate = time.perf_counter() + args.duracao
+        await asyncio.gather(
+            _medir_health(cliente, ate, health),
+            *[_rajada_logins(cliente, args.email, args.senha, ate, logins, recusados) for _ in range(args.concorrencia)]
+        )
+        resumo("health durante logins", health, args.duracao)
+        resumo(f"login (x{args.concorrencia})", logins, args.duracao)
+        print(f"Logins recusados com 503: {len(recusados)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de rajada de logins")
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--email", default=f"bench-{uuid.uuid4().hex[:8]}@exemplo.com")
+    parser.add_argument("--senha", default="benchmark123")
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos por fase")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark da serialização da listagem de transações
+
+Compara, no próprio processo e contra a base de dados configurada no .env,
+os dois caminhos de GET /api/transacoes para uma página de `--limite` linhas:
+
+  orm        select(Transacao) com joinedload dos três relacionamentos,
+             validação de TransacaoResponse a partir dos atributos e
+             dump_json (o que o FastAPI faz com response_model)
+  orm+std    igual, mas com jsonable_encoder + json.dumps (FastAPI sem o
+             caminho dump_json, ou rotas sem response_model)
+  projecao   selecionar_transacoes → dicts → RespostaJSON (caminho atual)
+
+Os três produzem o mesmo JSON; o benchmark confirma-o antes de medir.
+
+Uso (a partir de backend/, com as variáveis DB_* da aplicação):
+    python benchmarks/bench_serializacao.py --limite 100 --repeticoes 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select, desc, func
+from sqlalchemy.orm import joinedload
+
+from app.database import AsyncSessionLocal, fechar_engines
+from app.models import Transacao
+from app.projecoes import selecionar_transacoes, transacao_para_dict
+from app.respostas import para_json, orjson
+from app.schemas import TransacaoResponse
+
+from bench_concorrencia import percentil
+
+LISTA_TRANSACOES = TypeAdapter(List[TransacaoResponse])
+ORDEM = (desc(Transacao.data_transacao), desc(Transacao.created_at), desc(Transacao.id))
+
+async def _orm(db, usuario_id, limite):
+    consulta = select(Transacao).options(
+        joinedload(Transacao.categoria),
+        joinedload(Transacao.plataforma),
+        joinedload(Transacao.meio_pagamento)
+    ).where(Transacao.usuario_id == usuario_id).order_by(*ORDEM).limit(limite)
+    transacoes = (await db.scalars(consulta)).all()
+    meio = time.perf_counter()
+    corpo = LISTA_TRANSACOES.dump_json(LISTA_TRANSACOES.validate_python(transacoes, from_attributes=True))
+    db.expunge_all()
+    return meio, corpo
+
+async def _orm_std(db, usuario_id, limite):
+    consulta = select(Transacao).options(
+        joinedload(Transacao.categoria),
+        joinedload(Transacao.plataforma),
+        joinedload(Transacao.meio_pagamento)
+    ).where(Transacao.usuario_id == usuario_id).order_by(*ORDEM).limit(limite)
+    transacoes = (await db.scalars(consulta)).all()
+    meio = time.perf_counter()
+    validadas = LISTA_TRANSACOES.validate_python(transacoes, from_attributes=True)
+    corpo = json.dumps(jsonable_encoder(validadas), ensure_ascii=False, separators=(",", ":")).encode()
+    db.expunge_all()
+    return meio, corpo
+
+async def _projecao(db, usuario_id, limite):
+    consulta = selecionar_transacoes(Transacao.usuario_id == usuario_id).order_by(*ORDEM).limit(limite)
+    linhas = (await db.execute(consulta)).all()
+    meio = time.perf_counter()
+    corpo = para_json([transacao_para_dict(linha) for linha in linhas])
+    return meio, corpo
+
+CAMINHOS = {"orm": _orm, "orm+std": _orm_std, "projecao": _projecao}
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        usuario_id = (await db.execute(
+            select(Transacao.usuario_id).group_by(Transacao.usuario_id)
+            .order_by(func.count().desc()).limit(1)
+        )).scalar()
+        if usuario_id is None:
+            sys.exit("Sem transações na base de dados (ver bench_concorrencia.py --semear)")
+
+        corpos = {nome: (await caminho(db, usuario_id, args.limite))[1] for nome, caminho in CAMINHOS.items()}
+        referencia = json.loads(corpos["orm"])
+        for nome, corpo in corpos.items():
+            assert json.loads(corpo) == referencia, f"JSON diferente no caminho {nome}"
+        print(f"Página de {len(referencia)} transações, {len(corpos['projecao'])} bytes; "
+              f"serializador: {'orjson' if orjson else 'pydantic_core'}")
+
+        for nome, caminho in CAMINHOS.items():
+            consultas, serializacoes, totais = [], [], []
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                meio, _ = await caminho(db, usuario_id, args.limite)
+                fim = time.perf_counter()
+                consultas.append((meio - inicio) * 1000)
+                serializacoes.append((fim - meio) * 1000)
+                totais.append((fim - inicio) * 1000)
+            print(
+                f"{nome:<10} query+objetos p50={percentil(consultas, 50):>6.2f}ms  "
+                f"serialização p50={percentil(serializacoes, 50):>6.2f}ms  "
+                f"total p50={percentil(totais, 50):>6.2f}ms  p95={percentil(totais, 95):>6.2f}ms"
+            )
+
+    await fechar_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da serialização da listagem de transações")
+    parser.add_argument("--limite", type=int, default=100)
+    parser.add_argument("--repeticoes", type=int, default=300)
+    asyncio.run(main(parser.parse_args()))
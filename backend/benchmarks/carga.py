@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste de carga HTTP da API com resultados em JSON
+
+Usa as contas criadas por gerar_dados.py (lidas do manifesto) e corre
+`--concorrencia` clientes durante `--duracao` segundos. Cada cliente escolhe
+uma conta e uma operação ao acaso, com os pesos de `--mix`:
+
+  login           POST /api/auth/login
+  bootstrap       GET  /api/bootstrap
+  dashboard_stats GET  /api/dashboard/stats
+  grafico_mensal  GET  /api/dashboard/grafico-mensal
+  listar          GET  /api/transacoes/ (página offset ao acaso)
+  listar_cursor   GET  /api/transacoes/?paginacao=cursor, seguindo até 3 páginas
+  buscar          GET  /api/transacoes/buscar/texto
+  criar           POST /api/transacoes/
+
+Por operação regista pedidos, erros, códigos de estado, débito e latências
+p50/p95/p99, e grava tudo em `--saida`. Com `--comparar base.json novo.json`
+mostra a diferença entre duas execuções e termina com código 1 se alguma
+operação piorar mais do que `--limiar` por cento (p95 ou débito).
+
+Uso (servidor a correr contra a base de dados de benchmark, ver README.md):
+    python benchmarks/carga.py --url http://localhost:3001 --concorrencia 32 --duracao 60
+    python benchmarks/carga.py --comparar resultados/antes.json resultados/depois.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from bench_concorrencia import percentil
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+MIX_PADRAO = "login=2,bootstrap=8,dashboard_stats=20,grafico_mensal=10,listar=25,listar_cursor=10,buscar=15,criar=10"
+
+class Registo:
+    """Latências e estados por operação; ignora tudo enquanto `ativo` é falso (aquecimento)."""
+
+    def __init__(self):
+        self.ativo = False
+        self.latencias = defaultdict(list)
+        self.estados = defaultdict(Counter)
+        self.erros = Counter()
+
+    async def pedido(self, cliente, operacao, metodo, caminho, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.request(metodo, caminho, **kwargs)
+            estado = str(resposta.status_code)
+        except httpx.HTTPError as erro:
+            resposta, estado = None, type(erro).__name__
+        duracao = time.perf_counter() - inicio
+        if self.ativo:
+            self.estados[operacao][estado] += 1
+            if resposta is not None and resposta.status_code < 400:
+                self.latencias[operacao].append(duracao)
+            else:
+                self.erros[operacao] += 1
+        return resposta
+
+class Conta:
+    """Conta sintética com token e ids de categorias/plataformas, preparada uma vez."""
+
+    def __init__(self, email):
+        self.email = email
+        self.headers = None
+        self.categorias = {}
+        self.plataformas = []
+
+    async def preparar(self, cliente, senha):
+        if self.headers is not None:
+            return
+        while True:
+            resposta = await cliente.post("/api/auth/login", json={"email": self.email, "senha": senha})
+            if resposta.status_code != 503:
+                break
+            # Fila de hashing cheia: esperar como um cliente real
+            await asyncio.sleep(float(resposta.headers.get("Retry-After", "1")))
+        resposta.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+        dados = (await cliente.get("/api/bootstrap", headers=self.headers)).json()
+        for categoria in dados["categorias"]:
+            self.categorias.setdefault(categoria["tipo"], []).append(categoria["id"])
+        self.plataformas = [plataforma["id"] for plataforma in dados["plataformas"]]
+
+# ==========================
+# Operações
+# ==========================
+async def _login(cliente, conta, contexto):
+    await contexto.registo.pedido(
+        cliente, "login", "POST", "/api/auth/login",
+        json={"email": conta.email, "senha": contexto.senha}
+    )
+
+async def _bootstrap(cliente, conta, contexto):
+    await contexto.registo.pedido(cliente, "bootstrap", "GET", "/api/bootstrap", headers=conta.headers)
+
+async def _dashboard_stats(cliente, conta, contexto):
+    params = {}
+    if contexto.periodos_variados:
+        # Períodos diferentes a cada pedido: mede o cálculo e não a cache
+        data_fim = contexto.data_fim - timedelta(days=contexto.rng.randint(0, 60))
+        params = {"data_inicio": str(data_fim - timedelta(days=contexto.rng.randint(7, 365))), "data_fim": str(data_fim)}
+    await contexto.registo.pedido(cliente, "dashboard_stats", "GET", "/api/dashboard/stats", headers=conta.headers, params=params)
+
+async def _grafico_mensal(cliente, conta, contexto):
+    meses = contexto.rng.choice([6, 6, 6, 12]) if not contexto.periodos_variados else contexto.rng.randint(1, 24)
+    await contexto.registo.pedido(
+        cliente, "grafico_mensal", "GET", "/api/dashboard/grafico-mensal",
+        headers=conta.headers, params={"meses": meses}
+    )
+
+async def _listar(cliente, conta, contexto):
+    # Utilizadores leem sobretudo as primeiras páginas
+    pagina = min(int(contexto.rng.expovariate(0.5)), 40)
+    await contexto.registo.pedido(
+        cliente, "listar", "GET", "/api/transacoes/",
+        headers=conta.headers, params={"limit": 50, "skip": pagina * 50}
+    )
+
+async def _listar_cursor(cliente, conta, contexto):
+    params = {"paginacao": "cursor", "limit": 50}
+    for _ in range(contexto.rng.randint(1, 3)):
+        resposta = await contexto.registo.pedido(
+            cliente, "listar_cursor", "GET", "/api/transacoes/", headers=conta.headers, params=params
+        )
+        if resposta is None or resposta.status_code >= 400 or not resposta.json().get("next_cursor"):
+            return
+        params = {**params, "cursor": resposta.json()["next_cursor"]}
+
+async def _buscar(cliente, conta, contexto):
+    await contexto.registo.pedido(
+        cliente, "buscar", "GET", "/api/transacoes/buscar/texto",
+        headers=conta.headers, params={"q": contexto.rng.choice(contexto.termos_busca)}
+    )
+
+async def _criar(cliente, conta, contexto):
+    rng = contexto.rng
+    valor = round(rng.lognormvariate(2.0, 0.5), 2)
+    await contexto.registo.pedido(
+        cliente, "criar", "POST", "/api/transacoes/", headers=conta.headers, json={
+            "tipo": "receita",
+            "valor": valor,
+            "gorjeta": round(rng.uniform(0.5, 3), 2) if rng.random() < 0.15 else None,
+            "km_percorridos": round(valor * rng.uniform(0.6, 1.1), 2),
+            "categoria_id": rng.choice(conta.categorias.get("receita", [None])),
+            "plataforma_id": rng.choice(conta.plataformas or [None]),
+            "descricao": "Corrida carga aeroporto",
+            "data_transacao": str(contexto.data_fim - timedelta(days=rng.randint(0, 30)))
+        }
+    )
+
+OPERACOES = {
+    "login": _login,
+    "bootstrap": _bootstrap,
+    "dashboard_stats": _dashboard_stats,
+    "grafico_mensal": _grafico_mensal,
+    "listar": _listar,
+    "listar_cursor": _listar_cursor,
+    "buscar": _buscar,
+    "criar": _criar,
+}
+
+class Contexto:
+    """Estado partilhado por um cliente virtual."""
+
+    def __init__(self, args, manifesto, registo, semente):
+        self.rng = random.Random(semente)
+        self.registo = registo
+        self.senha = manifesto["senha"]
+        self.termos_busca = manifesto["termos_busca"]
+        self.data_fim = date.fromisoformat(manifesto["data_fim"])
+        self.periodos_variados = args.periodos_variados
+
+def _ler_mix(texto):
+    mix = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in OPERACOES:
+            sys.exit(f"Operação desconhecida no --mix: {nome} (disponíveis: {', '.join(OPERACOES)})")
+        mix[nome] = float(peso or 1)
+    return mix
+
+async def _cliente_virtual(cliente, contas, mix, contexto, ate):
+    nomes, pesos = list(mix), list(mix.values())
+    while time.perf_counter() < ate:
+        conta = contexto.rng.choice(contas)
+        await conta.preparar(cliente, contexto.senha)
+        operacao = contexto.rng.choices(nomes, weights=pesos)[0]
+        await OPERACOES[operacao](cliente, conta, contexto)
+
+def _estatisticas(latencias, erros, estados, duracao):
+    ms = [valor * 1000 for valor in latencias]
+    return {
+        "pedidos": len(ms) + erros,
+        "erros": erros,
+        "estados": dict(estados),
+        "rps": round(len(ms) / duracao, 2),
+        "media_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        "p50_ms": round(percentil(ms, 50), 2),
+        "p95_ms": round(percentil(ms, 95), 2),
+        "p99_ms": round(percentil(ms, 99), 2),
+        "max_ms": round(max(ms, default=0), 2),
+    }
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DIRETORIO,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _imprimir(resultados):
+    print(f"{'operação':<16} {'pedidos':>8} {'erros':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for nome, dados in list(resultados["operacoes"].items()) + [("TOTAL", resultados["total"])]:
+        print(
+            f"{nome:<16} {dados['pedidos']:>8} {dados['erros']:>6} {dados['rps']:>8.1f} "
+            f"{dados['p50_ms']:>7.1f}ms {dados['p95_ms']:>7.1f}ms {dados['p99_ms']:>7.1f}ms"
+        )
+
+async def executar(args):
+    with open(args.dados, encoding="utf-8") as ficheiro:
+        manifesto = json.load(ficheiro)
+    mix = _ler_mix(args.mix)
+    contas = [Conta(email) for email in manifesto["usuarios"][:args.contas or None]]
+    registo = Registo()
+
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=args.timeout) as cliente:
+        contextos = [Contexto(args, manifesto, registo, args.semente + indice) for indice in range(args.concorrencia)]
+
+        # Login e ids de todas as contas antes de começar, fora da medição
+        limite = asyncio.Semaphore(4)
+        async def preparar(conta):
+            async with limite:
+                await conta.preparar(cliente, manifesto["senha"])
+        await asyncio.gather(*[preparar(conta) for conta in contas])
+
+        if args.aquecimento > 0:
+            print(f"Aquecimento: {args.aquecimento:.0f}s")
+            ate = time.perf_counter() + args.aquecimento
+            await asyncio.gather(*[_cliente_virtual(cliente, contas, mix, contexto, ate) for contexto in contextos])
+
+        print(f"Medição: {args.duracao:.0f}s com {args.concorrencia} clientes")
+        registo.ativo = True
+        inicio = time.perf_counter()
+        ate = inicio + args.duracao
+        await asyncio.gather(*[_cliente_virtual(cliente, contas, mix, contexto, ate) for contexto in contextos])
+        duracao = time.perf_counter() - inicio
+        registo.ativo = False
+
+    operacoes = {
+        nome: _estatisticas(registo.latencias[nome], registo.erros[nome], registo.estados[nome], duracao)
+        for nome in mix if registo.estados[nome]
+    }
+    todas = [latencia for nome in mix for latencia in registo.latencias[nome]]
+    estados_totais = sum(registo.estados.values(), Counter())
+    resultados = {
+        "rotulo": args.rotulo,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "url": args.url,
+        "python": platform.python_version(),
+        "parametros": {
+            "concorrencia": args.concorrencia,
+            "duracao": args.duracao,
+            "aquecimento": args.aquecimento,
+            "mix": mix,
+            "contas": len(contas),
+            "periodos_variados": args.periodos_variados,
+            "semente": args.semente,
+        },
+        "dados": {chave: manifesto[chave] for chave in ("semente", "transacoes_por_usuario", "dias", "data_fim")},
+        "duracao_real": round(duracao, 2),
+        "operacoes": operacoes,
+        "total": _estatisticas(todas, sum(registo.erros.values()), estados_totais, duracao),
+    }
+
+    _imprimir(resultados)
+    saida = args.saida or os.path.join(
+        DIRETORIO, "resultados", f"carga-{datetime.now():%Y%m%d-%H%M%S}{'-' + args.rotulo if args.rotulo else ''}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as ficheiro:
+        json.dump(resultados, ficheiro, ensure_ascii=False, indent=2)
+    print(f"Resultados: {saida}")
+
+# ==========================
+# Comparação
+# ==========================
+def _variacao(antes, depois):
+    if not antes:
+        return None
+    return (depois - antes) / antes * 100
+
+def comparar(caminho_base, caminho_novo, limiar):
+    with open(caminho_base, encoding="utf-8") as ficheiro:
+        base = json.load(ficheiro)
+    with open(caminho_novo, encoding="utf-8") as ficheiro:
+        novo = json.load(ficheiro)
+
+    print(f"base: {base.get('rotulo') or ''} {base.get('commit') or ''} ({base['data']})")
+    print(f"novo: {novo.get('rotulo') or ''} {novo.get('commit') or ''} ({novo['data']})")
+    if base["parametros"] != novo["parametros"] or base["dados"] != novo["dados"]:
+        print("Aviso: parâmetros ou dados diferentes entre as execuções")
+
+    print(f"{'operação':<16} {'rps':>20} {'p50':>22} {'p95':>22} {'p99':>22}")
+    regressoes = []
+    nomes = list(base["operacoes"]) + [nome for nome in novo["operacoes"] if nome not in base["operacoes"]]
+    for nome in nomes + ["TOTAL"]:
+        antes = base["total"] if nome == "TOTAL" else base["operacoes"].get(nome)
+        depois = novo["total"] if nome == "TOTAL" else novo["operacoes"].get(nome)
+        if not antes or not depois:
+            print(f"{nome:<16} (só numa das execuções)")
+            continue
+        colunas = []
+        for metrica, unidade in (("rps", ""), ("p50_ms", "ms"), ("p95_ms", "ms"), ("p99_ms", "ms")):
+            variacao = _variacao(antes[metrica], depois[metrica])
+            texto = f"{antes[metrica]:.1f}→{depois[metrica]:.1f}{unidade}"
+            colunas.append(f"{texto} {variacao:+5.0f}%" if variacao is not None else texto)
+        print(f"{nome:<16} " + " ".join(f"{coluna:>22}" for coluna in colunas))
+
+        pior_p95 = _variacao(antes["p95_ms"], depois["p95_ms"])
+        pior_rps = _variacao(antes["rps"], depois["rps"])
+        taxa_erros = lambda dados: dados["erros"] / dados["pedidos"] if dados["pedidos"] else 0
+        if pior_p95 is not None and pior_p95 > limiar:
+            regressoes.append(f"{nome}: p95 +{pior_p95:.0f}%")
+        if pior_rps is not None and pior_rps < -limiar:
+            regressoes.append(f"{nome}: rps {pior_rps:.0f}%")
+        if taxa_erros(depois) > taxa_erros(antes) + 0.01:
+            regressoes.append(f"{nome}: erros {taxa_erros(antes):.1%} → {taxa_erros(depois):.1%}")
+
+    if regressoes:
+        print(f"\nRegressões acima de {limiar:.0f}%:")
+        for regressao in regressoes:
+            print(f"  - {regressao}")
+        return 1
+    print(f"\nSem regressões acima de {limiar:.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga HTTP da API")
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--dados", default=os.path.join(DIRETORIO, "dados_carga.json"), help="Manifesto de gerar_dados.py")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--duracao", type=float, default=60.0, help="Segundos de medição")
+    parser.add_argument("--aquecimento", type=float, default=10.0, help="Segundos antes de medir")
+    parser.add_argument("--mix", default=MIX_PADRAO, help="Pesos por operação, ex.: listar=3,buscar=1")
+    parser.add_argument("--contas", type=int, default=0, help="Usar só as primeiras N contas (0 = todas)")
+    parser.add_argument("--periodos-variados", action="store_true", help="Períodos ao acaso no dashboard (evita a cache)")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--rotulo", default="", help="Nome da execução (entra no ficheiro)")
+    parser.add_argument("--saida", help="Ficheiro JSON de resultados (por omissão em benchmarks/resultados/)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois ficheiros de resultados")
+    parser.add_argument("--limiar", type=float, default=10.0, help="Percentagem a partir da qual há regressão")
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(comparar(*args.comparar, args.limiar))
+    asyncio.run(executar(args))
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gerador de dados sintéticos para os benchmarks
+
+Cria `--usuarios` contas com `--transacoes` transações cada, diretamente na
+base de dados configurada (variáveis DB_* da aplicação). As categorias,
+plataformas e meios de pagamento são os padrão, criados pelo trigger de
+usuarios. Cada conta tem um perfil (driver, delivery ou misto) que decide
+a mistura de plataformas, valores, KM, gorjetas e despesas.
+
+Tudo deriva de `--semente` e `--data-fim`: a mesma combinação gera os
+mesmos dados, ids das contas e transações incluídos (só os ids das
+categorias/plataformas, gerados pelo trigger, mudam). O manifesto escrito em
+`--manifesto` (contas, senha, termos de busca) é lido por carga.py.
+
+Uso (a partir de backend/):
+    ENVIRONMENT=development DB_HOST=localhost DB_PORT=55432 DB_NAME=gesta_benchmark \\
+        DB_USER=postgres DB_PASSWORD=benchmark \\
+        python benchmarks/gerar_dados.py --usuarios 50 --transacoes 2000 --limpar
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import delete, insert, select, text, func
+
+from app.database import SessionLocal
+from app.models import Usuario, Pais, Categoria, Plataforma, MeioPagamento, Transacao
+from app.auth import get_password_hash
+
+DOMINIO = "benchmark.local"
+SENHA_PADRAO = "benchmark123"
+TAMANHO_LOTE = 5000
+
+LOCAIS = [
+    "Lisboa - Baixa", "Lisboa - Parque das Nações", "Lisboa - Alvalade", "Lisboa - Belém",
+    "Porto - Boavista", "Porto - Ribeira", "Matosinhos", "Vila Nova de Gaia",
+    "Braga - Centro", "Coimbra - Baixa", "Faro - Centro", "Aeroporto Humberto Delgado",
+    "Aeroporto Francisco Sá Carneiro", "Almada", "Oeiras", "Cascais", "Amadora", "Setúbal"
+]
+RESTAURANTES = [
+    "McDonald's", "Burger King", "Telepizza", "Pizza Hut", "KFC", "Sushi Home", "Vitaminas",
+    "H3", "Padaria Portuguesa", "Taco Bell", "Pans & Company", "Honorato", "Poke House"
+]
+POSTOS = ["Galp", "BP", "Repsol", "Prio", "Cepsa", "Intermarché"]
+
+# Termos presentes nas descrições/localizações, usados pela carga na busca
+TERMOS_BUSCA = [
+    "aeroporto", "entrega", "corrida", "abastecimento", "lisboa", "porto", "pizza",
+    "sushi", "revisão", "almoço", "boavista", "gasóleo", "portagem", "cascais"
+]
+
+# Categorias de despesa e peso relativo
+DESPESAS = [
+    ("Combustível", 45), ("Alimentação", 25), ("Manutenção Veículo", 8), ("Telefone", 5),
+    ("Seguro", 3), ("Lazer", 6), ("Saúde", 3), ("Outros", 5)
+]
+
+def email_usuario(indice: int) -> str:
+    return f"carga{indice:05d}@{DOMINIO}"
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+def _dinheiro(valor: float) -> Decimal:
+    return Decimal(f"{max(valor, 0.5):.2f}")
+
+# Todas as linhas com as mesmas colunas, para o INSERT seguir em lotes únicos
+LINHA_VAZIA = {
+    "gorjeta": None, "localizacao": None, "observacoes": None, "categoria_id": None,
+    "plataforma_id": None, "meio_pagamento_id": None, "saldo_em_maos": None,
+    "saldo_em_maos_recebido": False, "km_percorridos": None,
+    "litros_combustivel": None, "preco_combustivel": None,
+}
+
+def _hora(rng: random.Random, picos):
+    """Hora com distribuição concentrada nos picos (almoço, jantar, ponta)."""
+    centro = rng.choice(picos)
+    minutos = int(rng.gauss(centro * 60, 75)) % (24 * 60)
+    return datetime.min.replace(hour=minutos // 60, minute=minutos % 60, second=rng.randrange(60)).time()
+
+class PerfilUsuario:
+    """Mistura de plataformas e parâmetros de uma conta sintética."""
+
+    def __init__(self, rng, categorias, plataformas, meios):
+        self.rng = rng
+        self.tipo = rng.choices(["driver", "delivery", "misto"], weights=[45, 45, 10])[0]
+        tipos_plataforma = ["driver", "delivery"] if self.tipo == "misto" else [self.tipo]
+        proprias = [p for p in plataformas if p.tipo in tipos_plataforma]
+        rng.shuffle(proprias)
+        # Uma plataforma principal e as restantes cada vez menos usadas
+        self.plataformas = proprias[:rng.randint(1, min(3, len(proprias)))]
+        self.pesos_plataformas = [0.6 ** i for i in range(len(self.plataformas))]
+        self.categorias = {(c.tipo, c.nome): c.id for c in categorias}
+        self.meios = {m.nome: m.id for m in meios}
+        self.proporcao_receitas = rng.uniform(0.68, 0.82)
+        self.taxa_gorjeta = rng.uniform(0.05, 0.25)
+
+    def transacao(self, usuario_id, dia: date) -> dict:
+        rng = self.rng
+        if rng.random() < self.proporcao_receitas:
+            linha = {**LINHA_VAZIA, **self._receita(dia)}
+        else:
+            linha = {**LINHA_VAZIA, **self._despesa(dia)}
+        linha["id"] = _uuid(rng)
+        linha["usuario_id"] = usuario_id
+        linha["data_transacao"] = dia
+        linha["created_at"] = datetime.combine(dia, linha["hora_transacao"])
+        return linha
+
+    def _receita(self, dia):
+        rng = self.rng
+        if rng.random() < 0.03:
+            categoria = rng.choice(["Freelance", "Vendas", "Outros"])
+            return {
+                "tipo": "receita",
+                "valor": _dinheiro(rng.lognormvariate(4.0, 0.6)),
+                "descricao": f"{categoria} - pagamento",
+                "categoria_id": self.categorias.get(("receita", categoria)),
+                "meio_pagamento_id": self.meios.get("Transferência Bancária"),
+                "hora_transacao": _hora(rng, [11, 16]),
+            }
+
+        plataforma = rng.choices(self.plataformas, weights=self.pesos_plataformas)[0]
+        origem, destino = rng.sample(LOCAIS, 2)
+        if plataforma.tipo == "driver":
+            valor = rng.lognormvariate(2.3, 0.5)
+            km = valor * rng.uniform(0.6, 1.1)
+            descricao = f"Corrida {origem} → {destino}"
+            categoria = ("receita", "Driver")
+            hora = _hora(rng, [8, 13, 19, 23])
+        else:
+            valor = rng.lognormvariate(1.5, 0.4)
+            km = rng.uniform(1, 8)
+            descricao = f"Entrega {rng.choice(RESTAURANTES)} - {destino}"
+            categoria = ("receita", "Delivery")
+            hora = _hora(rng, [13, 20])
+
+        em_dinheiro = rng.random() < 0.15
+        return {
+            "tipo": "receita",
+            "valor": _dinheiro(valor),
+            "gorjeta": _dinheiro(rng.uniform(0.5, 5)) if rng.random() < self.taxa_gorjeta else None,
+            "descricao": descricao,
+            "localizacao": destino,
+            "categoria_id": self.categorias.get(categoria),
+            "plataforma_id": plataforma.id,
+            "meio_pagamento_id": self.meios.get("Dinheiro") if em_dinheiro else None,
+            "saldo_em_maos": _dinheiro(valor) if em_dinheiro else None,
+            "saldo_em_maos_recebido": em_dinheiro and rng.random() < 0.7,
+            "km_percorridos": _dinheiro(km),
+            "hora_transacao": hora,
+        }
+
+    def _despesa(self, dia):
+        rng = self.rng
+        categoria = rng.choices([nome for nome, _ in DESPESAS], weights=[peso for _, peso in DESPESAS])[0]
+        linha = {
+            "tipo": "despesa",
+            "categoria_id": self.categorias.get(("despesa", categoria)),
+            "meio_pagamento_id": self.meios.get(rng.choice(["Cartão de Débito", "Cartão de Crédito", "MB Way", "Dinheiro"])),
+            "hora_transacao": _hora(rng, [9, 13, 18]),
+            "localizacao": rng.choice(LOCAIS),
+        }
+        if categoria == "Combustível":
+            litros = rng.uniform(20, 50)
+            preco = rng.uniform(1.55, 1.95)
+            linha.update(
+                valor=_dinheiro(litros * preco),
+                litros_combustivel=_dinheiro(litros),
+                preco_combustivel=_dinheiro(preco),
+                descricao=f"Abastecimento gasóleo {rng.choice(POSTOS)}"
+            )
+        elif categoria == "Alimentação":
+            linha.update(valor=_dinheiro(rng.uniform(4, 18)), descricao=rng.choice(["Almoço", "Jantar", "Café", "Lanche"]))
+        elif categoria == "Manutenção Veículo":
+            linha.update(valor=_dinheiro(rng.lognormvariate(4.3, 0.7)), descricao=rng.choice(["Revisão", "Pneus", "Lavagem", "Travões"]))
+        elif categoria == "Outros":
+            linha.update(valor=_dinheiro(rng.uniform(1.5, 12)), descricao=rng.choice(["Portagem", "Estacionamento"]))
+        else:
+            linha.update(valor=_dinheiro(rng.uniform(10, 90)), descricao=categoria)
+        return linha
+
+def _dias(rng: random.Random, data_fim: date, dias: int, quantidade: int):
+    """Datas das transações: mais atividade recente e às sextas/sábados."""
+    pesos = []
+    for atraso in range(dias):
+        dia = data_fim - timedelta(days=atraso)
+        pesos.append((1.0 + atraso / dias) ** -1 * (1.4 if dia.weekday() in (4, 5) else 1.0))
+    return sorted(
+        (data_fim - timedelta(days=atraso) for atraso in rng.choices(range(dias), weights=pesos, k=quantidade)),
+        reverse=True
+    )
+
+def gerar(args):
+    rng = random.Random(args.semente)
+    db = SessionLocal()
+    try:
+        existentes = db.scalar(select(func.count()).select_from(Usuario).where(Usuario.email.like(f"%@{DOMINIO}")))
+        if existentes:
+            if not args.limpar:
+                sys.exit(f"Já existem {existentes} contas @{DOMINIO}; usar --limpar para as recriar.")
+            print(f"A remover {existentes} contas @{DOMINIO}...")
+            db.execute(delete(Usuario).where(Usuario.email.like(f"%@{DOMINIO}")))
+            db.commit()
+
+        pais_id = db.scalar(select(Pais.id).where(Pais.ativo == True).order_by(Pais.id).limit(1))
+        senha_hash = get_password_hash(args.senha)
+
+        inicio = time.perf_counter()
+        emails = [email_usuario(indice) for indice in range(args.usuarios)]
+        ids = [_uuid(rng) for _ in emails]
+        # O trigger de usuarios cria configurações, categorias, plataformas e meios padrão
+        db.execute(insert(Usuario), [
+            {
+                "id": usuario_id,
+                "nome": f"Carga {indice:05d}",
+                "email": email,
+                "senha_hash": senha_hash,
+                "telefone": f"9{indice:08d}",
+                "pais_id": pais_id,
+                "verificado": True,
+                "ativo": True,
+            }
+            for indice, (usuario_id, email) in enumerate(zip(ids, emails))
+        ])
+        db.commit()
+
+        total = 0
+        for indice, usuario_id in enumerate(ids):
+            # A ordem das linhas do trigger não é garantida: ordenar para a semente valer
+            categorias = db.execute(select(Categoria.id, Categoria.tipo, Categoria.nome).where(
+                Categoria.usuario_id == usuario_id).order_by(Categoria.tipo, Categoria.nome)).all()
+            plataformas = db.execute(select(Plataforma.id, Plataforma.tipo, Plataforma.nome).where(
+                Plataforma.usuario_id == usuario_id).order_by(Plataforma.nome)).all()
+            meios = db.execute(select(MeioPagamento.id, MeioPagamento.nome).where(
+                MeioPagamento.usuario_id == usuario_id).order_by(MeioPagamento.nome)).all()
+            perfil = PerfilUsuario(rng, categorias, plataformas, meios)
+
+            lote = []
+            for dia in _dias(rng, args.data_fim, args.dias, args.transacoes):
+                lote.append(perfil.transacao(usuario_id, dia))
+                if len(lote) >= TAMANHO_LOTE:
+                    db.execute(insert(Transacao), lote)
+                    total += len(lote)
+                    lote = []
+            if lote:
+                db.execute(insert(Transacao), lote)
+                total += len(lote)
+            db.commit()
+            print(f"\r{indice + 1}/{len(ids)} contas, {total} transações", end="", flush=True)
+        print()
+
+        db.execute(text("ANALYZE usuarios, categorias, plataformas, transacoes, resumo_diario, resumo_mensal"))
+        db.commit()
+        print(f"Dados gerados em {time.perf_counter() - inicio:.1f}s")
+    finally:
+        db.close()
+
+    manifesto = {
+        "semente": args.semente,
+        "usuarios": emails,
+        "senha": args.senha,
+        "transacoes_por_usuario": args.transacoes,
+        "dias": args.dias,
+        "data_fim": args.data_fim.isoformat(),
+        "termos_busca": TERMOS_BUSCA,
+    }
+    with open(args.manifesto, "w", encoding="utf-8") as ficheiro:
+        json.dump(manifesto, ficheiro, ensure_ascii=False, indent=2)
+    print(f"Manifesto: {args.manifesto}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dados sintéticos para os benchmarks")
+    parser.add_argument("--usuarios", type=int, default=20)
+    parser.add_argument("--transacoes", type=int, default=2000, help="Transações por usuário")
+    parser.add_argument("--dias", type=int, default=365, help="Histórico, em dias até --data-fim")
+    parser.add_argument("--data-fim", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--senha", default=SENHA_PADRAO)
+    parser.add_argument("--limpar", action="store_true", help="Remove as contas sintéticas anteriores")
+    parser.add_argument("--manifesto", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_carga.json"))
+    gerar(parser.parse_args())
@@ -0,0 +1,28 @@
+#!/bin/bash
+# Aplica database/schema.sql e as migrações pela ordem em que foram criadas
+set -euo pipefail
+
+executar() {
+    psql -v ON_ERROR_STOP=1 --quiet --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" "$@"
+}
+
+for ficheiro in \
+    schema.sql \
+    migration_add_senha_hash.sql \
+    migration_add_user_fields.sql \
+    migration_add_gorjeta_saldo_campos.sql \
+    migration_add_config_fields.sql \
+    migration_add_resumo_diario.sql \
+    migration_add_indices_cobertura.sql \
+    migration_add_indice_paginacao.sql \
+    migration_add_busca_transacoes.sql \
+    migration_add_resumo_mensal.sql \
+    migration_add_versoes_dados.sql \
+    migration_add_created_at_obrigatorio.sql
+do
+    echo "A aplicar $ficheiro"
+    executar -f "/database/$ficheiro"
+done
+
+# usuarios.idioma existe no modelo mas não tem migração própria
+executar -c "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS idioma VARCHAR(10) DEFAULT 'pt-BR'"
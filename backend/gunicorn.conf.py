@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor de produção: gunicorn a gerir N workers uvicorn
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- Workers: WEB_CONCURRENCY ou, por omissão, um por CPU disponível para o
+  processo. O valor volta a WEB_CONCURRENCY para que app/config.py divida o
+  orçamento de conexões (DB_CONEXOES_TOTAL) pelo número real de workers.
+- preload_app: a aplicação é importada uma vez no processo mestre e os workers
+  nascem por fork (arranque mais rápido, memória partilhada). Importar a
+  aplicação não abre conexões; cada worker abre as suas no startup.
+- Reciclagem: cada worker sai depois de GUNICORN_MAX_REQUESTS pedidos (mais um
+  jitter aleatório, para não reiniciarem todos ao mesmo tempo) e é substituído.
+- Encerramento (SIGTERM, deploy ou reciclagem): o worker deixa de aceitar
+  conexões, espera pelos pedidos em curso até GUNICORN_GRACEFUL_TIMEOUT menos
+  MARGEM_SHUTDOWN segundos e corre o shutdown da aplicação (fecha o pool).
+  O gunicorn só mata o worker ao fim de GUNICORN_GRACEFUL_TIMEOUT.
+
+Em desenvolvimento continua a usar-se `python run.py` (um processo com reload).
+"""
+
+import multiprocessing
+import os
+
+from uvicorn_worker import UvicornWorker
+
+def _cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+workers = int(os.getenv("WEB_CONCURRENCY") or _cpus())
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '3001')}"
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER") or max_requests // 10)
+
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# Worker sem sinal de vida durante este tempo é morto e substituído
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+# Keep-alive HTTP (o uvicorn usava 5s por omissão)
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Tempo reservado ao shutdown da aplicação (fechar conexões) dentro do graceful_timeout
+MARGEM_SHUTDOWN = 5
+
+class WorkerUvicorn(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "asyncio", "http": "auto"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # O UvicornWorker não passa o graceful_timeout ao uvicorn: sem isto a
+        # espera pelos pedidos em curso não tem prazo e o worker acaba morto
+        # pelo gunicorn a meio do shutdown
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - MARGEM_SHUTDOWN)
+
+worker_class = WorkerUvicorn
+
+def post_fork(server, worker):
+    # Conexões eventualmente abertas no mestre não podem ser usadas pelo worker
+    from app.database import descartar_conexoes_herdadas
+    descartar_conexoes_herdadas()
@@ -1,9 +1,10 @@
-from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine
-from app.models import Pais, Base
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import Pais
 
-# Criar todas as tabelas
-Base.metadata.create_all(bind=engine)
+# As tabelas são criadas por database/schema.sql e pelas migrações em database/
+# (create_all não cria as extensões e funções de que dependem as colunas
+# geradas de transacoes, e falharia numa base de dados nova)
 
 def populate_countries():
     db = SessionLocal()
@@ -36,13 +37,13 @@ def populate_countries():
             {"nome": "Macau", "codigo": "MO", "codigo_telefone": "+853", "regiao": "Ásia"},
         ]
         
-        # Inserir países
-        for country_data in countries:
-            country = Pais(**country_data)
-            db.add(country)
+        # Inserir países num único INSERT (executemany), sem criar objetos ORM
+        db.execute(insert(Pais), countries)
         
         db.commit()
         print(f"Inseridos {len(countries)} países na base de dados.")
+        # A API guarda o catálogo em memória (app/catalogo.py)
+        print("Recarregue o catálogo na API: POST /api/configuracoes/paises/recarregar (X-Admin-Token) ou reinicie-a.")
         
     except Exception as e:
         print(f"Erro ao popular países: {e}")
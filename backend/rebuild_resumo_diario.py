@@ -0,0 +1,35 @@
+import argparse
+import uuid
+from sqlalchemy import text
+from app.database import SessionLocal
+
+def rebuild_resumo_diario(usuario_id=None):
+    """
+    Recalcula resumo_diario a partir de transacoes e resumo_mensal a partir
+    do resumo diário (todos os usuários ou apenas um), na mesma transação.
+    """
+    db = SessionLocal()
+    try:
+        parametros = {"usuario_id": str(usuario_id) if usuario_id else None}
+        linhas = db.execute(
+            text("SELECT reconstruir_resumo_diario(CAST(:usuario_id AS UUID))"), parametros
+        ).scalar()
+        linhas_mensais = db.execute(
+            text("SELECT reconstruir_resumo_mensal(CAST(:usuario_id AS UUID))"), parametros
+        ).scalar()
+        db.commit()
+        alvo = f"usuário {usuario_id}" if usuario_id else "todos os usuários"
+        print(f"Resumo diário reconstruído para {alvo}: {linhas} linhas.")
+        print(f"Resumo mensal reconstruído para {alvo}: {linhas_mensais} linhas.")
+    except Exception as e:
+        print(f"Erro ao reconstruir resumo diário: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill/reconstrução das tabelas resumo_diario e resumo_mensal")
+    parser.add_argument("--usuario", type=uuid.UUID, help="Reconstruir apenas este usuário")
+    args = parser.parse_args()
+    rebuild_resumo_diario(args.usuario)
@@ -1,5 +1,8 @@
 import uvicorn
 
+# Servidor de desenvolvimento (um processo, reload automático).
+# Em produção: gunicorn -c gunicorn.conf.py app.main:app
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
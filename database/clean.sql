@@ -7,6 +7,13 @@ DROP TRIGGER IF EXISTS update_categorias_updated_at ON categorias;
 DROP TRIGGER IF EXISTS update_plataformas_updated_at ON plataformas;
 DROP TRIGGER IF EXISTS update_transacoes_updated_at ON transacoes;
 DROP TRIGGER IF EXISTS update_configuracoes_updated_at ON configuracoes_usuario;
+DROP TRIGGER IF EXISTS trigger_transacoes_resumo_diario ON transacoes;
+DROP TRIGGER IF EXISTS trigger_transacoes_resumo_mensal ON transacoes;
+DROP TRIGGER IF EXISTS trigger_categorias_versao ON categorias;
+DROP TRIGGER IF EXISTS trigger_plataformas_versao ON plataformas;
+DROP TRIGGER IF EXISTS trigger_meios_pagamento_versao ON meios_pagamento;
+DROP TRIGGER IF EXISTS trigger_configuracoes_versao ON configuracoes_usuario;
+DROP TRIGGER IF EXISTS trigger_usuarios_versao ON usuarios;
 
 -- Remover funções
 DROP FUNCTION IF EXISTS trigger_criar_dados_padrao();
@@ -14,9 +21,19 @@ DROP FUNCTION IF EXISTS criar_categorias_padrao(UUID);
 DROP FUNCTION IF EXISTS criar_plataformas_padrao(UUID);
 DROP FUNCTION IF EXISTS criar_meios_pagamento_padrao(UUID);
 DROP FUNCTION IF EXISTS update_updated_at_column();
+DROP FUNCTION IF EXISTS trigger_resumo_diario();
+DROP FUNCTION IF EXISTS resumo_diario_aplicar(transacoes, INTEGER);
+DROP FUNCTION IF EXISTS reconstruir_resumo_diario(UUID);
+DROP FUNCTION IF EXISTS trigger_resumo_mensal();
+DROP FUNCTION IF EXISTS resumo_mensal_aplicar(transacoes, INTEGER);
+DROP FUNCTION IF EXISTS reconstruir_resumo_mensal(UUID);
+DROP FUNCTION IF EXISTS trigger_versao_dados();
 
 -- Remover tabelas (na ordem inversa das dependências)
 DROP TABLE IF EXISTS arquivos CASCADE;
+DROP TABLE IF EXISTS resumo_diario CASCADE;
+DROP TABLE IF EXISTS resumo_mensal CASCADE;
+DROP TABLE IF EXISTS versoes_dados CASCADE;
 DROP TABLE IF EXISTS transacoes CASCADE;
 DROP TABLE IF EXISTS configuracoes_usuario CASCADE;
 DROP TABLE IF EXISTS meios_pagamento CASCADE;
@@ -27,6 +44,10 @@ DROP TABLE IF EXISTS codigos_verificacao CASCADE;
 DROP TABLE IF EXISTS usuarios CASCADE;
 DROP TABLE IF EXISTS paises CASCADE;
 
+-- Remover objetos da pesquisa de texto (usados pelas colunas geradas de transacoes)
+DROP FUNCTION IF EXISTS f_unaccent(TEXT);
+DROP TEXT SEARCH CONFIGURATION IF EXISTS pt_unaccent;
+
 -- Remover views antigas se existirem
 DROP VIEW IF EXISTS vw_resumo_mensal CASCADE;
 DROP VIEW IF EXISTS vw_fluxo_caixa CASCADE;
@@ -0,0 +1,71 @@
+-- Migração para a pesquisa de texto das transações
+-- Data: 2026-10-17
+-- Descrição: /transacoes/buscar/texto fazia três ILIKE '%q%' (descricao,
+-- observacoes, localizacao) e percorria todas as linhas do usuário.
+-- Passa a usar:
+--   * busca_tsv: tsvector gerado com a configuração pt_unaccent (português
+--     sem acentos), pesos A/B/C para descrição/localização/observações;
+--   * busca_texto: os mesmos campos concatenados, em minúsculas e sem
+--     acentos, para a pesquisa de substrings com pg_trgm.
+-- Ambos os índices são GIN compostos com usuario_id (btree_gin), para que
+-- palavras comuns não obriguem a percorrer as transações de outros usuários.
+--
+-- ADD COLUMN ... GENERATED ALWAYS AS ... STORED reescreve a tabela com lock
+-- exclusivo: agendar fora do horário de pico.
+-- CREATE INDEX CONCURRENTLY não pode correr dentro de uma transação:
+-- execute este script com psql sem BEGIN/COMMIT (autocommit).
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- Configuração de pesquisa: português com remoção de acentos antes do stemming
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+            ALTER MAPPING FOR hword, hword_part, word
+            WITH unaccent, portuguese_stem;
+    END IF;
+END $$;
+
+-- unaccent() é STABLE; colunas geradas e índices exigem uma função IMMUTABLE
+CREATE OR REPLACE FUNCTION f_unaccent(TEXT)
+RETURNS TEXT AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE transacoes
+    ADD COLUMN IF NOT EXISTS busca_tsv TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('pt_unaccent'::regconfig, COALESCE(descricao, '')), 'A') ||
+        setweight(to_tsvector('pt_unaccent'::regconfig, COALESCE(localizacao, '')), 'B') ||
+        setweight(to_tsvector('pt_unaccent'::regconfig, COALESCE(observacoes, '')), 'C')
+    ) STORED;
+
+ALTER TABLE transacoes
+    ADD COLUMN IF NOT EXISTS busca_texto TEXT
+    GENERATED ALWAYS AS (
+        f_unaccent(lower(
+            COALESCE(descricao, '') || ' ' ||
+            COALESCE(localizacao, '') || ' ' ||
+            COALESCE(observacoes, '')
+        ))
+    ) STORED;
+
+-- Pesquisa por palavras (websearch_to_tsquery)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_busca_tsv
+ON transacoes USING GIN (usuario_id, busca_tsv);
+
+-- Pesquisa por substrings (LIKE '%...%')
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_busca_trgm
+ON transacoes USING GIN (usuario_id, busca_texto gin_trgm_ops);
+
+ANALYZE transacoes;
+
+-- Verificar os índices criados
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'transacoes'
+  AND indexname IN ('idx_transacoes_busca_tsv', 'idx_transacoes_busca_trgm');
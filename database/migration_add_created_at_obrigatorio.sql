@@ -0,0 +1,24 @@
+-- Migração para tornar transacoes.created_at obrigatório
+-- Data: 2026-10-18
+-- Descrição: created_at faz parte da chave da paginação por cursor
+-- (data_transacao, created_at, id) de listar_transacoes. Uma linha com
+-- created_at NULL não pode ser codificada no cursor nem comparada na
+-- condição de linha (o resultado seria NULL e a linha desapareceria das
+-- páginas seguintes). Preenche os NULL existentes e passa a coluna a NOT NULL,
+-- mantendo o índice idx_transacoes_usuario_paginacao utilizável.
+-- Requer migration_add_indice_paginacao.sql.
+
+-- Linhas antigas sem created_at: melhor aproximação disponível
+UPDATE transacoes
+SET created_at = COALESCE(updated_at, data_transacao + COALESCE(hora_transacao, TIME '00:00'))
+WHERE created_at IS NULL;
+
+ALTER TABLE transacoes ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+
+-- A restrição validada à parte evita que SET NOT NULL percorra a tabela com
+-- lock exclusivo (PostgreSQL 12+)
+ALTER TABLE transacoes DROP CONSTRAINT IF EXISTS ck_transacoes_created_at;
+ALTER TABLE transacoes ADD CONSTRAINT ck_transacoes_created_at CHECK (created_at IS NOT NULL) NOT VALID;
+ALTER TABLE transacoes VALIDATE CONSTRAINT ck_transacoes_created_at;
+ALTER TABLE transacoes ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE transacoes DROP CONSTRAINT ck_transacoes_created_at;
@@ -0,0 +1,18 @@
+-- Migração para suportar a paginação por cursor das transações
+-- Data: 2026-10-17
+-- Descrição: listar_transacoes ordena por (data_transacao, created_at, id)
+-- decrescente e, no modo cursor, filtra com
+-- (data_transacao, created_at, id) < (cursor). Este índice serve a ordenação
+-- e a comparação de linha, pelo que cada página custa o mesmo que a primeira.
+--
+-- CREATE INDEX CONCURRENTLY não pode correr dentro de uma transação:
+-- execute este script com psql sem BEGIN/COMMIT (autocommit).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_usuario_paginacao
+ON transacoes (usuario_id, data_transacao DESC, created_at DESC, id DESC);
+
+-- Verificar o índice criado
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'transacoes'
+  AND indexname = 'idx_transacoes_usuario_paginacao';
@@ -0,0 +1,30 @@
+-- Migração para adicionar índices de cobertura às agregações de transações
+-- Data: 2026-10-17
+-- Descrição: Os totais do dashboard, a série temporal e os resumos por
+-- categoria/plataforma filtram por usuario_id e por intervalos semiabertos
+-- de data_transacao (>= inicio AND < fim). Com as colunas agregadas no
+-- INCLUDE, o PostgreSQL responde a essas queries com index-only scans.
+--
+-- CREATE INDEX CONCURRENTLY não pode correr dentro de uma transação:
+-- execute este script com psql sem BEGIN/COMMIT (autocommit).
+
+-- Totais, série temporal e resumos (substitui idx_transacoes_usuario_data)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_usuario_data_cobertura
+ON transacoes (usuario_id, data_transacao)
+INCLUDE (tipo, valor, gorjeta, km_percorridos, categoria_id, plataforma_id);
+
+-- Transações recentes do dashboard (ORDER BY created_at DESC LIMIT 5)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transacoes_usuario_created
+ON transacoes (usuario_id, created_at DESC);
+
+-- O novo índice tem o mesmo prefixo, o antigo passa a ser redundante
+DROP INDEX CONCURRENTLY IF EXISTS idx_transacoes_usuario_data;
+
+-- Index-only scans dependem do visibility map estar atualizado
+VACUUM (ANALYZE) transacoes;
+
+-- Verificar os índices criados
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'transacoes'
+ORDER BY indexname;
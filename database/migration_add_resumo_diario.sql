@@ -0,0 +1,142 @@
+-- Migração para criar o resumo diário de transações
+-- Data: 2026-10-17
+-- Descrição: Cria a tabela resumo_diario com os totais por
+-- (usuario_id, data, tipo, categoria_id, plataforma_id), mantida de forma
+-- exata por trigger em cada INSERT/UPDATE/DELETE de transacoes, e a função
+-- reconstruir_resumo_diario() para backfill/reconstrução.
+-- Os endpoints do dashboard e dos relatórios leem desta tabela, pelo que o
+-- custo passa a depender do número de dias e não do número de corridas.
+-- Requer PostgreSQL 15+ (UNIQUE NULLS NOT DISTINCT).
+
+CREATE TABLE IF NOT EXISTS resumo_diario (
+    id BIGSERIAL PRIMARY KEY,
+    usuario_id UUID NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    data DATE NOT NULL,
+    tipo VARCHAR(20) NOT NULL, -- 'receita' ou 'despesa'
+    categoria_id UUID,
+    plataforma_id UUID,
+
+    -- Somas das transações do dia (NULL conta como 0)
+    valor DECIMAL(14,2) NOT NULL DEFAULT 0,
+    gorjeta DECIMAL(14,2) NOT NULL DEFAULT 0,
+    km_percorridos DECIMAL(14,2) NOT NULL DEFAULT 0,
+    litros_combustivel DECIMAL(14,2) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+
+    -- Categoria/plataforma nulas também identificam um grupo
+    CONSTRAINT uq_resumo_diario UNIQUE NULLS NOT DISTINCT (usuario_id, data, tipo, categoria_id, plataforma_id)
+);
+
+-- Aplica (p_sinal = 1) ou remove (p_sinal = -1) uma transação do resumo
+CREATE OR REPLACE FUNCTION resumo_diario_aplicar(p_linha transacoes, p_sinal INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_linha.usuario_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF p_sinal > 0 THEN
+        INSERT INTO resumo_diario AS r (
+            usuario_id, data, tipo, categoria_id, plataforma_id,
+            valor, gorjeta, km_percorridos, litros_combustivel, quantidade
+        ) VALUES (
+            p_linha.usuario_id, p_linha.data_transacao, p_linha.tipo,
+            p_linha.categoria_id, p_linha.plataforma_id,
+            p_linha.valor,
+            COALESCE(p_linha.gorjeta, 0),
+            COALESCE(p_linha.km_percorridos, 0),
+            COALESCE(p_linha.litros_combustivel, 0),
+            1
+        )
+        ON CONFLICT ON CONSTRAINT uq_resumo_diario DO UPDATE SET
+            valor = r.valor + EXCLUDED.valor,
+            gorjeta = r.gorjeta + EXCLUDED.gorjeta,
+            km_percorridos = r.km_percorridos + EXCLUDED.km_percorridos,
+            litros_combustivel = r.litros_combustivel + EXCLUDED.litros_combustivel,
+            quantidade = r.quantidade + 1;
+    ELSE
+        -- Só UPDATE: ao excluir um usuário o resumo pode já ter sido removido
+        -- pelo ON DELETE CASCADE e um INSERT violaria a chave estrangeira
+        UPDATE resumo_diario SET
+            valor = valor - p_linha.valor,
+            gorjeta = gorjeta - COALESCE(p_linha.gorjeta, 0),
+            km_percorridos = km_percorridos - COALESCE(p_linha.km_percorridos, 0),
+            litros_combustivel = litros_combustivel - COALESCE(p_linha.litros_combustivel, 0),
+            quantidade = quantidade - 1
+        WHERE usuario_id = p_linha.usuario_id
+          AND data = p_linha.data_transacao
+          AND tipo = p_linha.tipo
+          AND categoria_id IS NOT DISTINCT FROM p_linha.categoria_id
+          AND plataforma_id IS NOT DISTINCT FROM p_linha.plataforma_id;
+
+        DELETE FROM resumo_diario
+        WHERE usuario_id = p_linha.usuario_id
+          AND data = p_linha.data_transacao
+          AND tipo = p_linha.tipo
+          AND categoria_id IS NOT DISTINCT FROM p_linha.categoria_id
+          AND plataforma_id IS NOT DISTINCT FROM p_linha.plataforma_id
+          AND quantidade <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trigger_resumo_diario()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM resumo_diario_aplicar(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM resumo_diario_aplicar(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Atualizações que não mexem em colunas agregadas não tocam no resumo
+DROP TRIGGER IF EXISTS trigger_transacoes_resumo_diario ON transacoes;
+CREATE TRIGGER trigger_transacoes_resumo_diario
+    AFTER INSERT OR DELETE OR UPDATE OF
+        usuario_id, data_transacao, tipo, categoria_id, plataforma_id,
+        valor, gorjeta, km_percorridos, litros_combustivel
+    ON transacoes
+    FOR EACH ROW
+    EXECUTE FUNCTION trigger_resumo_diario();
+
+-- Reconstrói o resumo de um usuário (ou de todos, com NULL) a partir de transacoes.
+-- Bloqueia escritas em transacoes durante a reconstrução para não perder deltas.
+CREATE OR REPLACE FUNCTION reconstruir_resumo_diario(p_usuario_id UUID DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_linhas INTEGER;
+BEGIN
+    LOCK TABLE transacoes IN SHARE MODE;
+
+    DELETE FROM resumo_diario
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id;
+
+    INSERT INTO resumo_diario (
+        usuario_id, data, tipo, categoria_id, plataforma_id,
+        valor, gorjeta, km_percorridos, litros_combustivel, quantidade
+    )
+    SELECT
+        usuario_id, data_transacao, tipo, categoria_id, plataforma_id,
+        SUM(valor),
+        SUM(COALESCE(gorjeta, 0)),
+        SUM(COALESCE(km_percorridos, 0)),
+        SUM(COALESCE(litros_combustivel, 0)),
+        COUNT(*)
+    FROM transacoes
+    WHERE usuario_id IS NOT NULL
+      AND (p_usuario_id IS NULL OR usuario_id = p_usuario_id)
+    GROUP BY usuario_id, data_transacao, tipo, categoria_id, plataforma_id;
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    RETURN v_linhas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill inicial
+SELECT reconstruir_resumo_diario();
+
+ANALYZE resumo_diario;
@@ -0,0 +1,146 @@
+-- Migração para criar o resumo mensal de transações
+-- Data: 2026-10-17
+-- Descrição: Cria a tabela resumo_mensal com os totais por
+-- (usuario_id, mes, tipo, categoria_id, plataforma_id), mantida de forma
+-- exata por trigger em cada INSERT/UPDATE/DELETE de transacoes (como o
+-- resumo_diario), e a função reconstruir_resumo_mensal() para backfill.
+-- Os resumos por categoria e por plataforma do dashboard somam os meses
+-- inteiros do período nesta tabela e só os dias dos meses das pontas no
+-- resumo_diario, pelo que o custo deixa de crescer com o histórico.
+-- Requer migration_add_resumo_diario.sql (PostgreSQL 15+).
+
+CREATE TABLE IF NOT EXISTS resumo_mensal (
+    id BIGSERIAL PRIMARY KEY,
+    usuario_id UUID NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    mes DATE NOT NULL, -- primeiro dia do mês
+    tipo VARCHAR(20) NOT NULL, -- 'receita' ou 'despesa'
+    categoria_id UUID,
+    plataforma_id UUID,
+
+    -- Somas das transações do mês (NULL conta como 0)
+    valor DECIMAL(14,2) NOT NULL DEFAULT 0,
+    gorjeta DECIMAL(14,2) NOT NULL DEFAULT 0,
+    km_percorridos DECIMAL(14,2) NOT NULL DEFAULT 0,
+    litros_combustivel DECIMAL(14,2) NOT NULL DEFAULT 0,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+
+    CONSTRAINT ck_resumo_mensal_mes CHECK (EXTRACT(DAY FROM mes) = 1),
+    -- Categoria/plataforma nulas também identificam um grupo
+    CONSTRAINT uq_resumo_mensal UNIQUE NULLS NOT DISTINCT (usuario_id, mes, tipo, categoria_id, plataforma_id)
+);
+
+-- Aplica (p_sinal = 1) ou remove (p_sinal = -1) uma transação do resumo
+CREATE OR REPLACE FUNCTION resumo_mensal_aplicar(p_linha transacoes, p_sinal INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_mes DATE := date_trunc('month', p_linha.data_transacao)::date;
+BEGIN
+    IF p_linha.usuario_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF p_sinal > 0 THEN
+        INSERT INTO resumo_mensal AS r (
+            usuario_id, mes, tipo, categoria_id, plataforma_id,
+            valor, gorjeta, km_percorridos, litros_combustivel, quantidade
+        ) VALUES (
+            p_linha.usuario_id, v_mes, p_linha.tipo,
+            p_linha.categoria_id, p_linha.plataforma_id,
+            p_linha.valor,
+            COALESCE(p_linha.gorjeta, 0),
+            COALESCE(p_linha.km_percorridos, 0),
+            COALESCE(p_linha.litros_combustivel, 0),
+            1
+        )
+        ON CONFLICT ON CONSTRAINT uq_resumo_mensal DO UPDATE SET
+            valor = r.valor + EXCLUDED.valor,
+            gorjeta = r.gorjeta + EXCLUDED.gorjeta,
+            km_percorridos = r.km_percorridos + EXCLUDED.km_percorridos,
+            litros_combustivel = r.litros_combustivel + EXCLUDED.litros_combustivel,
+            quantidade = r.quantidade + 1;
+    ELSE
+        -- Só UPDATE: ao excluir um usuário o resumo pode já ter sido removido
+        -- pelo ON DELETE CASCADE e um INSERT violaria a chave estrangeira
+        UPDATE resumo_mensal SET
+            valor = valor - p_linha.valor,
+            gorjeta = gorjeta - COALESCE(p_linha.gorjeta, 0),
+            km_percorridos = km_percorridos - COALESCE(p_linha.km_percorridos, 0),
+            litros_combustivel = litros_combustivel - COALESCE(p_linha.litros_combustivel, 0),
+            quantidade = quantidade - 1
+        WHERE usuario_id = p_linha.usuario_id
+          AND mes = v_mes
+          AND tipo = p_linha.tipo
+          AND categoria_id IS NOT DISTINCT FROM p_linha.categoria_id
+          AND plataforma_id IS NOT DISTINCT FROM p_linha.plataforma_id;
+
+        DELETE FROM resumo_mensal
+        WHERE usuario_id = p_linha.usuario_id
+          AND mes = v_mes
+          AND tipo = p_linha.tipo
+          AND categoria_id IS NOT DISTINCT FROM p_linha.categoria_id
+          AND plataforma_id IS NOT DISTINCT FROM p_linha.plataforma_id
+          AND quantidade <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trigger_resumo_mensal()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM resumo_mensal_aplicar(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM resumo_mensal_aplicar(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mesmas colunas que o trigger do resumo diário
+DROP TRIGGER IF EXISTS trigger_transacoes_resumo_mensal ON transacoes;
+CREATE TRIGGER trigger_transacoes_resumo_mensal
+    AFTER INSERT OR DELETE OR UPDATE OF
+        usuario_id, data_transacao, tipo, categoria_id, plataforma_id,
+        valor, gorjeta, km_percorridos, litros_combustivel
+    ON transacoes
+    FOR EACH ROW
+    EXECUTE FUNCTION trigger_resumo_mensal();
+
+-- Reconstrói o resumo mensal de um usuário (ou de todos, com NULL) a partir
+-- do resumo_diario, que tem de estar correto (ver reconstruir_resumo_diario).
+-- Bloqueia escritas em transacoes durante a reconstrução para não perder deltas.
+CREATE OR REPLACE FUNCTION reconstruir_resumo_mensal(p_usuario_id UUID DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_linhas INTEGER;
+BEGIN
+    LOCK TABLE transacoes IN SHARE MODE;
+
+    DELETE FROM resumo_mensal
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id;
+
+    INSERT INTO resumo_mensal (
+        usuario_id, mes, tipo, categoria_id, plataforma_id,
+        valor, gorjeta, km_percorridos, litros_combustivel, quantidade
+    )
+    SELECT
+        usuario_id, date_trunc('month', data)::date, tipo, categoria_id, plataforma_id,
+        SUM(valor),
+        SUM(gorjeta),
+        SUM(km_percorridos),
+        SUM(litros_combustivel),
+        SUM(quantidade)
+    FROM resumo_diario
+    WHERE p_usuario_id IS NULL OR usuario_id = p_usuario_id
+    GROUP BY usuario_id, date_trunc('month', data)::date, tipo, categoria_id, plataforma_id;
+
+    GET DIAGNOSTICS v_linhas = ROW_COUNT;
+    RETURN v_linhas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill inicial
+SELECT reconstruir_resumo_mensal();
+
+ANALYZE resumo_mensal;
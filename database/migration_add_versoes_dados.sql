@@ -0,0 +1,73 @@
+-- Migração para criar as versões persistidas dos dados de configuração
+-- Data: 2026-10-18
+-- Descrição: Cria a tabela versoes_dados com um contador por (usuario_id,
+-- recurso), incrementado por trigger na mesma transação de cada escrita em
+-- categorias, plataformas, meios_pagamento, configuracoes_usuario e usuarios.
+-- As ETags do GET condicional (app/etags.py) são calculadas a partir destes
+-- contadores, que todos os workers e réplicas da API veem por igual: uma ETag
+-- emitida por um processo continua válida nos restantes e muda com qualquer
+-- escrita, feita por qualquer processo.
+
+CREATE TABLE IF NOT EXISTS versoes_dados (
+    usuario_id UUID NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    recurso VARCHAR(30) NOT NULL, -- ver RECURSO_* em app/cache.py
+    versao BIGINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (usuario_id, recurso)
+);
+
+-- Incrementa a versão do recurso TG_ARGV[0] para o usuário da linha alterada
+-- (coluna usuario_id ou, na tabela usuarios, id)
+CREATE OR REPLACE FUNCTION trigger_versao_dados()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_linha RECORD;
+    v_usuario_id UUID;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_linha := OLD;
+    ELSE
+        v_linha := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'usuarios' THEN
+        v_usuario_id := v_linha.id;
+    ELSE
+        v_usuario_id := v_linha.usuario_id;
+    END IF;
+
+    -- Ao excluir um usuário as linhas dele são removidas em cascata depois do
+    -- próprio usuário: não há versão a manter (e a chave estrangeira falharia)
+    INSERT INTO versoes_dados AS v (usuario_id, recurso)
+    SELECT v_usuario_id, TG_ARGV[0]
+    WHERE EXISTS (SELECT 1 FROM usuarios WHERE id = v_usuario_id)
+    ON CONFLICT (usuario_id, recurso) DO UPDATE SET versao = v.versao + 1;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_categorias_versao ON categorias;
+CREATE TRIGGER trigger_categorias_versao
+    AFTER INSERT OR UPDATE OR DELETE ON categorias
+    FOR EACH ROW EXECUTE FUNCTION trigger_versao_dados('categorias');
+
+DROP TRIGGER IF EXISTS trigger_plataformas_versao ON plataformas;
+CREATE TRIGGER trigger_plataformas_versao
+    AFTER INSERT OR UPDATE OR DELETE ON plataformas
+    FOR EACH ROW EXECUTE FUNCTION trigger_versao_dados('plataformas');
+
+DROP TRIGGER IF EXISTS trigger_meios_pagamento_versao ON meios_pagamento;
+CREATE TRIGGER trigger_meios_pagamento_versao
+    AFTER INSERT OR UPDATE OR DELETE ON meios_pagamento
+    FOR EACH ROW EXECUTE FUNCTION trigger_versao_dados('meios_pagamento');
+
+DROP TRIGGER IF EXISTS trigger_configuracoes_versao ON configuracoes_usuario;
+CREATE TRIGGER trigger_configuracoes_versao
+    AFTER INSERT OR UPDATE OR DELETE ON configuracoes_usuario
+    FOR EACH ROW EXECUTE FUNCTION trigger_versao_dados('configuracao');
+
+-- Perfil, senha e último login (a exclusão remove as versões em cascata)
+DROP TRIGGER IF EXISTS trigger_usuarios_versao ON usuarios;
+CREATE TRIGGER trigger_usuarios_versao
+    AFTER UPDATE ON usuarios
+    FOR EACH ROW EXECUTE FUNCTION trigger_versao_dados('usuario');
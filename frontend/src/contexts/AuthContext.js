@@ -25,8 +25,8 @@ export const AuthProvider = ({ children }) => {
     try {
       const token = localStorage.getItem('token');
       if (token) {
-        const userData = await authService.getMe();
-        setUser(userData);
+        const { usuario } = await authService.getBootstrap();
+        setUser(usuario);
         setIsAuthenticated(true);
       } else {
         setIsAuthenticated(false);
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useForm } from 'react-hook-form';
 import { Settings, Plus, Edit2, Trash2, Save, Bell, DollarSign, MapPin, Palette, CreditCard } from 'lucide-react';
-import { configuracaoService } from '../services/api';
+import { authService, configuracaoService } from '../services/api';
 import toast from 'react-hot-toast';
 import { timezones, getTimezonesByRegion } from '../utils/timezones';
 
@@ -29,12 +29,12 @@ const Configuracoes = () => {
   const carregarDados = async () => {
     try {
       setLoading(true);
-      const [categoriasData, plataformasData, meiosPagamentoData, configData] = await Promise.all([
-        configuracaoService.listarCategorias(),
-        configuracaoService.listarPlataformas(),
-        configuracaoService.listarMeiosPagamento(),
-        configuracaoService.obterConfiguracoes()
-      ]);
+      const {
+        categorias: categoriasData,
+        plataformas: plataformasData,
+        meios_pagamento: meiosPagamentoData,
+        configuracoes: configData
+      } = await authService.getBootstrap();
       
       setCategorias(Array.isArray(categoriasData) ? categoriasData : []);
       setPlataformas(Array.isArray(plataformasData) ? plataformasData : []);
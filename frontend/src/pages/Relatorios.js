@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart, Pie, Cell, LineChart, Line } from 'recharts';
 import { Calendar, Download, TrendingUp, TrendingDown, DollarSign, MapPin, Car, Filter } from 'lucide-react';
-import { dashboardService } from '../services/api';
+import { dashboardService, relatorioService } from '../services/api';
 import { format, startOfMonth, endOfMonth, subMonths } from 'date-fns';
 import { ptBR } from 'date-fns/locale';
 import toast from 'react-hot-toast';
@@ -60,9 +60,31 @@ const Relatorios = () => {
     return new Intl.NumberFormat('pt-BR').format(value);
   };
 
-  const exportarRelatorio = () => {
-    // Implementar exportação para PDF/Excel
-    toast.success('Funcionalidade de exportação será implementada em breve');
+  const exportarRelatorio = async () => {
+    try {
+      const params = { formato: 'xlsx' };
+      if (periodo.inicio) {
+        params.data_inicio = periodo.inicio;
+      }
+      if (periodo.fim) {
+        params.data_fim = periodo.fim;
+      }
+
+      const arquivo = await relatorioService.exportar(params);
+      const url = window.URL.createObjectURL(arquivo);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `relatorio_${periodo.inicio}_${periodo.fim}.xlsx`;
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      window.URL.revokeObjectURL(url);
+
+      toast.success('Relatório exportado com sucesso');
+    } catch (error) {
+      console.error('Erro ao exportar relatório:', error);
+      toast.error('Erro ao exportar relatório');
+    }
   };
 
   const COLORS = ['#3B82F6', '#10B981', '#F59E0B', '#EF4444', '#8B5CF6', '#06B6D4'];
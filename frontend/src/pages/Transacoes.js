@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useForm } from 'react-hook-form';
 import { Plus, Edit2, Trash2, Search, Filter, Calendar, DollarSign, MapPin, Car, Save, X } from 'lucide-react';
-import { transacaoService, configuracaoService } from '../services/api';
+import { transacaoService, authService } from '../services/api';
 import { format } from 'date-fns';
 import { ptBR } from 'date-fns/locale';
 import toast from 'react-hot-toast';
@@ -42,19 +42,15 @@ const Transacoes = () => {
   const carregarDados = async () => {
     try {
       setLoading(true);
-      const [transacoesData, categoriasData, plataformasData, meiosPagamentoData] = await Promise.all([
+      const [transacoesData, bootstrap] = await Promise.all([
         transacaoService.listar(),
-        configuracaoService.listarCategorias(),
-        configuracaoService.listarPlataformas(),
-        configuracaoService.listarMeiosPagamento()
+        authService.getBootstrap()
       ]);
       
-
-      
       setTransacoes(transacoesData);
-      setCategorias(categoriasData);
-      setPlataformas(plataformasData);
-      setMeiosPagamento(meiosPagamentoData);
+      setCategorias(bootstrap.categorias);
+      setPlataformas(bootstrap.plataformas);
+      setMeiosPagamento(bootstrap.meios_pagamento);
     } catch (error) {
       toast.error('Erro ao carregar dados');
     } finally {
@@ -36,15 +36,16 @@ api.interceptors.response.use(
     return response;
   },
   (error) => {
-    // Só faz logout automático se for erro 401 e não for na rota /auth/me
-    if (error.response?.status === 401 && !error.config?.url?.includes('/auth/me')) {
+    // Só faz logout automático se for erro 401 e não for na verificação inicial (/auth/me, /bootstrap)
+    const verificacaoInicial = ['/auth/me', '/bootstrap'].some((rota) => error.config?.url?.includes(rota));
+    if (error.response?.status === 401 && !verificacaoInicial) {
       localStorage.removeItem('token');
       localStorage.removeItem('user');
       window.location.href = '/login';
     }
     
     // Não mostra toast para erros de autenticação na verificação inicial
-    if (!(error.response?.status === 401 && error.config?.url?.includes('/auth/me'))) {
+    if (!(error.response?.status === 401 && verificacaoInicial)) {
       const message = error.response?.data?.detail || 'Erro interno do servidor';
       toast.error(message);
     }
@@ -70,6 +71,13 @@ export const authService = {
     return response.data;
   },
   
+  // Usuário, configurações, categorias, plataformas, meios de pagamento e
+  // países num único pedido (revalidado pelo navegador com ETag)
+  getBootstrap: async () => {
+    const response = await api.get('/bootstrap');
+    return response.data;
+  },
+  
   forgotPassword: async (email) => {
     const response = await api.post('/auth/forgot-password', { email });
     return response.data;
@@ -104,6 +112,28 @@ export const dashboardService = {
   }
 };
 
+// Serviços de relatórios
+export const relatorioService = {
+  // Exportação em streaming (csv, xlsx ou ndjson); devolve um Blob
+  exportar: async (params = {}) => {
+    const response = await api.get('/relatorios/export', {
+      params,
+      responseType: 'blob',
+      timeout: 0
+    });
+    return response.data;
+  },
+
+  exportarTransacoes: async (params = {}) => {
+    const response = await api.get('/transacoes/export', {
+      params,
+      responseType: 'blob',
+      timeout: 0
+    });
+    return response.data;
+  }
+};
+
 // Serviços de transações
 export const transacaoService = {
   listar: async (params = {}) => {
@@ -116,6 +146,11 @@ export const transacaoService = {
     return response.data;
   },
   
+  criarLote: async (itens, modo = 'tudo_ou_nada') => {
+    const response = await api.post('/transacoes/bulk', { itens, modo });
+    return response.data;
+  },
+  
   obter: async (id) => {
     const response = await api.get(`/transacoes/${id}`);
     return response.data;